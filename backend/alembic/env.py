@@ -0,0 +1,61 @@
+"""Alembic 运行环境
+
+应用内（app.migrations.upgrade_database）调用时使用传入的 engine；
+命令行执行 alembic 时按 settings.DATABASE_URL 连接（同样读取 .env）。
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from app import models  # noqa: F401  注册所有表，供 autogenerate 比较
+from app.database import Base, engine as app_engine
+from app.services.search_index import FTS_TABLE
+
+config = context.config
+engine = config.attributes.get("engine")
+if engine is None:
+    # 命令行运行：按 alembic.ini 配置日志；应用内运行时不覆盖应用自己的日志配置
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name, disable_existing_loggers=False)
+    engine = app_engine
+
+target_metadata = Base.metadata
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # FTS5 虚拟表及其影子表由 ensure_search_index 在运行时维护，不参与 autogenerate
+    if type_ == "table" and name.startswith(FTS_TABLE):
+        return False
+    return True
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=engine.url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite 的 ALTER TABLE 能力有限，autogenerate 生成 batch 操作（重建表）
+            render_as_batch=True,
+            transaction_per_migration=True,
+            include_object=include_object,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,52 @@
+"""baseline：引入迁移之前的原始表结构（只有 questions 表，标签保存为 JSON 字符串列）
+
+之后新增的表、列、索引和触发器各自在后续版本中添加。未版本化的旧数据库（包括仓库中的
+interview_questions.db）已经是这个结构，app.migrations.upgrade_database 会先把它标记为
+本版本（相当于 alembic stamp 0001），再从 0002 开始升级。
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 17:40:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 与模型中的 Enum 列一致，数据库中保存枚举名称
+CATEGORIES = (
+    "ALGORITHM", "DATABASE", "SYSTEM_DESIGN", "FRONTEND", "BACKEND", "DEVOPS",
+    "MOBILE", "DATA_SCIENCE", "SECURITY", "TESTING", "REACT_NATIVE", "REACT",
+)
+DIFFICULTIES = ("EASY", "MEDIUM", "HARD")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "questions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("category", sa.Enum(*CATEGORIES, name="questioncategory"), nullable=False),
+        sa.Column("difficulty", sa.Enum(*DIFFICULTIES, name="difficultylevel"), nullable=False),
+        sa.Column("analysis", sa.Text(), nullable=True),
+        sa.Column("tags", sa.String(500), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_questions_id", "questions", ["id"])
+    op.create_index("ix_questions_title", "questions", ["title"])
+    op.create_index("ix_questions_category", "questions", ["category"])
+    op.create_index("ix_questions_difficulty", "questions", ["difficulty"])
+
+
+def downgrade() -> None:
+    op.drop_table("questions")
@@ -0,0 +1,74 @@
+"""question_facets：按 (类别, 难度) 预聚合的题目数量，由 questions 上的触发器维护
+
+触发器与题目写入处于同一事务，建好后从 questions 全量统计一次。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 17:41:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CATEGORIES = (
+    "ALGORITHM", "DATABASE", "SYSTEM_DESIGN", "FRONTEND", "BACKEND", "DEVOPS",
+    "MOBILE", "DATA_SCIENCE", "SECURITY", "TESTING", "REACT_NATIVE", "REACT",
+)
+DIFFICULTIES = ("EASY", "MEDIUM", "HARD")
+
+TRIGGERS = {
+    "question_facets_ai": """
+    CREATE TRIGGER question_facets_ai AFTER INSERT ON questions BEGIN
+        INSERT INTO question_facets(category, difficulty, count)
+        VALUES (new.category, new.difficulty, 1)
+        ON CONFLICT(category, difficulty) DO UPDATE SET count = count + 1;
+    END
+    """,
+    "question_facets_ad": """
+    CREATE TRIGGER question_facets_ad AFTER DELETE ON questions BEGIN
+        UPDATE question_facets SET count = count - 1
+        WHERE category = old.category AND difficulty = old.difficulty;
+    END
+    """,
+    "question_facets_au": """
+    CREATE TRIGGER question_facets_au
+    AFTER UPDATE OF category, difficulty ON questions
+    WHEN old.category IS NOT new.category OR old.difficulty IS NOT new.difficulty BEGIN
+        UPDATE question_facets SET count = count - 1
+        WHERE category = old.category AND difficulty = old.difficulty;
+        INSERT INTO question_facets(category, difficulty, count)
+        VALUES (new.category, new.difficulty, 1)
+        ON CONFLICT(category, difficulty) DO UPDATE SET count = count + 1;
+    END
+    """,
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "question_facets",
+        sa.Column("category", sa.Enum(*CATEGORIES, name="questioncategory"), nullable=False),
+        sa.Column("difficulty", sa.Enum(*DIFFICULTIES, name="difficultylevel"), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("category", "difficulty"),
+    )
+    for ddl in TRIGGERS.values():
+        op.execute(ddl)
+    op.execute(
+        "INSERT INTO question_facets(category, difficulty, count) "
+        "SELECT category, difficulty, COUNT(*) FROM questions GROUP BY category, difficulty"
+    )
+
+
+def downgrade() -> None:
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER {name}")
+    op.drop_table("question_facets")
@@ -0,0 +1,100 @@
+"""tags / question_tags：标签规范化为独立的表，取代 questions.tags JSON 字符串列
+
+旧列中的标签用 json_each 迁移到关联表（去掉首尾空白、空标签和重复标签，保持原有顺序，
+不是 JSON 数组的值忽略），然后删除旧列。tags.usage_count 由 question_tags 上的触发器维护。
+DROP COLUMN 需要 SQLite 3.35+；不用 batch 模式，重建 questions 表会删除它上面的触发器。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 17:42:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGERS = {
+    "question_tags_ai": """
+    CREATE TRIGGER question_tags_ai AFTER INSERT ON question_tags BEGIN
+        UPDATE tags SET usage_count = usage_count + 1 WHERE id = new.tag_id;
+    END
+    """,
+    "question_tags_ad": """
+    CREATE TRIGGER question_tags_ad AFTER DELETE ON question_tags BEGIN
+        UPDATE tags SET usage_count = usage_count - 1 WHERE id = old.tag_id;
+    END
+    """,
+    # SQLite 默认不启用外键约束，绕过 ORM 删除题目时也要清理关联
+    "questions_tags_ad": """
+    CREATE TRIGGER questions_tags_ad AFTER DELETE ON questions BEGIN
+        DELETE FROM question_tags WHERE question_id = old.id;
+    END
+    """,
+}
+
+# 旧列中每个合法的标签元素：(题目 id, 在数组中的位置, 去掉首尾空白后的标签名)
+LEGACY_TAGS = """
+    SELECT questions.id AS question_id, item.key AS position, trim(item.value) AS name
+    FROM questions, json_each(
+        CASE WHEN json_valid(questions.tags) AND json_type(questions.tags) = 'array'
+        THEN questions.tags ELSE '[]' END
+    ) AS item
+    WHERE item.type = 'text' AND trim(item.value) != ''
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        "tags",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("usage_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_tags_name", "tags", ["name"], unique=True)
+    op.create_table(
+        "question_tags",
+        sa.Column("question_id", sa.Integer(), nullable=False),
+        sa.Column("tag_id", sa.Integer(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["question_id"], ["questions.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["tag_id"], ["tags.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("question_id", "tag_id"),
+    )
+    op.create_index("ix_question_tags_tag_id_question_id", "question_tags", ["tag_id", "question_id"])
+    for ddl in TRIGGERS.values():
+        op.execute(ddl)
+
+    # 标签按首次出现的顺序编号；同一题目中重复的标签只保留第一次出现的位置
+    op.execute(
+        f"INSERT OR IGNORE INTO tags(name, usage_count) "
+        f"SELECT name, 0 FROM ({LEGACY_TAGS}) ORDER BY question_id, position"
+    )
+    op.execute(
+        f"INSERT OR IGNORE INTO question_tags(question_id, tag_id, position) "
+        f"SELECT legacy.question_id, tags.id, legacy.position FROM ({LEGACY_TAGS}) AS legacy "
+        f"JOIN tags ON tags.name = legacy.name ORDER BY legacy.question_id, legacy.position"
+    )
+    op.drop_column("questions", "tags")
+
+
+def downgrade() -> None:
+    op.add_column("questions", sa.Column("tags", sa.String(500), nullable=True))
+    op.execute(
+        "UPDATE questions SET tags = ("
+        "SELECT json_group_array(name) FROM ("
+        "SELECT tags.name AS name FROM question_tags JOIN tags ON tags.id = question_tags.tag_id "
+        "WHERE question_tags.question_id = questions.id ORDER BY question_tags.position)"
+        ") WHERE id IN (SELECT question_id FROM question_tags)"
+    )
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER {name}")
+    op.drop_table("question_tags")
+    op.drop_table("tags")
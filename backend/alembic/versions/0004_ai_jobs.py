@@ -0,0 +1,48 @@
+"""ai_jobs：持久化的 AI 生成题目任务
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 17:43:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CATEGORIES = (
+    "ALGORITHM", "DATABASE", "SYSTEM_DESIGN", "FRONTEND", "BACKEND", "DEVOPS",
+    "MOBILE", "DATA_SCIENCE", "SECURITY", "TESTING", "REACT_NATIVE", "REACT",
+)
+DIFFICULTIES = ("EASY", "MEDIUM", "HARD")
+STATUSES = ("PENDING", "RUNNING", "SUCCEEDED", "FAILED")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ai_jobs",
+        sa.Column("id", sa.String(32), nullable=False),
+        sa.Column("status", sa.Enum(*STATUSES, name="jobstatus"), nullable=False),
+        sa.Column("category", sa.Enum(*CATEGORIES, name="questioncategory"), nullable=False),
+        sa.Column("difficulty", sa.Enum(*DIFFICULTIES, name="difficultylevel"), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("question_ids", sa.JSON(), nullable=False),
+        sa.Column("skipped_titles", sa.JSON(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_ai_jobs_status", "ai_jobs", ["status"])
+    op.create_index("ix_ai_jobs_created_at", "ai_jobs", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("ai_jobs")
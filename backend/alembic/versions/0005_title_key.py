@@ -0,0 +1,54 @@
+"""questions.title_key：规范化后的标题及其唯一索引，保证并发写入时标题也不会重复
+
+标题规范化（NFKC + 大小写折叠 + 合并空白，见 normalize_title）无法在 SQL 中完成，已有题目
+在 Python 中回填；离线模式（--sql）只输出结构变更。已有的重复标题只有最早的一条获得去重键，
+其余保持 NULL（唯一索引允许多个 NULL）。
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 17:44:00
+
+"""
+import logging
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.services.textutil import normalize_title
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade() -> None:
+    op.add_column("questions", sa.Column("title_key", sa.String(200), nullable=True))
+    if not context.is_offline_mode():
+        _backfill(op.get_bind())
+    op.create_index("ux_questions_title_key", "questions", ["title_key"], unique=True)
+
+
+def _backfill(conn) -> None:
+    rows = conn.execute(sa.text("SELECT id, title FROM questions ORDER BY id")).fetchall()
+    taken = set()
+    updates = []
+    for question_id, title in rows:
+        key = normalize_title(title)
+        if key in taken:
+            continue
+        taken.add(key)
+        updates.append({"id": question_id, "key": key})
+    if updates:
+        conn.execute(sa.text("UPDATE questions SET title_key = :key WHERE id = :id"), updates)
+    if len(updates) < len(rows):
+        logger.info(f"标题去重键回填完成: {len(updates)} 条题目，{len(rows) - len(updates)} 条重复标题未设置")
+
+
+def downgrade() -> None:
+    op.drop_index("ux_questions_title_key", table_name="questions")
+    op.drop_column("questions", "title_key")
@@ -0,0 +1,27 @@
+"""questions.minhash：标题和正文的 MinHash 签名，用于近似重复检测
+
+签名由 python manage.py backfill-minhash 回填。
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 17:44:30
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("questions", sa.Column("minhash", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("questions", "minhash")
@@ -0,0 +1,41 @@
+"""按实际查询补充复合索引，删除被覆盖的单列索引
+
+- questions(category, difficulty, id)：同时按类别和难度筛选、按 id 翻页（含 keyset 分页）
+  和计数；抽题索引构建时 SELECT id, category, difficulty 走覆盖索引扫描
+- tags(usage_count DESC, name)：标签云按使用次数取前 N 个，不再全表扫描后排序
+- ai_jobs(status, created_at)：未完成任务的计数和恢复，取代 ix_ai_jobs_status
+- 删除 ix_questions_id：id 是 rowid 主键，这个索引从不被使用，只增加写入开销
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 17:45:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_questions_category_difficulty_id", "questions", ["category", "difficulty", "id"])
+    op.create_index("ix_tags_usage_count_name", "tags", [sa.text("usage_count DESC"), "name"])
+    op.create_index("ix_ai_jobs_status_created_at", "ai_jobs", ["status", "created_at"])
+    op.drop_index("ix_ai_jobs_status", table_name="ai_jobs")
+    op.drop_index("ix_questions_id", table_name="questions")
+    # 让查询规划器拿到新索引的统计信息
+    op.execute("ANALYZE")
+
+
+def downgrade() -> None:
+    op.create_index("ix_questions_id", "questions", ["id"])
+    op.create_index("ix_ai_jobs_status", "ai_jobs", ["status"])
+    op.drop_index("ix_ai_jobs_status_created_at", table_name="ai_jobs")
+    op.drop_index("ix_tags_usage_count_name", table_name="tags")
+    op.drop_index("ix_questions_category_difficulty_id", table_name="questions")
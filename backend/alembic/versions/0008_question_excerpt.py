@@ -0,0 +1,54 @@
+"""questions.excerpt：正文开头的纯文本摘录，列表摘要不再读取 content / analysis
+
+摘录需要去掉 markdown 标记（make_excerpt），无法在 SQL 中计算，已有题目在 Python 中分批回填；
+离线模式（--sql）只输出结构变更。
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 18:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.services.textutil import make_excerpt
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+
+def upgrade() -> None:
+    op.add_column("questions", sa.Column("excerpt", sa.String(200), nullable=True))
+    if context.is_offline_mode():
+        return
+
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.text(
+                "SELECT id, content FROM questions WHERE excerpt IS NULL AND id > :last_id "
+                "ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            sa.text("UPDATE questions SET excerpt = :excerpt WHERE id = :id"),
+            [{"id": question_id, "excerpt": make_excerpt(content)} for question_id, content in rows],
+        )
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    # 不用 batch 模式：重建 questions 表会连带删除它上面的全文索引、分面和标签触发器。
+    # ALTER TABLE ... DROP COLUMN 需要 SQLite 3.35+
+    op.drop_column("questions", "excerpt")
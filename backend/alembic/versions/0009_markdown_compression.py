@@ -0,0 +1,53 @@
+"""content / analysis 压缩存储的字典表
+
+MARKDOWN_COMPRESSION 开启时同时训练字典并压缩已有题目（全文索引触发器随之换成经 md_text()
+读取明文的版本）；之后开启的可以执行 python manage.py compress-markdown 转换。
+回退时先把所有题目还原为明文，触发器换回明文版本。
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 19:20:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.config import settings
+from app.services import search_index
+from app.services.compression import DICTIONARY_TABLE, compress_questions, convert_questions, markdown_codec
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        DICTIONARY_TABLE,
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+        sa.Column("sample_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    # 离线模式（--sql）只输出结构变更
+    if context.is_offline_mode():
+        return
+    conn = op.get_bind()
+    if conn.dialect.name == "sqlite" and settings.MARKDOWN_COMPRESSION:
+        compress_questions(conn)
+
+
+def downgrade() -> None:
+    if not context.is_offline_mode() and op.get_bind().dialect.name == "sqlite":
+        conn = op.get_bind()
+        markdown_codec.load(conn)
+        convert_questions(conn, compress=False)
+        # 回退后不再有压缩数据，无论 MARKDOWN_COMPRESSION 如何都换回明文版本
+        search_index.sync_triggers(conn, md_text=False)
+    op.drop_table(DICTIONARY_TABLE)
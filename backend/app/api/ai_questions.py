@@ -1,61 +1,214 @@
+import asyncio
+import orjson
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app import crud, schemas
+from app.database import get_read_db, ReadSessionLocal
+from app import crud, crud_async, schemas
+from app.services.ai_jobs import ai_job_runner, JobQueueFullError, FINISHED_STATUSES
+from app.services.ai_metrics import render_prometheus
 from app.services.ai_service import ai_service
-from app.models import DifficultyLevel, QuestionCategory
+from app.services.bank_planner import bank_planner, plan_bank_fill, PlannerBusyError
+from app.services.db_writer import db_writer
+from app.models import AIJob, DifficultyLevel, QuestionCategory
 
 router = APIRouter()
 
-@router.post("/generate", response_model=List[schemas.QuestionResponse])
-def generate_questions(
+# SSE 订阅时轮询任务状态的间隔和心跳间隔（秒）
+JOB_POLL_INTERVAL = 1.0
+JOB_HEARTBEAT_INTERVAL = 15.0
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+def _job_response(db: Session, job: AIJob) -> schemas.AIJobResponse:
+    response = schemas.AIJobResponse.model_validate(job)
+    if job.question_ids:
+        response.questions = crud.get_questions_by_ids(db, job.question_ids)
+    return response
+
+def _check_circuit() -> None:
+    """上游熔断期间直接返回 503，不再提交注定失败的生成"""
+    retry_after = ai_service.caller.breaker.retry_after()
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=503,
+            detail=f"AI 服务暂时不可用，请在 {retry_after:.0f} 秒后重试",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+
+@router.post("/generate", response_model=schemas.AIJobResponse, status_code=202)
+async def generate_questions(
     *,
-    db: Session = Depends(get_db),
     request: schemas.QuestionGenerateRequest,
 ):
-    """使用AI生成题目"""
+    """提交 AI 生成题目任务，立即返回任务 id；通过 /ai/jobs/{id} 查询结果"""
+    _check_circuit()
     try:
-        # 调用AI服务生成题目
-        questions_data = ai_service.generate_questions(
-            category=request.category,
-            difficulty=request.difficulty,
-            count=request.count
-        )
-        
-        # 保存生成的题目到数据库，跳过重复标题
-        saved_questions = []
-        skipped_titles = []
-        
-        for question_data in questions_data:
-            # 检查标题是否已存在
-            existing_question = crud.get_question_by_title(db=db, title=question_data.title)
-            if existing_question:
-                skipped_titles.append(question_data.title)
-                continue
-            
-            # 保存新题目
-            question = crud.create_question(db=db, question=question_data)
-            saved_questions.append(question)
-        
-        # 如果有跳过的题目，记录日志
-        if skipped_titles:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"AI生成题目去重: 跳过了 {len(skipped_titles)} 个重复标题: {skipped_titles}")
-        
-        return saved_questions
+        job = await db_writer.run_async(ai_job_runner.submit, request)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return job
+
+async def _save_streamed_question(question_data: schemas.QuestionCreate):
+    """保存一道流式生成的题目，标题重复时返回 None"""
+    saved, _ = await crud_async.save_generated_questions([question_data])
+    if not saved:
+        return None
+    return schemas.dump_question(saved[0])
+
+@router.get("/generate/stream")
+async def stream_generate_questions(
+    category: QuestionCategory = Query(..., description="题目类别"),
+    difficulty: DifficultyLevel = Query(..., description="难度等级"),
+    count: int = Query(..., ge=1, le=10, description="题目数量"),
+):
+    """流式生成题目（Server-Sent Events）
+    
+    每道题生成完毕即保存并推送 question 事件，标题重复时推送 skipped 事件，
+    结束时推送 done 事件，出错时推送 error 事件。使用 GET 以便浏览器 EventSource 直接订阅。
+    """
+    _check_circuit()
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"生成题目失败: {str(e)}")
+    async def events():
+        saved = 0
+        skipped = []
+        try:
+            async for question_data in ai_service.stream_questions(category, difficulty, count):
+                question = await _save_streamed_question(question_data)
+                if question is None:
+                    skipped.append(question_data.title)
+                    yield _sse("skipped", {"title": question_data.title})
+                else:
+                    saved += 1
+                    yield _sse("question", question)
+        except Exception as e:
+            yield _sse("error", {"detail": f"生成题目失败: {str(e)}"})
+            return
+        yield _sse("done", {"saved": saved, "skipped_titles": skipped})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/jobs", response_model=List[schemas.AIJobResponse])
+async def list_jobs(
+    db: AsyncSession = Depends(get_read_db),
+    limit: int = Query(20, ge=1, le=100, description="返回数量上限"),
+):
+    """最近提交的生成任务"""
+    return await db.run_sync(ai_job_runner.list_recent, limit)
+
+@router.get("/jobs/{job_id}", response_model=schemas.AIJobResponse)
+async def get_job(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    job_id: str,
+):
+    """查询生成任务状态，成功后附带生成的题目"""
+    job = await db.run_sync(ai_job_runner.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return await db.run_sync(_job_response, job)
+
+async def _load_job_event(job_id: str):
+    async with ReadSessionLocal() as db:
+        job = await db.run_sync(ai_job_runner.get, job_id)
+        if job is None:
+            return None
+        return (await db.run_sync(_job_response, job)).model_dump(mode="json")
+
+@router.get("/jobs/{job_id}/events")
+async def subscribe_job(job_id: str):
+    """以 Server-Sent Events 推送任务状态，任务结束后关闭连接"""
+    first = await _load_job_event(job_id)
+    if first is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    async def events():
+        payload = first
+        last_status = None
+        idle = 0.0
+        while True:
+            if payload["status"] != last_status:
+                last_status = payload["status"]
+                idle = 0.0
+                yield _sse("status", payload)
+                if last_status in FINISHED_STATUSES:
+                    return
+            elif idle >= JOB_HEARTBEAT_INTERVAL:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            idle += JOB_POLL_INTERVAL
+            payload = await _load_job_event(job_id) or payload
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/bank/plan", response_model=schemas.BankFillRunResponse)
+async def plan_bank(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    request: schemas.BankFillRequest,
+):
+    """预览补题计划：各 类别 × 难度 桶的当前数量、目标和缺口，以及估算的 token 开销"""
+    return (await db.run_sync(plan_bank_fill, request)).to_dict()
+
+@router.post("/bank/fill", response_model=schemas.BankFillRunResponse, status_code=202)
+async def fill_bank(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    request: schemas.BankFillRequest,
+):
+    """按缺口在所有桶之间调度生成，立即返回；通过 /ai/bank/runs/{id} 查询各桶进度"""
+    _check_circuit()
+    try:
+        run = await db.run_sync(bank_planner.start, request)
+    except PlannerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return run.to_dict()
+
+@router.get("/bank/runs", response_model=List[schemas.BankFillRunResponse])
+async def list_bank_runs():
+    """最近的补题任务（只保存在内存中）"""
+    return [run.to_dict() for run in bank_planner.list_recent()]
+
+@router.get("/bank/runs/{run_id}", response_model=schemas.BankFillRunResponse)
+async def get_bank_run(run_id: str):
+    """查询补题任务的进度"""
+    run = bank_planner.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="补题任务不存在")
+    return run.to_dict()
+
+@router.get("/stats", response_model=schemas.AIStatsResponse)
+async def get_ai_stats():
+    """AI 调用的限流、重试、熔断、合并/缓存统计，以及延迟分位数、token 用量、成本和解析结果"""
+    return ai_service.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_ai_metrics():
+    """Prometheus 文本格式的 AI 调用指标，供监控系统定时抓取"""
+    return PlainTextResponse(
+        render_prometheus(ai_service.stats()),
+        media_type="text/plain; version=0.0.4",
+    )
 
 @router.get("/categories", response_model=List[str])
-def get_categories():
+async def get_categories():
     """获取所有题目类别"""
     return [category.value for category in QuestionCategory]
 
 @router.get("/difficulties", response_model=List[str])
-def get_difficulties():
+async def get_difficulties():
     """获取所有难度等级"""
-    return [difficulty.value for difficulty in DifficultyLevel]
\ No newline at end of file
+    return [difficulty.value for difficulty in DifficultyLevel]
@@ -0,0 +1,16 @@
+from typing import Tuple
+from fastapi import HTTPException, Query
+
+from app import schemas
+
+def question_fields(
+    fields: str = Query(
+        None,
+        description=f"列表项在摘要（id、标题、类别、难度、标签、摘录）之外返回的字段，逗号分隔，可选 {','.join(schemas.QUESTION_OPTIONAL_FIELDS)}"
+    ),
+) -> Tuple[str, ...]:
+    """列表类接口共用的 fields 参数"""
+    try:
+        return schemas.parse_question_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,119 +1,251 @@
-from typing import List
+import asyncio
+from typing import List, Tuple
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app import crud, schemas
+from app.database import get_read_db
+from app import crud_async, schemas
+from app.api.params import question_fields
 from app.models import DifficultyLevel, QuestionCategory
+from app.services.query_cache import query_cache, make_key
+from app.services.db_writer import db_writer
+from app.services.facets import build_facet_counts
+from app.services.suggest import suggest_index
+from app.services.similar import similarity_index
 
 router = APIRouter()
 
 @router.post("/", response_model=schemas.QuestionResponse)
-def create_question(
+async def create_question(
     *,
-    db: Session = Depends(get_db),
     question_in: schemas.QuestionCreate,
 ):
-    """创建新题目"""
-    question = crud.create_question(db=db, question=question_in)
-    return question
+    """创建新题目，标题（忽略大小写、全半角和多余空白）已存在时返回 409"""
+    try:
+        question = await crud_async.create_question(question_in)
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="已存在相同标题的题目")
+    return ORJSONResponse(content=schemas.dump_question(question))
+
+async def _list_questions(db: AsyncSession, params: schemas.QuestionSearchParams):
+    # 命中缓存时直接返回已序列化的结果，跳过查询和 pydantic 校验
+    key = make_key("list", **params.model_dump())
+    cached = query_cache.get(key)
+    if cached is not None:
+        return ORJSONResponse(content=cached)
+    
+    version = query_cache.version
+    search = crud_async.search_questions
+    if params.q and params.mode == schemas.SearchMode.FUZZY:
+        search = crud_async.fuzzy_search_questions
+    try:
+        questions, total, next_cursor = await search(db, params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # 列表项只包含摘要字段和 fields 请求的字段，未请求的字段不输出；
+    # 直接从行生成 dict，不再经过 QuestionListResponse 校验。
+    # 游标分页没有页码的概念，page / pages 为空，继续翻页只看 next_cursor
+    paged_by_cursor = params.cursor is not None
+    response = {
+        "items": [schemas.dump_question_summary(question, params.fields) for question in questions],
+        "total": total,
+        "page": None if paged_by_cursor else params.page,
+        "size": params.size,
+        "pages": (total + params.size - 1) // params.size if total is not None and not paged_by_cursor else None,
+        "next_cursor": next_cursor,
+        "facets": build_facet_counts(await crud_async.get_facet_counts(db, params)) if params.facets else None,
+    }
+    query_cache.set(key, response, version=version)
+    return ORJSONResponse(content=response)
 
 @router.get("/", response_model=schemas.QuestionListResponse)
-def read_questions(
-    db: Session = Depends(get_db),
+async def read_questions(
+    db: AsyncSession = Depends(get_read_db),
     q: str = Query(None, description="搜索关键词"),
     category: QuestionCategory = Query(None, description="题目类别"),
     difficulty: DifficultyLevel = Query(None, description="难度等级"),
+    tag: str = Query(None, description="标签"),
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(10, ge=1, le=100, description="每页记录数"),
+    cursor: str = Query(None, description="分页游标（上一页返回的 next_cursor），传入时忽略 page，响应中 page / pages 为空"),
+    with_total: bool = Query(False, description="游标分页时是否计算总数"),
+    facets: bool = Query(False, description="是否同时返回当前筛选条件下的分面统计"),
+    fields: Tuple[str, ...] = Depends(question_fields),
 ):
     """获取题目列表（支持搜索和筛选）"""
-    # 如果有搜索或筛选条件，使用搜索功能
-    if q or category or difficulty:
-        params = schemas.QuestionSearchParams(
-            q=q,
-            category=category,
-            difficulty=difficulty,
-            page=page,
-            size=size
-        )
-        questions, total = crud.search_questions(db, params)
-    else:
-        # 无搜索条件时，直接获取所有题目
-        skip = (page - 1) * size
-        questions = crud.get_questions(db, skip=skip, limit=size)
-        total = crud.get_questions_count(db)
-    
-    return schemas.QuestionListResponse(
-        items=questions,
-        total=total,
+    params = schemas.QuestionSearchParams(
+        q=q,
+        category=category,
+        difficulty=difficulty,
+        tag=tag,
         page=page,
         size=size,
-        pages=(total + size - 1) // size
+        cursor=cursor,
+        with_total=with_total,
+        facets=facets,
+        fields=fields
     )
+    return await _list_questions(db, params)
 
 @router.get("/search", response_model=schemas.QuestionListResponse)
-def search_questions(
-    db: Session = Depends(get_db),
+async def search_questions(
+    db: AsyncSession = Depends(get_read_db),
     q: str = Query(None, description="搜索关键词"),
     category: QuestionCategory = Query(None, description="题目类别"),
     difficulty: DifficultyLevel = Query(None, description="难度等级"),
+    tag: str = Query(None, description="标签"),
+    mode: schemas.SearchMode = Query(schemas.SearchMode.FULLTEXT, description="搜索模式：fulltext 全文检索，fuzzy 容错匹配标题和标签"),
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(10, ge=1, le=100, description="每页记录数"),
+    cursor: str = Query(None, description="分页游标（上一页返回的 next_cursor），传入时忽略 page，响应中 page / pages 为空"),
+    with_total: bool = Query(False, description="游标分页时是否计算总数"),
+    facets: bool = Query(False, description="是否同时返回当前筛选条件下的分面统计"),
+    fields: Tuple[str, ...] = Depends(question_fields),
 ):
     """搜索和筛选题目"""
     params = schemas.QuestionSearchParams(
         q=q,
         category=category,
         difficulty=difficulty,
-        page=page,
-        size=size
-    )
-    questions, total = crud.search_questions(db, params)
-    
-    return schemas.QuestionListResponse(
-        items=questions,
-        total=total,
+        tag=tag,
+        mode=mode,
         page=page,
         size=size,
-        pages=(total + size - 1) // size
+        cursor=cursor,
+        with_total=with_total,
+        facets=facets,
+        fields=fields
     )
+    return await _list_questions(db, params)
+
+@router.get("/suggest", response_model=schemas.SuggestResponse)
+async def suggest_questions(
+    prefix: str = Query(..., min_length=1, max_length=100, description="输入前缀"),
+    limit: int = Query(10, ge=1, le=50, description="返回数量上限"),
+):
+    """按前缀联想题目标题和标签（内存索引，不访问数据库）
+
+    只查找前缀对应的有限候选，开销很小，直接在事件循环中执行
+    """
+    return suggest_index.suggest(prefix, limit=limit)
+
+@router.get("/similar", response_model=List[schemas.QuestionSummary], response_model_exclude_unset=True)
+async def read_similar_to_text(
+    db: AsyncSession = Depends(get_read_db),
+    text: str = Query(..., min_length=1, max_length=5000, description="用于匹配的文本"),
+    limit: int = Query(10, ge=1, le=50, description="返回数量上限"),
+    fields: Tuple[str, ...] = Depends(question_fields),
+):
+    """查找与一段文本相似的题目（TF-IDF 余弦相似度，按 score 降序）
+
+    向量化和矩阵运算在线程池中执行，不阻塞事件循环
+    """
+    ranked = await asyncio.to_thread(similarity_index.similar_to_text, text, limit=limit)
+    questions = await crud_async.get_ranked_questions(db, ranked, fields)
+    return ORJSONResponse(content=[schemas.dump_question_summary(question, fields) for question in questions])
+
+@router.get("/facets", response_model=schemas.FacetCounts)
+async def read_facets(
+    db: AsyncSession = Depends(get_read_db),
+    q: str = Query(None, description="搜索关键词"),
+    category: QuestionCategory = Query(None, description="题目类别"),
+    difficulty: DifficultyLevel = Query(None, description="难度等级"),
+    tag: str = Query(None, description="标签"),
+    with_tags: bool = Query(False, description="是否同时返回标签计数"),
+    tag_limit: int = Query(50, ge=1, le=500, description="返回的标签数量上限"),
+):
+    """获取类别 × 难度的题目数量矩阵（可按搜索和筛选条件统计）"""
+    params = schemas.QuestionSearchParams(q=q, category=category, difficulty=difficulty, tag=tag)
+    key = make_key(
+        "facets", q=q, category=category, difficulty=difficulty, tag=tag,
+        with_tags=with_tags, tag_limit=tag_limit if with_tags else None
+    )
+    cached = query_cache.get(key)
+    if cached is not None:
+        return ORJSONResponse(content=cached)
+    
+    version = query_cache.version
+    response = build_facet_counts(await crud_async.get_facet_counts(db, params))
+    if with_tags:
+        response["tags"] = dict(await crud_async.get_tag_counts(db, params, limit=tag_limit))
+    query_cache.set(key, response, version=version)
+    return ORJSONResponse(content=response)
+
+@router.get("/cache/stats", response_model=schemas.CacheStatsResponse)
+async def read_cache_stats():
+    """查询结果缓存的命中统计"""
+    return query_cache.stats()
+
+@router.get("/writer/stats", response_model=schemas.WriterStatsResponse)
+async def read_writer_stats():
+    """写线程的组提交统计"""
+    return db_writer.stats()
 
 @router.get("/{question_id}", response_model=schemas.QuestionResponse)
-def read_question(
+async def read_question(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     question_id: int,
 ):
     """获取题目详情"""
-    question = crud.get_question(db=db, question_id=question_id)
+    key = make_key("detail", id=question_id)
+    cached = query_cache.get(key)
+    if cached is not None:
+        return ORJSONResponse(content=cached)
+    
+    version = query_cache.version
+    question = await crud_async.get_question(db=db, question_id=question_id)
     if not question:
         raise HTTPException(status_code=404, detail="题目不存在")
-    return question
+    
+    response = schemas.dump_question(question)
+    query_cache.set(key, response, version=version)
+    return ORJSONResponse(content=response)
+
+@router.get("/{question_id}/similar", response_model=List[schemas.QuestionSummary], response_model_exclude_unset=True)
+async def read_similar_questions(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    question_id: int,
+    limit: int = Query(10, ge=1, le=50, description="返回数量上限"),
+    fields: Tuple[str, ...] = Depends(question_fields),
+):
+    """查找与指定题目相似的题目（不含自身）"""
+    ranked = await asyncio.to_thread(similarity_index.similar_to_question, question_id, limit=limit)
+    if ranked is None:
+        raise HTTPException(status_code=404, detail="题目不存在")
+    questions = await crud_async.get_ranked_questions(db, ranked, fields)
+    return ORJSONResponse(content=[schemas.dump_question_summary(question, fields) for question in questions])
 
 @router.put("/{question_id}", response_model=schemas.QuestionResponse)
-def update_question(
+async def update_question(
     *,
-    db: Session = Depends(get_db),
     question_id: int,
     question_in: schemas.QuestionUpdate,
 ):
     """更新题目"""
-    question = crud.update_question(db=db, question_id=question_id, question=question_in)
+    try:
+        question = await crud_async.update_question(question_id, question_in)
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="已存在相同标题的题目")
     if not question:
         raise HTTPException(status_code=404, detail="题目不存在")
-    return question
+    return ORJSONResponse(content=schemas.dump_question(question))
 
 @router.delete("/{question_id}", response_model=schemas.QuestionResponse)
-def delete_question(
+async def delete_question(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     question_id: int,
 ):
     """删除题目"""
-    question = crud.get_question(db=db, question_id=question_id)
+    question = await crud_async.get_question(db=db, question_id=question_id)
     if not question:
         raise HTTPException(status_code=404, detail="题目不存在")
     
-    crud.delete_question(db=db, question_id=question_id)
-    return question
\ No newline at end of file
+    response = schemas.dump_question(question)
+    await crud_async.delete_question(question_id)
+    return ORJSONResponse(content=response)
\ No newline at end of file
@@ -1,91 +1,64 @@
-import random
-from typing import List
+from typing import List, Tuple
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app import crud, schemas
-from app.models import Question, DifficultyLevel, QuestionCategory
+from app.database import get_read_db
+from app import crud_async, schemas
+from app.api.params import question_fields
+from app.models import DifficultyLevel, QuestionCategory
 
 router = APIRouter()
 
-@router.get("/", response_model=List[schemas.QuestionResponse])
-def get_random_questions(
+@router.get("/", response_model=List[schemas.QuestionSummary], response_model_exclude_unset=True)
+async def get_random_questions(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     count: int = Query(..., ge=1, le=50, description="题目数量"),
     categories: List[QuestionCategory] = Query(None, description="题目类别筛选"),
     difficulties: List[DifficultyLevel] = Query(None, description="难度等级筛选"),
+    tags: List[str] = Query(None, description="标签筛选（命中任一标签）"),
+    fields: Tuple[str, ...] = Depends(question_fields),
 ):
     """随机获取题目"""
     
-    # 构建查询
-    query = db.query(Question)
+    # 从内存 id 池抽样，只加载选中的题目
+    selected_ids = await crud_async.sample_question_ids(
+        db, count, categories=categories, difficulties=difficulties, tags=tags
+    )
     
-    if categories:
-        query = query.filter(Question.category.in_(categories))
-    
-    if difficulties:
-        query = query.filter(Question.difficulty.in_(difficulties))
-    
-    # 获取符合条件的所有题目ID
-    question_ids = query.with_entities(Question.id).all()
-    question_ids = [id[0] for id in question_ids]
-    
-    if not question_ids:
+    if not selected_ids:
         raise HTTPException(status_code=404, detail="没有找到符合条件的题目")
     
-    # 随机选择题目
-    if count >= len(question_ids):
-        selected_ids = question_ids
-    else:
-        selected_ids = random.sample(question_ids, count)
-    
-    # 获取选中的题目详情
-    questions = db.query(Question).filter(Question.id.in_(selected_ids)).all()
-    
-    # 随机打乱顺序
-    random.shuffle(questions)
-    
-    return questions
+    questions = await crud_async.get_questions_by_ids(db, selected_ids, fields)
+    return ORJSONResponse(content=[schemas.dump_question_summary(question, fields) for question in questions])
 
-@router.post("/advanced", response_model=schemas.QuestionListResponse)
-def get_advanced_random_questions(
+@router.post("/advanced", response_model=schemas.QuestionListResponse, response_model_exclude_unset=True)
+async def get_advanced_random_questions(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     request: schemas.RandomQuestionRequest,
+    fields: Tuple[str, ...] = Depends(question_fields),
 ):
     """高级随机选题功能"""
     
-    # 构建查询
-    query = db.query(Question)
-    
-    if request.categories:
-        query = query.filter(Question.category.in_(request.categories))
-    
-    if request.difficulties:
-        query = query.filter(Question.difficulty.in_(request.difficulties))
+    selected_ids = await crud_async.sample_question_ids(
+        db,
+        request.count,
+        categories=request.categories,
+        difficulties=request.difficulties,
+        tags=request.tags
+    )
     
-    # 获取符合条件的所有题目
-    all_questions = query.all()
-    
-    if not all_questions:
+    if not selected_ids:
         raise HTTPException(status_code=404, detail="没有找到符合条件的题目")
     
-    # 随机选择题目
-    if request.count >= len(all_questions):
-        selected_questions = all_questions
-    else:
-        selected_questions = random.sample(all_questions, request.count)
-    
-    # 随机打乱顺序
-    random.shuffle(selected_questions)
+    selected_questions = await crud_async.get_questions_by_ids(db, selected_ids, fields)
     
-    return schemas.QuestionListResponse(
-        items=selected_questions,
-        total=len(selected_questions),
-        page=1,
-        size=len(selected_questions),
-        pages=1
-    )
\ No newline at end of file
+    return ORJSONResponse(content={
+        "items": [schemas.dump_question_summary(question, fields) for question in selected_questions],
+        "total": len(selected_questions),
+        "page": 1,
+        "size": len(selected_questions),
+        "pages": 1,
+    })
\ No newline at end of file
@@ -0,0 +1,26 @@
+from typing import List
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_read_db
+from app import crud_async, schemas
+from app.services.query_cache import query_cache, make_key
+
+router = APIRouter()
+
+@router.get("/", response_model=List[schemas.TagResponse])
+async def read_tags(
+    db: AsyncSession = Depends(get_read_db),
+    limit: int = Query(100, ge=1, le=1000, description="返回数量上限"),
+):
+    """获取标签列表及使用次数（按使用次数降序）"""
+    key = make_key("tags", limit=limit)
+    cached = query_cache.get(key)
+    if cached is not None:
+        return ORJSONResponse(content=cached)
+    
+    version = query_cache.version
+    response = [{"name": name, "count": count} for name, count in await crud_async.get_tag_counts(db, limit=limit)]
+    query_cache.set(key, response, version=version)
+    return ORJSONResponse(content=response)
@@ -24,6 +24,65 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "Interview Question Bank API"
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173"]
     
+    # 查询结果缓存（条目数上限为 0 时关闭缓存）
+    QUERY_CACHE_MAX_SIZE: int = 1024
+    QUERY_CACHE_TTL: int = 300
+    
+    # 相似题目 TF-IDF 矩阵的持久化文件（为空时每次启动重新构建）
+    SIMILARITY_INDEX_PATH: str = "./similarity_index.npz"
+    
+    # AI 生成任务：后台并发执行数、排队中和执行中任务的上限
+    AI_JOB_WORKERS: int = 2
+    AI_JOB_MAX_PENDING: int = 20
+    
+    # AI 生成拆分：每个子请求的题目数、同时进行的子请求数、子请求失败后的重试次数
+    AI_BATCH_SIZE: int = 2
+    AI_MAX_CONCURRENCY: int = 4
+    AI_BATCH_RETRIES: int = 2
+    
+    # AI 原始输出缓存：条目数上限和有效期（秒），保存失败后重试时重放，不再调用模型
+    AI_COMPLETION_CACHE_SIZE: int = 64
+    AI_COMPLETION_CACHE_TTL: int = 600
+    
+    # 近似重复检测：MinHash 估计的 Jaccard 相似度阈值；处理方式 reject（跳过）/ flag（保存并记录日志）/ off。
+    # 只在 AI 生成和批量导入（bulk_create_questions）时检查，手动创建的单道题目不检查
+    NEAR_DUPLICATE_THRESHOLD: float = 0.7
+    NEAR_DUPLICATE_MODE: str = "reject"
+    
+    # OpenAI 客户端限流（每分钟请求数 / token 数，0 表示不限）、429/5xx 重试和熔断
+    OPENAI_RPM: int = 60
+    OPENAI_TPM: int = 150000
+    OPENAI_MAX_RETRIES: int = 4
+    OPENAI_RETRY_BASE_DELAY: float = 1.0
+    OPENAI_RETRY_MAX_DELAY: float = 30.0
+    OPENAI_BREAKER_FAILURES: int = 5
+    OPENAI_BREAKER_RESET: float = 30.0
+    
+    # 题库补齐：每个 类别 × 难度 桶的默认目标数、全局并发、token 预算（0 表示不限）、每次生成的题目数
+    BANK_TARGET_PER_BUCKET: int = 20
+    BANK_FILL_CONCURRENCY: int = 4
+    BANK_FILL_TOKEN_BUDGET: int = 0
+    BANK_FILL_CHUNK_SIZE: int = 5
+    
+    # AI 调用监控：延迟分位数的滑动窗口大小、流式响应是否请求 usage 统计、每千 token 价格（美元，用于估算成本）
+    AI_METRICS_WINDOW: int = 1024
+    OPENAI_STREAM_USAGE: bool = True
+    OPENAI_PROMPT_PRICE_PER_1K: float = 0.01
+    OPENAI_COMPLETION_PRICE_PER_1K: float = 0.03
+    
+    # 单线程写入器：每次组提交最多合并的写操作数、凑批等待时间（毫秒，0 表示只合并已经在排队的操作）
+    DB_WRITER_MAX_BATCH: int = 64
+    DB_WRITER_MAX_DELAY_MS: float = 0.0
+    
+    # 启动时自动把数据库迁移到最新版本；关闭后需手动执行 python manage.py migrate
+    AUTO_MIGRATE: bool = True
+    
+    # content / analysis 压缩存储（仅 SQLite）：开启后新写入的长文本压缩保存，已有题目用
+    # python manage.py compress-markdown 转换；zlib 压缩级别（1-9）、最小压缩长度（字节，更短的保持明文）
+    MARKDOWN_COMPRESSION: bool = False
+    MARKDOWN_COMPRESSION_LEVEL: int = 6
+    MARKDOWN_COMPRESSION_MIN_SIZE: int = 200
+    
     # 兼容性属性：提供原始名称的访问方式
     @property
     def OPENAI_API_KEY(self) -> str:
@@ -75,6 +134,18 @@ class Settings(BaseSettings):
         logger.info(f"🌐 API_V1_STR{get_override_suffix('API_V1_STR')}: {self.API_V1_STR}")
         logger.info(f"📦 PROJECT_NAME{get_override_suffix('PROJECT_NAME')}: {self.PROJECT_NAME}")
         logger.info(f"🔗 CORS_ORIGINS{get_override_suffix('CORS_ORIGINS')}: {self.CORS_ORIGINS}")
+        logger.info(f"🗃️  QUERY_CACHE{get_override_suffix('QUERY_CACHE_MAX_SIZE')}: max_size={self.QUERY_CACHE_MAX_SIZE}, ttl={self.QUERY_CACHE_TTL}s")
+        logger.info(f"🧭 SIMILARITY_INDEX_PATH{get_override_suffix('SIMILARITY_INDEX_PATH')}: {self.SIMILARITY_INDEX_PATH or '(disabled)'}")
+        logger.info(f"🧵 AI_JOB{get_override_suffix('AI_JOB_WORKERS')}: workers={self.AI_JOB_WORKERS}, max_pending={self.AI_JOB_MAX_PENDING}")
+        logger.info(f"🧩 AI_BATCH{get_override_suffix('AI_BATCH_SIZE')}: size={self.AI_BATCH_SIZE}, concurrency={self.AI_MAX_CONCURRENCY}, retries={self.AI_BATCH_RETRIES}")
+        logger.info(f"♻️  AI_COMPLETION_CACHE{get_override_suffix('AI_COMPLETION_CACHE_SIZE')}: max_size={self.AI_COMPLETION_CACHE_SIZE}, ttl={self.AI_COMPLETION_CACHE_TTL}s")
+        logger.info(f"🪞 NEAR_DUPLICATE{get_override_suffix('NEAR_DUPLICATE_MODE')}: mode={self.NEAR_DUPLICATE_MODE}, threshold={self.NEAR_DUPLICATE_THRESHOLD}")
+        logger.info(f"🚦 OPENAI_LIMITS{get_override_suffix('OPENAI_RPM')}: rpm={self.OPENAI_RPM}, tpm={self.OPENAI_TPM}, retries={self.OPENAI_MAX_RETRIES}, breaker={self.OPENAI_BREAKER_FAILURES} failures/{self.OPENAI_BREAKER_RESET:.0f}s")
+        logger.info(f"⚖️  BANK_FILL{get_override_suffix('BANK_TARGET_PER_BUCKET')}: target={self.BANK_TARGET_PER_BUCKET}, concurrency={self.BANK_FILL_CONCURRENCY}, token_budget={self.BANK_FILL_TOKEN_BUDGET or 'unlimited'}, chunk={self.BANK_FILL_CHUNK_SIZE}")
+        logger.info(f"📈 AI_METRICS{get_override_suffix('AI_METRICS_WINDOW')}: window={self.AI_METRICS_WINDOW}, stream_usage={self.OPENAI_STREAM_USAGE}, price_per_1k=${self.OPENAI_PROMPT_PRICE_PER_1K}/${self.OPENAI_COMPLETION_PRICE_PER_1K}")
+        logger.info(f"✍️  DB_WRITER{get_override_suffix('DB_WRITER_MAX_BATCH')}: max_batch={self.DB_WRITER_MAX_BATCH}, max_delay={self.DB_WRITER_MAX_DELAY_MS}ms")
+        logger.info(f"🧱 AUTO_MIGRATE{get_override_suffix('AUTO_MIGRATE')}: {self.AUTO_MIGRATE}")
+        logger.info(f"🗜️  MARKDOWN_COMPRESSION{get_override_suffix('MARKDOWN_COMPRESSION')}: {self.MARKDOWN_COMPRESSION}, level={self.MARKDOWN_COMPRESSION_LEVEL}, min_size={self.MARKDOWN_COMPRESSION_MIN_SIZE}B")
         logger.info("=" * 60)
         
         # 检查是否存在旧的环境变量名
@@ -1,14 +1,88 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
-from typing import List, Optional
+from sqlalchemy.orm import Session, defer
+from sqlalchemy import or_, and_, func, insert, select, text, Integer, Float, String
+from typing import Callable, List, Optional, Sequence, Tuple
+import base64
 import json
+import logging
 
-from app.models import Question
-from app.schemas import QuestionCreate, QuestionUpdate, QuestionSearchParams
+from app.config import settings
+from app.models import Question, QuestionFacet, QuestionTag, Tag
+from app.schemas import QuestionCreate, QuestionUpdate, QuestionSearchParams, SearchMode
+from app.services import search_index
+from app.services.compression import plain_text
+from app.services.fuzzy import fuzzy_index
+from app.services.db_writer import after_commit, commit, in_group_commit, rollback
+from app.services.minhash import MinHashLSH, find_batch_duplicates, near_duplicate_index, signature, to_bytes
+from app.services.query_cache import query_cache
+from app.services.tags import normalize_tag_names
+from app.services.textutil import make_excerpt, normalize_title
+
+logger = logging.getLogger(__name__)
+
+# 题目提交后的回调 listener(event, question_id, question)，用于维护内存索引；
+# event 为 "create" / "update" / "delete"，删除时 question 为 None
+_write_listeners: List[Callable[[str, int, Optional[Question]], None]] = []
+
+def add_write_listener(listener: Callable[[str, int, Optional[Question]], None]) -> None:
+    _write_listeners.append(listener)
+
+def _notify_write(db: Session, event: str, question_id: int, question: Optional[Question] = None) -> None:
+    # 在写线程中组提交时，等整批真正提交后再通知
+    after_commit(db, lambda: _run_write_listeners(event, question_id, question))
+
+def _run_write_listeners(event: str, question_id: int, question: Optional[Question]) -> None:
+    # 提交后立即作废已缓存的结果；内存索引更新期间读到新版本号的查询可能基于未更新完的索引，
+    # 全部回调结束后再递增一次，使这段时间写入的缓存条目也失效
+    query_cache.bump_version()
+    for listener in _write_listeners:
+        try:
+            listener(event, question_id, question)
+        except Exception:
+            # 内存索引出错不影响已提交的写入
+            logger.exception(f"题目写入回调失败: {event} {question_id}")
+    query_cache.bump_version()
 
 def get_question_by_title(db: Session, title: str) -> Optional[Question]:
-    """根据标题查找题目"""
-    return db.query(Question).filter(Question.title == title).first()
+    """根据标题查找题目，标题按 normalize_title 比较"""
+    return db.query(Question).filter(Question.title_key == normalize_title(title)).first()
+
+def get_or_create_tags(db: Session, names: List[str]) -> List[Tag]:
+    """按给定顺序返回标签对象，不存在的标签会被创建"""
+    names = normalize_tag_names(names)
+    if not names:
+        return []
+    
+    existing = {tag.name: tag for tag in db.query(Tag).filter(Tag.name.in_(names)).all()}
+    missing = [Tag(name=name, usage_count=0) for name in names if name not in existing]
+    if missing:
+        db.add_all(missing)
+        db.flush()
+        existing.update((tag.name, tag) for tag in missing)
+    
+    return [existing[name] for name in names]
+
+def set_question_tags(db: Session, db_question: Question, names: List[str]) -> None:
+    """替换题目的标签，保留已有关联以免删除后重新插入同一主键"""
+    tags = get_or_create_tags(db, names)
+    current = {link.tag_id: link for link in db_question.tag_links}
+    
+    links = []
+    for position, tag in enumerate(tags):
+        link = current.pop(tag.id, None)
+        if link is None:
+            link = QuestionTag(tag=tag)
+        link.position = position
+        links.append(link)
+    
+    db_question.tag_links = links
+
+def tag_filter(names: List[str]):
+    """筛选带有任一指定标签的题目，走 question_tags 的 (tag_id, question_id) 索引"""
+    return Question.id.in_(
+        select(QuestionTag.question_id)
+        .join(Tag, Tag.id == QuestionTag.tag_id)
+        .where(Tag.name.in_(names))
+    )
 
 def create_question(db: Session, question: QuestionCreate) -> Question:
     db_question = Question(
@@ -17,13 +91,125 @@ def create_question(db: Session, question: QuestionCreate) -> Question:
         category=question.category,
         difficulty=question.difficulty,
         analysis=question.analysis,
-        tags=json.dumps(question.tags) if question.tags else None
+        minhash=to_bytes(signature(question.title, question.content))
     )
+    set_question_tags(db, db_question, question.tags)
     db.add(db_question)
-    db.commit()
+    commit(db)
     db.refresh(db_question)
+    _notify_write(db, "create", db_question.id, db_question)
     return db_question
 
+# SQLite 单条语句的绑定参数个数有上限，IN 查询分块执行
+_IN_CHUNK = 500
+
+# 组提交批内已写入、尚未提交的题目签名：near_duplicate_index 要等提交后由写监听器更新，
+# 同一批内后面的写操作通过它和前面写入的题目比较
+_PENDING_SIGNATURES_KEY = "pending_minhash"
+
+def bulk_create_questions(
+    db: Session,
+    questions: List[QuestionCreate],
+    near_duplicates: str = "off",
+) -> Tuple[List[Question], List[str]]:
+    """批量去重并创建题目，返回 (新建的题目, 跳过的标题)
+    
+    标题按 normalize_title 比较：一次查询检查全部标题，剩余题目和标签关联在同一个事务中
+    各用一次 executemany 插入。并发写入同一标题时由 title_key 唯一索引和 INSERT OR IGNORE
+    兜底，被忽略的题目同样计入跳过的标题。
+    
+    near_duplicates 为 "reject" 时，与已有题目或批内前面的题目 MinHash 估计相似度达到
+    NEAR_DUPLICATE_THRESHOLD 的题目也会被跳过；为 "flag" 时照常保存，只记录警告日志。
+    已有题目包括同一组提交批内前面的写操作刚写入、尚未提交的题目。
+    """
+    candidates = {}
+    skipped_titles = []
+    for question in questions:
+        key = normalize_title(question.title)
+        if key in candidates:
+            skipped_titles.append(question.title)
+        else:
+            candidates[key] = question
+    
+    keys = list(candidates)
+    existing = set()
+    for start in range(0, len(keys), _IN_CHUNK):
+        existing.update(row[0] for row in db.query(Question.title_key).filter(
+            Question.title_key.in_(keys[start:start + _IN_CHUNK])
+        ))
+    skipped_titles.extend(candidates.pop(key).title for key in keys if key in existing)
+    
+    signatures = {key: signature(question.title, question.content) for key, question in candidates.items()}
+    if candidates and near_duplicates != "off":
+        near_duplicate_index.ensure_built(db)
+        found = find_batch_duplicates(
+            signatures.items(), near_duplicate_index, settings.NEAR_DUPLICATE_THRESHOLD,
+            pending=db.info.get(_PENDING_SIGNATURES_KEY),
+        )
+        for key, (match_id, score) in found.items():
+            title = candidates[key].title
+            match = f"题目 {match_id}" if match_id is not None else "同批题目"
+            if near_duplicates == "reject":
+                logger.info(f"跳过近似重复题目: {title}（与{match}的相似度 {score:.2f}）")
+                skipped_titles.append(candidates.pop(key).title)
+            else:
+                logger.warning(f"疑似近似重复题目: {title}（与{match}的相似度 {score:.2f}）")
+    if not candidates:
+        return [], skipped_titles
+    
+    try:
+        inserted = db.execute(
+            insert(Question).prefix_with("OR IGNORE").returning(Question.id, Question.title_key),
+            [
+                {
+                    "title": question.title,
+                    "title_key": key,
+                    "content": question.content,
+                    "excerpt": make_excerpt(question.content),
+                    "category": question.category,
+                    "difficulty": question.difficulty,
+                    "analysis": question.analysis,
+                    "minhash": to_bytes(signatures[key]),
+                }
+                for key, question in candidates.items()
+            ],
+        ).all()
+        ids = {key: question_id for question_id, key in inserted}
+        
+        # 只为实际插入的题目解析标签，被 INSERT OR IGNORE 忽略的题目不会留下未使用的新标签
+        tag_names = {key: normalize_tag_names(candidates[key].tags) for key in ids}
+        tags = {tag.name: tag for tag in get_or_create_tags(db, [name for names in tag_names.values() for name in names])}
+        links = [
+            {"question_id": ids[key], "tag_id": tags[name].id, "position": position}
+            for key, names in tag_names.items()
+            for position, name in enumerate(names)
+        ]
+        if links:
+            db.execute(insert(QuestionTag), links)
+        commit(db)
+    except Exception:
+        rollback(db)
+        raise
+    
+    skipped_titles.extend(question.title for key, question in candidates.items() if key not in ids)
+    if in_group_commit(db):
+        pending = db.info.setdefault(_PENDING_SIGNATURES_KEY, MinHashLSH())
+        for key, question_id in ids.items():
+            pending.add(question_id, signatures[key])
+    created = get_questions_by_ids(db, [ids[key] for key in candidates if key in ids])
+    for question in created:
+        _notify_write(db, "create", question.id, question)
+    return created, skipped_titles
+
+def save_generated_questions(db: Session, questions: List[QuestionCreate]) -> Tuple[List[Question], List[str]]:
+    """保存 AI 生成的题目，跳过标题已存在的题目，返回 (已保存的题目, 跳过的标题)"""
+    saved_questions, skipped_titles = bulk_create_questions(
+        db, questions, near_duplicates=settings.NEAR_DUPLICATE_MODE
+    )
+    if skipped_titles:
+        logger.info(f"AI生成题目去重: 跳过了 {len(skipped_titles)} 个重复标题: {skipped_titles}")
+    return saved_questions, skipped_titles
+
 def get_question(db: Session, question_id: int) -> Optional[Question]:
     return db.query(Question).filter(Question.id == question_id).first()
 
@@ -39,14 +225,17 @@ def update_question(db: Session, question_id: int, question: QuestionUpdate) ->
         return None
     
     update_data = question.dict(exclude_unset=True)
-    if "tags" in update_data and update_data["tags"] is not None:
-        update_data["tags"] = json.dumps(update_data["tags"])
+    if "tags" in update_data:
+        set_question_tags(db, db_question, update_data.pop("tags") or [])
     
     for field, value in update_data.items():
         setattr(db_question, field, value)
+    if "title" in update_data or "content" in update_data:
+        db_question.minhash = to_bytes(signature(db_question.title, db_question.content))
     
-    db.commit()
+    commit(db)
     db.refresh(db_question)
+    _notify_write(db, "update", db_question.id, db_question)
     return db_question
 
 def delete_question(db: Session, question_id: int) -> bool:
@@ -55,21 +244,53 @@ def delete_question(db: Session, question_id: int) -> bool:
         return False
     
     db.delete(db_question)
-    db.commit()
+    commit(db)
+    _notify_write(db, "delete", question_id)
     return True
 
-def search_questions(db: Session, params: QuestionSearchParams) -> tuple:
+def encode_cursor(sort_key: Optional[float], last_id: int) -> str:
+    """把最后一条记录的 (排序键, id) 编码成不透明的游标"""
+    raw = json.dumps([sort_key, last_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Optional[float], int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_key, last_id = json.loads(raw)
+        if sort_key is not None:
+            sort_key = float(sort_key)
+        if not isinstance(last_id, int):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise ValueError("无效的分页游标")
+    return sort_key, last_id
+
+def _build_search_query(db: Session, params: QuestionSearchParams) -> tuple:
+    """构造带筛选条件的查询，全文检索时同时返回排序用的 FTS 子查询"""
     query = db.query(Question)
+    ranked = None
     
     if params.q:
-        search_term = f"%{params.q}%"
-        query = query.filter(
-            or_(
-                Question.title.ilike(search_term),
-                Question.content.ilike(search_term),
-                Question.analysis.ilike(search_term)
-            )
-        )
+        long_terms, short_terms = search_index.split_terms(params.q)
+        if search_index.is_enabled() and long_terms:
+            # 走 FTS5 索引，按 BM25 相关度排序并附带高亮片段
+            sql, binds = search_index.build_ranked_query(long_terms, short_terms)
+            ranked = text(sql).bindparams(**binds).columns(
+                id=Integer, rank=Float, snippet=String
+            ).subquery("ranked")
+            query = db.query(Question, ranked.c.rank, ranked.c.snippet) \
+                .join(ranked, ranked.c.id == Question.id)
+        else:
+            dialect = db.get_bind().dialect.name
+            for term in long_terms + short_terms:
+                search_term = f"%{term}%"
+                query = query.filter(
+                    or_(
+                        Question.title.ilike(search_term),
+                        plain_text(Question.content, dialect).ilike(search_term),
+                        plain_text(Question.analysis, dialect).ilike(search_term)
+                    )
+                )
     
     if params.category:
         query = query.filter(Question.category == params.category)
@@ -77,7 +298,195 @@ def search_questions(db: Session, params: QuestionSearchParams) -> tuple:
     if params.difficulty:
         query = query.filter(Question.difficulty == params.difficulty)
     
-    total = query.count()
-    questions = query.offset((params.page - 1) * params.size).limit(params.size).all()
+    if params.tag:
+        query = query.filter(tag_filter([params.tag]))
+    
+    return query, ranked
+
+# 列表默认不加载的大字段，通过 fields 显式请求
+DEFERRED_FIELDS = ("content", "analysis")
+
+def question_load_options(fields: Optional[Sequence[str]]) -> list:
+    """列表查询的加载选项：fields 中没有的 content / analysis 不出现在 SELECT 里
+
+    使用 raiseload，访问未加载的字段直接报错而不是再查一次（异步会话中隐式查询也无法执行）；
+    fields 为 None 时加载完整题目。
+    """
+    if fields is None:
+        return []
+    return [defer(getattr(Question, name), raiseload=True) for name in DEFERRED_FIELDS if name not in fields]
+
+def search_questions(db: Session, params: QuestionSearchParams) -> tuple:
+    """搜索题目，返回 (题目列表, 总数, 下一页游标)
+
+    传入 cursor 时按 (排序键, id) 做 keyset 分页，不再扫描前面的记录；
+    此时只有 with_total 为 True 才计算总数，否则总数为 None。
+    """
+    query, ranked = _build_search_query(db, params)
+    
+    total = None
+    if not params.cursor or params.with_total:
+        total = query.count()
+    
+    if params.cursor:
+        last_rank, last_id = decode_cursor(params.cursor)
+        if ranked is not None and last_rank is not None:
+            query = query.filter(or_(
+                ranked.c.rank > last_rank,
+                and_(ranked.c.rank == last_rank, Question.id > last_id)
+            ))
+        else:
+            query = query.filter(Question.id > last_id)
+    
+    if ranked is not None:
+        query = query.order_by(ranked.c.rank, Question.id)
+    else:
+        query = query.order_by(Question.id)
+    
+    if not params.cursor:
+        query = query.offset((params.page - 1) * params.size)
+    
+    # 多取一条用于判断是否还有下一页
+    rows = query.options(*question_load_options(params.fields)).limit(params.size + 1).all()
+    has_more = len(rows) > params.size
+    rows = rows[:params.size]
+    
+    if ranked is None:
+        questions = rows
+        last_rank = None
+    else:
+        questions = []
+        for question, rank, snippet in rows:
+            question.snippet = snippet
+            questions.append(question)
+        last_rank = rows[-1][1] if rows else None
+    
+    next_cursor = encode_cursor(last_rank, questions[-1].id) if has_more else None
+    
+    return questions, total, next_cursor
+
+def _fuzzy_ranked_ids(
+    db: Session,
+    params: QuestionSearchParams,
+    ranked: Optional[List[Tuple[int, float]]] = None
+) -> List[Tuple[int, float]]:
+    """容错搜索命中的 (id, 得分)，已按相似度排序并应用类别/难度/标签筛选
+
+    ranked 为调用方已算好的 fuzzy_index.search(params.q) 结果（异步路径在线程池中计算）。
+    """
+    if ranked is None:
+        ranked = fuzzy_index.search(params.q)
+    if not ranked or not (params.category or params.difficulty or params.tag):
+        return ranked
+    
+    query, _ = _build_search_query(db, params.model_copy(update={"q": None}))
+    allowed = {
+        row[0] for row in query.with_entities(Question.id)
+        .filter(Question.id.in_([question_id for question_id, _ in ranked]))
+    }
+    return [(question_id, score) for question_id, score in ranked if question_id in allowed]
+
+def get_questions_by_ids(
+    db: Session,
+    question_ids: List[int],
+    fields: Optional[Sequence[str]] = None
+) -> List[Question]:
+    """按给定 id 的顺序加载题目（一次 IN 查询），已删除的题目跳过；fields 见 question_load_options"""
+    if not question_ids:
+        return []
+    query = db.query(Question).options(*question_load_options(fields)).filter(Question.id.in_(question_ids))
+    rows = {question.id: question for question in query}
+    return [rows[question_id] for question_id in question_ids if question_id in rows]
+
+def get_ranked_questions(
+    db: Session,
+    ranked: List[Tuple[int, float]],
+    fields: Optional[Sequence[str]] = None
+) -> List[Question]:
+    """按 (id, 得分) 列表的顺序加载题目并设置 score，已删除的题目跳过"""
+    scores = dict(ranked)
+    questions = get_questions_by_ids(db, [question_id for question_id, _ in ranked], fields)
+    for question in questions:
+        question.score = scores[question.id]
+    return questions
+
+def fuzzy_search_questions(
+    db: Session,
+    params: QuestionSearchParams,
+    ranked: Optional[List[Tuple[int, float]]] = None
+) -> tuple:
+    """基于 trigram 内存索引的容错搜索，返回值与 search_questions 相同；ranked 见 _fuzzy_ranked_ids"""
+    ranked = _fuzzy_ranked_ids(db, params, ranked)
+    total = len(ranked)
+    
+    if params.cursor:
+        last_score, last_id = decode_cursor(params.cursor)
+        start = next((i + 1 for i, (question_id, _) in enumerate(ranked) if question_id == last_id), None)
+        if start is None:
+            # 上一页最后一条已不在结果中，从得分更低的位置继续
+            start = next((i for i, (_, score) in enumerate(ranked) if score < (last_score or 0)), total)
+    else:
+        start = (params.page - 1) * params.size
+    
+    page = ranked[start:start + params.size]
+    questions = get_ranked_questions(db, page, params.fields)
+    
+    next_cursor = None
+    if page and start + params.size < total:
+        next_cursor = encode_cursor(page[-1][1], page[-1][0])
+    
+    return questions, total, next_cursor
+
+def get_facet_counts(
+    db: Session,
+    params: Optional[QuestionSearchParams] = None,
+    fuzzy_ranked: Optional[List[Tuple[int, float]]] = None
+) -> List[tuple]:
+    """返回 (类别, 难度, 数量) 列表
+
+    只按类别/难度筛选时直接读取触发器维护的 question_facets 聚合表；
+    有搜索词或标签筛选时在命中结果上分组计数。fuzzy_ranked 见 _fuzzy_ranked_ids。
+    """
+    if params is not None and params.q and params.mode == SearchMode.FUZZY:
+        ids = [question_id for question_id, _ in _fuzzy_ranked_ids(db, params, fuzzy_ranked)]
+        return db.query(Question.category, Question.difficulty, func.count(Question.id)) \
+            .filter(Question.id.in_(ids)) \
+            .group_by(Question.category, Question.difficulty).all()
+    
+    if params is None or not (params.q or params.tag):
+        query = db.query(QuestionFacet.category, QuestionFacet.difficulty, QuestionFacet.count) \
+            .filter(QuestionFacet.count > 0)
+        if params is not None and params.category:
+            query = query.filter(QuestionFacet.category == params.category)
+        if params is not None and params.difficulty:
+            query = query.filter(QuestionFacet.difficulty == params.difficulty)
+        return query.all()
+    
+    query, _ = _build_search_query(db, params)
+    return query.with_entities(Question.category, Question.difficulty, func.count(Question.id)) \
+        .group_by(Question.category, Question.difficulty).all()
+
+def get_tag_counts(
+    db: Session,
+    params: Optional[QuestionSearchParams] = None,
+    limit: int = 100
+) -> List[tuple]:
+    """返回按使用次数降序的 (标签, 数量) 列表
+
+    无筛选条件时直接读取增量维护的 tags.usage_count，否则在命中结果上分组计数。
+    """
+    if params is None or not (params.q or params.category or params.difficulty or params.tag):
+        return db.query(Tag.name, Tag.usage_count) \
+            .filter(Tag.usage_count > 0) \
+            .order_by(Tag.usage_count.desc(), Tag.name) \
+            .limit(limit).all()
     
-    return questions, total
+    query, _ = _build_search_query(db, params)
+    matched_ids = query.with_entities(Question.id).subquery()
+    count = func.count(QuestionTag.question_id)
+    return db.query(Tag.name, count) \
+        .join(QuestionTag, QuestionTag.tag_id == Tag.id) \
+        .join(matched_ids, matched_ids.c.id == QuestionTag.question_id) \
+        .group_by(Tag.name) \
+        .order_by(count.desc(), Tag.name) \
+        .limit(limit).all()
@@ -0,0 +1,117 @@
+"""crud 的异步版本，供 async def 路由使用
+
+读操作在只读 AsyncSession 上通过 run_sync 执行 crud 中对应的同步实现：SQL 经 aiosqlite
+执行，等待数据库时让出事件循环，不占用线程池。写操作不需要会话，交给 db_writer 的写线程
+排队执行并组提交。查询构造、去重、缓存失效和内存索引维护仍只有 crud 一份实现，同步路径
+（后台任务、命令行）与异步路径行为一致。
+
+run_sync 中的同步代码在事件循环线程上执行，只适合查询构造和结果处理这类轻量工作。
+内存索引上的计算（fuzzy_index 容错排序、random_sampler 构建和抽样）可能耗时较长且会
+获取线程锁，这里先用 asyncio.to_thread 在线程池中算好，再把结果交给 run_sync 查询数据库；
+路由中的 TF-IDF 相似度计算（similarity_index）同样经 asyncio.to_thread 执行。
+"""
+import asyncio
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.models import DifficultyLevel, Question, QuestionCategory
+from app.schemas import InterviewSessionRequest, QuestionCreate, QuestionUpdate, QuestionSearchParams, SearchMode
+from app.services.db_writer import db_writer
+from app.services.fuzzy import fuzzy_index
+from app.services.interview import select_interview_ids
+from app.services.sampler import random_sampler
+
+
+async def get_question_by_title(db: AsyncSession, title: str) -> Optional[Question]:
+    return await db.run_sync(crud.get_question_by_title, title)
+
+async def create_question(question: QuestionCreate) -> Question:
+    return await db_writer.run_async(crud.create_question, question)
+
+async def bulk_create_questions(
+    questions: List[QuestionCreate],
+    near_duplicates: str = "off",
+) -> Tuple[List[Question], List[str]]:
+    return await db_writer.run_async(crud.bulk_create_questions, questions, near_duplicates)
+
+async def save_generated_questions(questions: List[QuestionCreate]) -> Tuple[List[Question], List[str]]:
+    return await db_writer.run_async(crud.save_generated_questions, questions)
+
+async def get_question(db: AsyncSession, question_id: int) -> Optional[Question]:
+    return await db.run_sync(crud.get_question, question_id)
+
+async def get_questions(db: AsyncSession, skip: int = 0, limit: int = 10) -> List[Question]:
+    return await db.run_sync(crud.get_questions, skip, limit)
+
+async def get_questions_count(db: AsyncSession) -> int:
+    return await db.run_sync(crud.get_questions_count)
+
+async def update_question(question_id: int, question: QuestionUpdate) -> Optional[Question]:
+    return await db_writer.run_async(crud.update_question, question_id, question)
+
+async def delete_question(question_id: int) -> bool:
+    return await db_writer.run_async(crud.delete_question, question_id)
+
+async def search_questions(db: AsyncSession, params: QuestionSearchParams) -> tuple:
+    return await db.run_sync(crud.search_questions, params)
+
+async def fuzzy_search_questions(db: AsyncSession, params: QuestionSearchParams) -> tuple:
+    ranked = await asyncio.to_thread(fuzzy_index.search, params.q)
+    return await db.run_sync(crud.fuzzy_search_questions, params, ranked)
+
+async def get_questions_by_ids(
+    db: AsyncSession,
+    question_ids: List[int],
+    fields: Optional[Sequence[str]] = None
+) -> List[Question]:
+    return await db.run_sync(crud.get_questions_by_ids, question_ids, fields)
+
+async def get_ranked_questions(
+    db: AsyncSession,
+    ranked: List[Tuple[int, float]],
+    fields: Optional[Sequence[str]] = None
+) -> List[Question]:
+    return await db.run_sync(crud.get_ranked_questions, ranked, fields)
+
+async def get_facet_counts(db: AsyncSession, params: Optional[QuestionSearchParams] = None) -> List[tuple]:
+    fuzzy_ranked = None
+    if params is not None and params.q and params.mode == SearchMode.FUZZY:
+        fuzzy_ranked = await asyncio.to_thread(fuzzy_index.search, params.q)
+    return await db.run_sync(crud.get_facet_counts, params, fuzzy_ranked)
+
+async def get_tag_counts(
+    db: AsyncSession,
+    params: Optional[QuestionSearchParams] = None,
+    limit: int = 100
+) -> List[tuple]:
+    return await db.run_sync(crud.get_tag_counts, params, limit)
+
+async def ensure_sampler_built(db: AsyncSession) -> None:
+    """抽样器未构建时构建：在只读会话上加载数据，在线程池中建立 id 池"""
+    if not random_sampler.built:
+        rows, tag_rows = await db.run_sync(random_sampler.load_rows)
+        await asyncio.to_thread(random_sampler.build_from_rows, rows, tag_rows)
+
+async def sample_question_ids(
+    db: AsyncSession,
+    count: int,
+    categories: Optional[Iterable[QuestionCategory]] = None,
+    difficulties: Optional[Iterable[DifficultyLevel]] = None,
+    tags: Optional[Iterable[str]] = None
+) -> List[int]:
+    await ensure_sampler_built(db)
+    return await asyncio.to_thread(
+        random_sampler.sample, count, categories=categories, difficulties=difficulties, tags=tags
+    )
+
+async def build_interview_session(
+    db: AsyncSession,
+    request: InterviewSessionRequest,
+    fields: Optional[Sequence[str]] = None
+) -> List[Question]:
+    """与 interview.build_interview_session 相同：抽样在线程池中执行，再按 id 加载题目"""
+    await ensure_sampler_built(db)
+    selected_ids = await asyncio.to_thread(select_interview_ids, request)
+    return await get_questions_by_ids(db, selected_ids, fields)
@@ -1,11 +1,15 @@
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
+from app.services.compression import register_sql_functions
 
 # SQLite 连接配置，启用 WAL 模式和更好的并发支持
 engine = create_engine(
-    settings.DATABASE_URL, 
+    settings.DATABASE_URL,
     connect_args={
         "check_same_thread": False,
         "timeout": 30  # 增加超时时间，避免锁定问题
@@ -14,16 +18,78 @@ engine = create_engine(
     echo=False
 )
 
+# 写入专用引擎：只由 GroupCommitWriter 的写线程使用，始终只有一个连接
+write_engine = create_engine(
+    settings.DATABASE_URL,
+    connect_args={"check_same_thread": False, "timeout": 30},
+    pool_size=1,
+    max_overflow=0,
+    echo=False
+)
+
+def _is_file_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+def _read_only_url(url: str):
+    """同一个数据库的只读异步地址：SQLite 文件数据库使用 aiosqlite 以 mode=ro 打开，
+    其他数据库需在 DATABASE_URL 中直接指定异步驱动
+    """
+    parsed = make_url(url)
+    if not _is_file_sqlite(parsed):
+        return parsed
+    return parsed.set(
+        drivername="sqlite+aiosqlite",
+        database=f"file:{parsed.database}",
+        query={**parsed.query, "mode": "ro", "uri": "true"},
+    )
+
+# 请求处理使用的只读异步引擎：数据库等待不占用线程池；写操作统一交给 GroupCommitWriter。
+# aiosqlite 默认不复用连接（每次新建连接和后台线程），这里改用连接池；WAL 模式下读不受写锁影响
+read_engine = create_async_engine(
+    _read_only_url(settings.DATABASE_URL),
+    connect_args={"timeout": 30},
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=10,
+    max_overflow=40,
+    echo=False
+)
+
 # 为 SQLite 启用 WAL 模式，提高并发性能
 @event.listens_for(engine, "connect")
+@event.listens_for(write_engine, "connect")
 def set_sqlite_pragma(dbapi_conn, connection_record):
     cursor = dbapi_conn.cursor()
     cursor.execute("PRAGMA journal_mode=WAL")
     cursor.execute("PRAGMA synchronous=NORMAL")
     cursor.execute("PRAGMA busy_timeout=30000")  # 30秒的忙等待超时
     cursor.close()
+    # 全文索引触发器通过 md_text() 读取压缩列的明文
+    register_sql_functions(dbapi_conn)
+
+@event.listens_for(read_engine.sync_engine, "connect")
+def set_read_only_pragma(dbapi_conn, connection_record):
+    # 只读连接不修改 journal_mode；query_only 让误写入直接报错，而不是去争抢写锁
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.close()
+    register_sql_functions(dbapi_conn)
+
+if write_engine.dialect.name == "sqlite":
+    # pysqlite 默认在第一条 DML 前才隐式开启事务，SAVEPOINT 无法正常工作；改为由 begin 事件
+    # 发出 BEGIN IMMEDIATE，事务一开始就拿到写锁，批内每个操作可以回滚到自己的 SAVEPOINT
+    @event.listens_for(write_engine, "connect")
+    def disable_implicit_transactions(dbapi_conn, connection_record):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(write_engine, "begin")
+    def begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+WriteSessionLocal = sessionmaker(autoflush=False, expire_on_commit=False, bind=write_engine)
+# 提交后不使对象过期：异步会话中访问过期属性会触发隐式 IO，响应序列化时无法进行
+ReadSessionLocal = async_sessionmaker(read_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 def get_db():
@@ -31,4 +97,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_read_db():
+    async with ReadSessionLocal() as db:
+        yield db
@@ -1,27 +1,91 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.config import settings
-from app.database import engine, Base
-from app.api import questions, ai_questions, random_questions, interview_session
+from app.database import engine, read_engine, write_engine, SessionLocal
+from app import crud
+from app.api import questions, ai_questions, random_questions, interview_session, tags
+from app.migrations import current_revision, head_revision, upgrade_database
+from app.services.compression import load_dictionaries
+from app.services.search_index import ensure_search_index
+from app.services.minhash import near_duplicate_index
+from app.services.suggest import suggest_index
+from app.services.fuzzy import fuzzy_index
+from app.services.similar import similarity_index, fingerprint
+from app.services.sampler import random_sampler
+from app.services.ai_jobs import ai_job_runner
+from app.services.db_writer import db_writer
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+# 升级数据库结构（建表、索引、触发器等，见 alembic/versions）
+if settings.AUTO_MIGRATE:
+    upgrade_database(engine)
+elif current_revision(engine) != head_revision():
+    print(f"Database revision {current_revision(engine)} is behind {head_revision()}, "
+          "run `python manage.py migrate`")
+
+# 加载 content / analysis 的压缩字典，解压时只查内存
+load_dictionaries(engine)
+
+# 创建全文索引及同步触发器；FTS5 是否可用取决于运行时的 SQLite，每次启动检测
+ensure_search_index(engine)
+
+# 写操作提交后增量更新内存索引
+crud.add_write_listener(suggest_index.on_question_write)
+crud.add_write_listener(fuzzy_index.on_question_write)
+crud.add_write_listener(similarity_index.on_question_write)
+crud.add_write_listener(random_sampler.on_question_write)
+crud.add_write_listener(near_duplicate_index.on_question_write)
+
+def build_memory_indexes():
+    """启动时构建内存索引"""
+    db = SessionLocal()
+    try:
+        suggest_index.build(db)
+        fuzzy_index.build(db)
+        random_sampler.build(db)
+        near_duplicate_index.build(db)
+        similarity_index.load_or_build(db, settings.SIMILARITY_INDEX_PATH)
+    finally:
+        db.close()
+
+def save_memory_indexes():
+    """关闭时持久化相似题目矩阵，下次启动直接加载"""
+    if not settings.SIMILARITY_INDEX_PATH:
+        return
+    db = SessionLocal()
+    try:
+        similarity_index.save(settings.SIMILARITY_INDEX_PATH, fingerprint(db))
+    except OSError as e:
+        print(f"Failed to save similarity index: {e}")
+    finally:
+        db.close()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 启动时的操作
     print("Starting Interview Question Bank API...")
+    build_memory_indexes()
+    db_writer.start()
+    ai_job_runner.start()
     yield
     # 关闭时的操作
     print("Shutting down API...")
+    ai_job_runner.shutdown()
+    # 等写线程处理完已排队的写操作
+    db_writer.shutdown()
+    save_memory_indexes()
+    await read_engine.dispose()
+    write_engine.dispose()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version="1.0.0",
     description="面试题库管理系统API",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # 响应统一用 orjson 编码；题目相关路由直接返回 schemas.dump_question* 生成的 dict
+    default_response_class=ORJSONResponse
 )
 
 # 配置CORS
@@ -58,6 +122,12 @@ app.include_router(
     tags=["interview"]
 )
 
+app.include_router(
+    tags.router,
+    prefix=f"{settings.API_V1_STR}/tags",
+    tags=["tags"]
+)
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Interview Question Bank API", "version": "1.0.0"}
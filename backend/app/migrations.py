@@ -0,0 +1,57 @@
+"""数据库结构迁移（Alembic），迁移脚本位于 backend/alembic/versions
+
+启动时和 `python manage.py migrate` 都通过 upgrade_database 升级到最新版本，
+也可以在 backend 目录下直接使用 alembic 命令（alembic upgrade head、alembic current 等）。
+未版本化的旧数据库（引入迁移之前创建，已有 questions 表）就是 0001 的结构，upgrade_database
+会先把它标记为 0001；直接使用 alembic 命令时需要先执行 alembic stamp 0001。
+"""
+import logging
+import os
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALEMBIC_INI = os.path.join(BACKEND_DIR, "alembic.ini")
+# 引入迁移之前的原始表结构
+BASELINE_REVISION = "0001"
+
+
+def alembic_config(engine: Optional[Engine] = None) -> Config:
+    """读取 alembic.ini；传入 engine 时 env.py 使用它而不是 DATABASE_URL 新建引擎"""
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    if engine is not None:
+        config.attributes["engine"] = engine
+    return config
+
+
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(engine: Engine) -> Optional[str]:
+    """数据库当前的迁移版本，未做过迁移的数据库返回 None"""
+    with engine.connect() as conn:
+        return MigrationContext.configure(conn).get_current_revision()
+
+
+def upgrade_database(engine: Engine, revision: str = "head") -> Optional[str]:
+    """把数据库升级到指定版本，返回升级后的版本"""
+    before = current_revision(engine)
+    config = alembic_config(engine)
+    if before is None and inspect(engine).has_table("questions"):
+        command.stamp(config, BASELINE_REVISION)
+        logger.info(f"未版本化的旧数据库已标记为 {BASELINE_REVISION}")
+    command.upgrade(config, revision)
+    after = current_revision(engine)
+    if after != before:
+        logger.info(f"数据库已迁移: {before or '(未版本化)'} -> {after}")
+    return after
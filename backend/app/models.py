@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Enum, ForeignKey, Index, JSON, LargeBinary
+from sqlalchemy.orm import deferred, relationship, validates
 from sqlalchemy.sql import func
 from app.database import Base
+from app.services.compression import CompressedText
+from app.services.textutil import make_excerpt, normalize_title
 import enum
 
 class DifficultyLevel(str, enum.Enum):
@@ -22,18 +25,128 @@ class QuestionCategory(str, enum.Enum):
     REACT_NATIVE = "react_native"
     REACT = "react"
 
+class JobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
 class Question(Base):
     __tablename__ = "questions"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     title = Column(String(200), nullable=False, index=True)
-    content = Column(Text, nullable=False)
+    # 规范化后的标题（见 normalize_title），唯一索引保证并发写入时也不会重复
+    title_key = Column(String(200), nullable=True)
+    # content / analysis 可按 MARKDOWN_COMPRESSION 压缩保存（见 services/compression.py）
+    content = Column(CompressedText, nullable=False)
     category = Column(Enum(QuestionCategory), nullable=False, index=True)
     difficulty = Column(Enum(DifficultyLevel), nullable=False, index=True)
-    analysis = Column(Text, nullable=True)
-    tags = Column(String(500), nullable=True)  # JSON string of tags
+    analysis = Column(CompressedText, nullable=True)
+    # 正文开头的纯文本摘录（见 make_excerpt），列表摘要用它代替正文，不需要读取 content
+    excerpt = Column(String(200), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # 标题和正文的 MinHash 签名，用于近似重复检测（见 services/minhash.py），普通查询不加载
+    minhash = deferred(Column(LargeBinary, nullable=True))
+    
+    # 标签关联按录入顺序排列，列表查询时用一次 IN 查询批量加载
+    tag_links = relationship(
+        "QuestionTag",
+        order_by="QuestionTag.position",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+    )
+    
+    __table_args__ = (
+        Index("ux_questions_title_key", "title_key", unique=True),
+        # 同时按类别和难度筛选并按 id 翻页（列表、keyset 分页），也是抽题索引构建时的覆盖索引
+        Index("ix_questions_category_difficulty_id", "category", "difficulty", "id"),
+    )
+    
+    @validates("title")
+    def _set_title_key(self, key, title):
+        self.title_key = normalize_title(title)
+        return title
+    
+    @validates("content")
+    def _set_excerpt(self, key, content):
+        self.excerpt = make_excerpt(content)
+        return content
+    
+    @property
+    def tags(self):
+        return [link.tag.name for link in self.tag_links]
     
     def __repr__(self):
         return f"<Question(id={self.id}, title='{self.title}', category={self.category}, difficulty={self.difficulty})>"
+
+class Tag(Base):
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False, unique=True, index=True)
+    usage_count = Column(Integer, nullable=False, default=0)  # 由 question_tags 上的触发器维护
+
+    __table_args__ = (
+        # 标签云按使用次数降序、名称升序取前 N 个
+        Index("ix_tags_usage_count_name", usage_count.desc(), "name"),
+    )
+
+    def __repr__(self):
+        return f"<Tag(id={self.id}, name='{self.name}', usage_count={self.usage_count})>"
+
+class QuestionTag(Base):
+    __tablename__ = "question_tags"
+
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, nullable=False, default=0)
+
+    tag = relationship("Tag", lazy="joined")
+
+    __table_args__ = (
+        # 按标签查题目
+        Index("ix_question_tags_tag_id_question_id", "tag_id", "question_id"),
+    )
+
+class QuestionFacet(Base):
+    """按 (类别, 难度) 预聚合的题目数量，由 questions 表上的触发器增量维护"""
+    __tablename__ = "question_facets"
+
+    category = Column(Enum(QuestionCategory), primary_key=True)
+    difficulty = Column(Enum(DifficultyLevel), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class CompressionDictionary(Base):
+    """content / analysis 压缩使用的 zlib 预置字典，id 递增，最大的一个用于压缩新数据；压缩数据按 id 引用，不删除"""
+    __tablename__ = "compression_dictionaries"
+
+    id = Column(Integer, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    sample_count = Column(Integer, nullable=False, default=0)  # 训练使用的文本段数
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class AIJob(Base):
+    """AI 生成题目任务，状态持久化在数据库中，重启后未完成的任务会重新执行"""
+    __tablename__ = "ai_jobs"
+
+    id = Column(String(32), primary_key=True)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.PENDING)
+    category = Column(Enum(QuestionCategory), nullable=False)
+    difficulty = Column(Enum(DifficultyLevel), nullable=False)
+    count = Column(Integer, nullable=False)
+    question_ids = Column(JSON, nullable=False, default=list)  # 保存成功的题目 id
+    skipped_titles = Column(JSON, nullable=False, default=list)  # 因标题重复跳过的题目
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # 统计和恢复未完成的任务（status IN (...)，按创建时间排序）
+        Index("ix_ai_jobs_status_created_at", "status", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<AIJob(id={self.id}, status={self.status})>"
@@ -1,8 +1,12 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+from typing import Optional, List, Dict, Sequence, Tuple
 from datetime import datetime
-from app.models import DifficultyLevel, QuestionCategory
-import json
+from app.models import DifficultyLevel, JobStatus, QuestionCategory
+import enum
+
+class SearchMode(str, enum.Enum):
+    FULLTEXT = "fulltext"  # FTS5 全文检索，按 BM25 排序
+    FUZZY = "fuzzy"        # trigram 容错匹配标题和标签，按相似度排序
 
 class QuestionBase(BaseModel):
     title: str = Field(..., min_length=1, max_length=200)
@@ -27,45 +31,301 @@ class QuestionResponse(QuestionBase):
     id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
+    snippet: Optional[str] = None  # 全文搜索命中的高亮片段
+    score: Optional[float] = None  # 容错搜索或相似题目的相似度得分
     
     @field_validator('tags', mode='before')
     @classmethod
     def parse_tags(cls, v):
-        if isinstance(v, str):
-            try:
-                return json.loads(v)
-            except:
-                return []
-        return v if v else []
+        return list(v) if v else []
     
     class Config:
         from_attributes = True
 
-class QuestionListResponse(BaseModel):
-    items: List[QuestionResponse]
+# 列表摘要之外，可以通过 fields=（逗号分隔）选择返回的字段
+QUESTION_OPTIONAL_FIELDS = ("content", "analysis", "created_at", "updated_at")
+
+def parse_question_fields(value: Optional[str]) -> Tuple[str, ...]:
+    """解析 fields 参数，返回去重后按 QUESTION_OPTIONAL_FIELDS 顺序排列的字段名"""
+    names = {name.strip() for name in (value or "").split(",") if name.strip()}
+    unknown = names.difference(QUESTION_OPTIONAL_FIELDS)
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(sorted(unknown))}（可选 {', '.join(QUESTION_OPTIONAL_FIELDS)}）")
+    return tuple(name for name in QUESTION_OPTIONAL_FIELDS if name in names)
+
+class QuestionSummary(BaseModel):
+    """列表项。默认只有摘要字段，fields= 请求的字段才会出现在响应中（由 dump_question_summary 生成）"""
+    id: int
+    title: str
+    category: QuestionCategory
+    difficulty: DifficultyLevel
+    tags: List[str] = []
+    snippet: Optional[str] = None  # 全文搜索时为高亮片段，否则为正文开头的摘录
+    score: Optional[float] = None  # 容错搜索或相似题目的相似度得分
+    content: Optional[str] = None
+    analysis: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+def _json_datetime(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+# 输出题目字段时的取值函数，结果与对应 pydantic 模型 model_dump(mode="json") 一致
+_QUESTION_FIELD_GETTERS = {
+    "content": lambda question: question.content,
+    "analysis": lambda question: question.analysis,
+    "created_at": lambda question: _json_datetime(question.created_at),
+    "updated_at": lambda question: _json_datetime(question.updated_at),
+}
+
+def _score(question) -> Optional[float]:
+    score = getattr(question, "score", None)
+    return float(score) if score is not None else None
+
+def dump_question_summary(question, fields: Sequence[str] = ()) -> dict:
+    """把 Question 行直接转换为 QuestionSummary 形状的 dict，不经过 pydantic 校验
+
+    只读取摘要字段和 fields 中的字段（未加载的 content / analysis 不会被访问），
+    未请求的可选字段不输出，与 QuestionSummary 按 exclude_unset 输出的结果相同。
+    """
+    data = {
+        "id": question.id,
+        "title": question.title,
+        "category": question.category.value,
+        "difficulty": question.difficulty.value,
+        "tags": question.tags,
+        "snippet": getattr(question, "snippet", None) or question.excerpt,
+        "score": _score(question),
+    }
+    for name in fields:
+        data[name] = _QUESTION_FIELD_GETTERS[name](question)
+    return data
+
+def dump_question(question) -> dict:
+    """把 Question 行直接转换为 QuestionResponse 形状的 dict（题目详情），不经过 pydantic 校验"""
+    return {
+        "title": question.title,
+        "content": question.content,
+        "category": question.category.value,
+        "difficulty": question.difficulty.value,
+        "analysis": question.analysis,
+        "tags": question.tags,
+        "id": question.id,
+        "created_at": _json_datetime(question.created_at),
+        "updated_at": _json_datetime(question.updated_at),
+        "snippet": getattr(question, "snippet", None),
+        "score": _score(question),
+    }
+
+class FacetCounts(BaseModel):
     total: int
-    page: int
+    categories: Dict[str, int]
+    difficulties: Dict[str, int]
+    matrix: Dict[str, Dict[str, int]]  # 类别 -> 难度 -> 数量
+    tags: Optional[Dict[str, int]] = None  # 请求 with_tags=true 时返回，按数量降序
+
+class TagResponse(BaseModel):
+    name: str
+    count: int
+
+class QuestionListResponse(BaseModel):
+    items: List[QuestionSummary]
+    total: Optional[int] = None  # 游标分页且未请求总数时为空
+    page: Optional[int] = None  # 游标分页时为空
     size: int
-    pages: int
+    pages: Optional[int] = None  # 游标分页或没有总数时为空
+    next_cursor: Optional[str] = None  # 游标分页时据此请求下一页，为空表示没有更多数据
+    facets: Optional[FacetCounts] = None  # 请求 facets=true 时返回当前筛选条件下的分面统计
+
+class SuggestQuestion(BaseModel):
+    id: int
+    title: str
+
+class SuggestResponse(BaseModel):
+    questions: List[SuggestQuestion]
+    tags: List[TagResponse]
+
+class CacheStatsResponse(BaseModel):
+    size: int
+    max_size: int
+    ttl: float
+    version: int
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+class WriterStatsResponse(BaseModel):
+    queued: int
+    operations: int
+    failed: int
+    commits: int
+    largest_group: int
+    operations_per_commit: float
 
 class QuestionSearchParams(BaseModel):
     q: Optional[str] = None
     category: Optional[QuestionCategory] = None
     difficulty: Optional[DifficultyLevel] = None
+    tag: Optional[str] = None
+    mode: SearchMode = SearchMode.FULLTEXT
     page: int = Field(default=1, ge=1)
     size: int = Field(default=10, ge=1, le=100)
+    cursor: Optional[str] = None
+    with_total: bool = False
+    facets: bool = False
+    fields: Tuple[str, ...] = ()  # 列表项在摘要之外返回的字段，见 QUESTION_OPTIONAL_FIELDS
 
 class QuestionGenerateRequest(BaseModel):
     category: QuestionCategory
     difficulty: DifficultyLevel
     count: int = Field(..., ge=1, le=10)
 
+class AIJobResponse(BaseModel):
+    id: str
+    status: JobStatus
+    category: QuestionCategory
+    difficulty: DifficultyLevel
+    count: int
+    question_ids: List[int] = []
+    skipped_titles: List[str] = []
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    questions: Optional[List[QuestionResponse]] = None  # 任务成功后查询单个任务时返回
+    
+    class Config:
+        from_attributes = True
+
+class TokenBucketStats(BaseModel):
+    limit_per_minute: float
+    available: Optional[float] = None  # 不限流时为空
+    waits: int
+    wait_seconds: float
+
+class RateLimiterStats(BaseModel):
+    requests: TokenBucketStats
+    tokens: TokenBucketStats
+
+class CircuitBreakerStats(BaseModel):
+    state: str
+    consecutive_failures: int
+    trips: int
+    rejected: int
+
+class AICallStats(BaseModel):
+    retries: int
+    rate_limited: int
+
+class SingleFlightStats(BaseModel):
+    in_flight: int
+    calls: int
+    coalesced: int
+
+class CompletionCacheStats(BaseModel):
+    size: int
+    max_size: int
+    ttl: float
+    hits: int
+    misses: int
+    hit_rate: float
+
+class LatencyStats(BaseModel):
+    count: int      # 累计样本数
+    sum: float      # 累计总耗时（秒）
+    window: int     # 分位数基于最近的 window 个样本
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p99: Optional[float] = None
+    max: Optional[float] = None
+    mean: Optional[float] = None
+
+class AITokenStats(BaseModel):
+    prompt: int
+    completion: int
+    reported_calls: int   # token 数来自上游 usage 的调用数
+    estimated_calls: int  # 上游没有返回 usage、按估算值记录的调用数
+
+class AIParseStats(BaseModel):
+    items_ok: int
+    items_invalid: int    # JSON 合法但字段缺失或取值非法的题目
+    decode_errors: int    # 无法解析的 JSON 对象
+    empty_responses: int  # 没有产出任何题目的调用
+
+class AIQuestionYieldStats(BaseModel):
+    generations: int
+    failed: int
+    requested: int
+    yielded: int
+    yield_rate: float
+
+class AIMetricsStats(BaseModel):
+    calls: int
+    errors: Dict[str, int]  # 按异常类型统计的失败调用（包括之后重试成功的）
+    cache_replays: int
+    tokens: AITokenStats
+    cost_usd: float
+    cost_per_call_usd: float
+    parse: AIParseStats
+    questions: AIQuestionYieldStats
+    latency: LatencyStats
+    first_token: LatencyStats
+    generation_latency: LatencyStats
+
+class AIStatsResponse(BaseModel):
+    limiter: RateLimiterStats
+    breaker: CircuitBreakerStats
+    calls: AICallStats
+    single_flight: SingleFlightStats
+    completion_cache: CompletionCacheStats
+    metrics: AIMetricsStats
+
+class BankFillRequest(BaseModel):
+    # 每个 类别 × 难度 桶的目标题目数，未指定时使用 BANK_TARGET_PER_BUCKET；targets 覆盖个别桶
+    target_per_bucket: Optional[int] = Field(None, ge=0, le=10000)
+    targets: Optional[Dict[QuestionCategory, Dict[DifficultyLevel, int]]] = None
+    categories: Optional[List[QuestionCategory]] = None
+    difficulties: Optional[List[DifficultyLevel]] = None
+    concurrency: Optional[int] = Field(None, ge=1, le=32)
+    token_budget: Optional[int] = Field(None, ge=1)
+
+class BucketProgressResponse(BaseModel):
+    category: QuestionCategory
+    difficulty: DifficultyLevel
+    current: int
+    target: int
+    deficit: int
+    requested: int
+    saved: int
+    skipped: int
+    failed: int
+    status: str  # pending / running / full / partial / budget_exhausted / failed
+    error: Optional[str] = None
+
+class BankFillRunResponse(BaseModel):
+    id: str
+    status: str  # planned / running / succeeded / partial / budget_exhausted / failed
+    buckets: List[BucketProgressResponse]
+    total_deficit: int
+    saved: int
+    concurrency: int
+    token_budget: Optional[int] = None
+    estimated_tokens: int
+    tokens_used: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
 class RandomQuestionRequest(BaseModel):
     count: int = Field(..., ge=1, le=50)
     categories: Optional[List[QuestionCategory]] = None
     difficulties: Optional[List[DifficultyLevel]] = None
+    tags: Optional[List[str]] = None
 
 class InterviewSessionRequest(BaseModel):
     easy_count: int = Field(default=2, ge=0, le=10)
     medium_count: int = Field(default=3, ge=0, le=10)
-    hard_count: int = Field(default=1, ge=0, le=10)
\ No newline at end of file
+    hard_count: int = Field(default=1, ge=0, le=10)
+    categories: Optional[List[QuestionCategory]] = None  # 限定题目类别，为空时不限
\ No newline at end of file
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+
+def completion_key(model: str, messages: Iterable[Dict[str, str]], **params: Any) -> str:
+    """按模型、提示词和调用参数计算原始输出的缓存键"""
+    payload = json.dumps(
+        {"model": model, "messages": list(messages), "params": params},
+        ensure_ascii=False, sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """合并相同参数的并发调用：同一个键同时只执行一次，其他调用方等待并共享结果（或异常）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """执行 fn 并返回 (结果, 是否共享了其他调用方的结果)"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result(), False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"in_flight": len(self._calls), "calls": self.calls, "coalesced": self.coalesced}
+
+
+class CompletionCache:
+    """最近的模型原始输出缓存（LRU + TTL）
+
+    保存完成的原始输出文本，同一次生成因为后续保存失败而重试时可以直接重放，
+    不必再次调用模型。每个条目属于一个分组（生成参数），生成结果保存成功后
+    按分组丢弃，之后相同参数的请求会重新生成新的题目。
+    """
+
+    def __init__(self, max_size: int = 64, ttl: float = 600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Hashable, float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                _, expires_at, text = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return text
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, text: str, group: Hashable = None) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (group, time.monotonic() + self.ttl, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard_group(self, group: Hashable) -> int:
+        """丢弃某个分组的全部条目，返回丢弃的数量"""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry[0] == group]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,148 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.config import settings
+from app.database import SessionLocal
+from app.models import AIJob, JobStatus
+from app.schemas import QuestionCreate, QuestionGenerateRequest
+from app.services.ai_service import ai_service
+from app.services.db_writer import after_commit, commit, db_writer
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (JobStatus.PENDING, JobStatus.RUNNING)
+FINISHED_STATUSES = (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+
+class JobQueueFullError(Exception):
+    """排队中和执行中的任务已达上限"""
+
+
+class AIJobRunner:
+    """AI 生成任务的后台执行器
+
+    提交时只写入一条 pending 记录并返回，生成和保存在固定大小的线程池中执行，
+    不占用处理请求的线程。任务状态都在 ai_jobs 表中，进程重启后由 start()
+    把未完成的任务重新放回队列。
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 20):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> int:
+        """启动线程池并恢复未完成的任务，返回恢复的任务数"""
+        self._ensure_executor()
+        db = SessionLocal()
+        try:
+            jobs = db.query(AIJob).filter(AIJob.status.in_(ACTIVE_STATUSES)) \
+                .order_by(AIJob.created_at).all()
+            for job in jobs:
+                # 上次退出时执行到一半的任务从头重新执行
+                job.status = JobStatus.PENDING
+                job.started_at = None
+            db.commit()
+            for job in jobs:
+                self._executor.submit(self._run, job.id)
+        finally:
+            db.close()
+        if jobs:
+            logger.info(f"恢复了 {len(jobs)} 个未完成的 AI 生成任务")
+        return len(jobs)
+
+    def shutdown(self) -> None:
+        """不等待执行中的任务；未完成的任务保持 pending/running，下次启动时恢复"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def submit(self, db: Session, request: QuestionGenerateRequest) -> AIJob:
+        active = db.query(func.count(AIJob.id)).filter(AIJob.status.in_(ACTIVE_STATUSES)).scalar()
+        if active >= self.max_pending:
+            raise JobQueueFullError(f"排队中的生成任务已达上限（{self.max_pending}），请稍后再试")
+
+        job = AIJob(
+            id=uuid.uuid4().hex,
+            status=JobStatus.PENDING,
+            category=request.category,
+            difficulty=request.difficulty,
+            count=request.count,
+        )
+        db.add(job)
+        commit(db)
+        db.refresh(job)
+        # 由写线程组提交时，任务记录提交后才能交给线程池，否则执行线程可能还查不到它
+        after_commit(db, lambda: self._ensure_executor().submit(self._run, job.id))
+        return job
+
+    def get(self, db: Session, job_id: str) -> Optional[AIJob]:
+        return db.query(AIJob).filter(AIJob.id == job_id).first()
+
+    def list_recent(self, db: Session, limit: int = 20) -> List[AIJob]:
+        return db.query(AIJob).order_by(AIJob.created_at.desc()).limit(limit).all()
+
+    def _ensure_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ai-job")
+            return self._executor
+
+    def _run(self, job_id: str) -> None:
+        # 状态更新和题目保存都交给写线程，生成期间不持有数据库连接
+        job = db_writer.run(self._mark_running, job_id)
+        if job is None:
+            return
+        try:
+            questions_data = ai_service.generate_questions(
+                category=job.category,
+                difficulty=job.difficulty,
+                count=job.count
+            )
+            db_writer.run(self._complete, job_id, questions_data)
+            ai_service.release_generation(job.category, job.difficulty, job.count)
+        except Exception as e:
+            logger.exception(f"AI 生成任务 {job_id} 失败")
+            db_writer.run(self._fail, job_id, str(e))
+
+    def _mark_running(self, db: Session, job_id: str) -> Optional[AIJob]:
+        job = self.get(db, job_id)
+        if job is None or job.status != JobStatus.PENDING:
+            return None
+        job.status = JobStatus.RUNNING
+        job.started_at = func.now()
+        commit(db)
+        return job
+
+    def _complete(self, db: Session, job_id: str, questions: List[QuestionCreate]) -> None:
+        """保存题目并把任务标记为成功，两者在同一个操作中提交"""
+        job = self.get(db, job_id)
+        saved, skipped = crud.save_generated_questions(db, questions)
+        job.question_ids = [question.id for question in saved]
+        job.skipped_titles = skipped
+        job.status = JobStatus.SUCCEEDED
+        job.finished_at = func.now()
+        commit(db)
+
+    def _fail(self, db: Session, job_id: str, error: str) -> None:
+        job = self.get(db, job_id)
+        job.status = JobStatus.FAILED
+        job.error = error
+        job.finished_at = func.now()
+        commit(db)
+
+
+# 全局实例，启动时恢复未完成的任务
+ai_job_runner = AIJobRunner(
+    workers=settings.AI_JOB_WORKERS,
+    max_pending=settings.AI_JOB_MAX_PENDING,
+)
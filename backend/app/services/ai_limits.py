@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import openai
+
+from app.services.textutil import is_cjk
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """上游连续失败，熔断器处于打开状态，调用被直接拒绝"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"AI 服务暂时不可用，请在 {retry_after:.0f} 秒后重试")
+        self.retry_after = retry_after
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计 token 数：中日韩文字每字约 1 个 token，其他字符约 4 个一个 token"""
+    cjk = sum(1 for ch in text if is_cjk(ch))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class TokenUsage:
+    """累计一组调用估算的 token 用量"""
+
+    def __init__(self):
+        self.calls = 0
+        self.tokens = 0
+
+    def add(self, tokens: int) -> None:
+        self.calls += 1
+        self.tokens += tokens
+
+
+class TokenBucket:
+    """令牌桶（每分钟补充 rate 个，容量 rate），rate <= 0 时不限流
+
+    reserve 先扣除令牌再返回需要等待的秒数，余额允许为负：排队的调用按顺序
+    等待各自的份额，不会互相抢占。状态用线程锁保护，后台任务线程中各自的
+    事件循环和服务主循环共用同一个桶。
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            wait = max(0.0, -self._tokens / self.rate)
+            if wait > 0:
+                self.waits += 1
+                self.wait_seconds += wait
+            return wait
+
+    def adjust(self, amount: float) -> None:
+        """按实际用量修正之前的预扣：amount 为正表示归还，为负表示补扣"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            if self.rate > 0:
+                self._refill(time.monotonic())
+            return {
+                "limit_per_minute": self.capacity,
+                "available": round(self._tokens, 1) if self.rate > 0 else None,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+class RateLimiter:
+    """同时限制每分钟请求数（RPM）和每分钟 token 数（TPM）"""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        wait = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        if wait > 0:
+            logger.info(f"AI 调用触发客户端限流，等待 {wait:.2f} 秒")
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests.stats(), "tokens": self.tokens.stats()}
+
+
+class CircuitBreaker:
+    """熔断器：连续失败 failure_threshold 次后打开，reset_timeout 秒内直接拒绝调用；
+    之后进入半开状态只放行一次试探调用，成功则关闭，失败则重新打开
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+        self.trips = 0
+        self.rejected = 0
+
+    def retry_after(self) -> float:
+        """打开状态下距离允许试探还需等待的秒数，其他状态为 0"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def before_call(self) -> None:
+        """调用上游前检查，熔断时抛出 CircuitOpenError"""
+        with self._lock:
+            if self._state == self.OPEN:
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(remaining)
+                self._state = self.HALF_OPEN
+                self._probe_started = None
+            if self._state == self.HALF_OPEN:
+                now = time.monotonic()
+                # 试探调用被取消时不会回报结果，超过 reset_timeout 后允许再次试探
+                if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.reset_timeout)
+                self._probe_started = now
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_started = None
+
+    def release_probe(self) -> None:
+        """调用结果不能说明上游是否健康（如参数错误）：状态和失败计数不变，只让出半开状态的试探名额"""
+        with self._lock:
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.trips += 1
+                    logger.warning(f"AI 服务连续失败 {self._failures} 次，熔断 {self.reset_timeout:.0f} 秒")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "trips": self.trips,
+                "rejected": self.rejected,
+            }
+
+
+def is_retryable(error: Exception) -> bool:
+    """429、5xx、连接错误和超时可以重试；其他 4xx（参数、鉴权错误）重试也不会成功"""
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError, openai.RateLimitError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def _retry_after_header(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ResilientCaller:
+    """限流 + 重试 + 熔断，包装对上游的一次调用"""
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        breaker: CircuitBreaker,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+    ):
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.rate_limited = 0
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        """带完全随机抖动的指数退避；上游给出 Retry-After 时不早于该时间"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = _retry_after_header(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    async def call(self, fn: Callable[[], Awaitable[Any]], estimated_tokens: int) -> Any:
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            await self.limiter.acquire(estimated_tokens)
+            try:
+                result = await fn()
+            except Exception as e:
+                # 被拒绝的请求不消耗 token，归还预扣的额度
+                self.limiter.record_usage(estimated_tokens, 0)
+                if not is_retryable(e):
+                    # 参数、鉴权等错误既不说明上游不健康，也不说明它已恢复，熔断器状态保持不变
+                    self.breaker.release_probe()
+                    raise
+                self.breaker.record_failure()
+                with self._lock:
+                    if isinstance(e, openai.RateLimitError):
+                        self.rate_limited += 1
+                    if attempt == self.max_retries:
+                        raise
+                    self.retries += 1
+                delay = self.backoff(attempt, e)
+                logger.warning(f"AI 调用失败（{type(e).__name__}），{delay:.2f} 秒后第 {attempt + 1} 次重试")
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = {"retries": self.retries, "rate_limited": self.rate_limited}
+        return {"limiter": self.limiter.stats(), "breaker": self.breaker.stats(), "calls": calls}
@@ -0,0 +1,279 @@
+import math
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def usage_from_chunk(chunk: Any) -> Optional[Tuple[int, int]]:
+    """从流式响应的数据块中取出上游报告的 (prompt_tokens, completion_tokens)，没有时返回 None
+
+    请求时带上 stream_options.include_usage，上游会在最后一个数据块（choices 为空）中返回
+    usage；旧版 SDK 的类型中没有这个字段，它以字典形式保存在额外字段里。
+    """
+    usage = getattr(chunk, "usage", None)
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        prompt, completion = usage.get("prompt_tokens"), usage.get("completion_tokens")
+    else:
+        prompt, completion = getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+    if prompt is None or completion is None:
+        return None
+    return int(prompt), int(completion)
+
+
+class RollingWindow:
+    """保留最近 size 个样本计算分位数，同时累计全部样本的个数和总和"""
+
+    def __init__(self, size: int = 1024):
+        self._samples: deque = deque(maxlen=max(1, size))
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._samples.append(value)
+            self.count += 1
+            self.total += value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total = self.count, self.total
+        result: Dict[str, Any] = {"count": count, "sum": round(total, 4), "window": len(samples)}
+        for q in QUANTILES:
+            # 最近秩法：第 ceil(q * n) 个样本
+            result[f"p{round(q * 100)}"] = (
+                round(samples[max(0, math.ceil(q * len(samples)) - 1)], 4) if samples else None
+            )
+        result["max"] = round(samples[-1], 4) if samples else None
+        result["mean"] = round(sum(samples) / len(samples), 4) if samples else None
+        return result
+
+
+class AIMetrics:
+    """AI 调用的监控数据：每次上游调用的延迟、token 用量和成本、解析结果，
+    以及每次生成请求的题目数与实际产出数
+    """
+
+    def __init__(self, window: int = 1024, prompt_price: float = 0.0, completion_price: float = 0.0):
+        self.prompt_price = prompt_price
+        self.completion_price = completion_price
+        self.latency = RollingWindow(window)
+        self.first_token = RollingWindow(window)
+        self.generation_latency = RollingWindow(window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors: Dict[str, int] = {}
+        self.cache_replays = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.reported_usage = 0
+        self.estimated_usage = 0
+        self.cost = 0.0
+        self.items_ok = 0
+        self.items_invalid = 0
+        self.decode_errors = 0
+        self.empty_responses = 0
+        self.generations = 0
+        self.failed_generations = 0
+        self.requested = 0
+        self.yielded = 0
+
+    def cost_of(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (prompt_tokens * self.prompt_price + completion_tokens * self.completion_price) / 1000
+
+    def record_call(
+        self,
+        latency: float,
+        first_token: Optional[float],
+        prompt_tokens: int,
+        completion_tokens: int,
+        reported: bool,
+        items_ok: int,
+        items_invalid: int,
+        decode_errors: int,
+    ) -> None:
+        """记录一次完成的上游流式调用；reported 表示 token 数来自上游的 usage 而不是估算"""
+        self.latency.observe(latency)
+        if first_token is not None:
+            self.first_token.observe(first_token)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            if reported:
+                self.reported_usage += 1
+            else:
+                self.estimated_usage += 1
+            self.cost += self.cost_of(prompt_tokens, completion_tokens)
+            self.items_ok += items_ok
+            self.items_invalid += items_invalid
+            self.decode_errors += decode_errors
+            if not items_ok:
+                self.empty_responses += 1
+
+    def record_error(self, error: Exception, latency: float) -> None:
+        """记录一次失败的上游调用（包括会被重试的 429/5xx）"""
+        self.latency.observe(latency)
+        with self._lock:
+            name = type(error).__name__
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def record_cache_replay(self) -> None:
+        with self._lock:
+            self.cache_replays += 1
+
+    def record_generation(self, requested: int, yielded: int, seconds: float) -> None:
+        """记录一次生成请求（可能拆成多个子批次）的题目数、去重后的产出数和耗时"""
+        self.generation_latency.observe(seconds)
+        with self._lock:
+            self.generations += 1
+            if not yielded:
+                self.failed_generations += 1
+            self.requested += requested
+            self.yielded += yielded
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "calls": self.calls,
+                "errors": dict(self.errors),
+                "cache_replays": self.cache_replays,
+                "tokens": {
+                    "prompt": self.prompt_tokens,
+                    "completion": self.completion_tokens,
+                    "reported_calls": self.reported_usage,
+                    "estimated_calls": self.estimated_usage,
+                },
+                "cost_usd": round(self.cost, 6),
+                "cost_per_call_usd": round(self.cost / self.calls, 6) if self.calls else 0.0,
+                "parse": {
+                    "items_ok": self.items_ok,
+                    "items_invalid": self.items_invalid,
+                    "decode_errors": self.decode_errors,
+                    "empty_responses": self.empty_responses,
+                },
+                "questions": {
+                    "generations": self.generations,
+                    "failed": self.failed_generations,
+                    "requested": self.requested,
+                    "yielded": self.yielded,
+                    "yield_rate": self.yielded / self.requested if self.requested else 0.0,
+                },
+            }
+        stats["latency"] = self.latency.stats()
+        stats["first_token"] = self.first_token.stats()
+        stats["generation_latency"] = self.generation_latency.stats()
+        return stats
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Exposition:
+    """拼接 Prometheus 文本格式（0.0.4）"""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.lines: List[str] = []
+
+    def metric(self, name: str, kind: str, help_text: str, samples: Iterable[Tuple[Dict[str, Any], Any]]) -> None:
+        name = f"{self.prefix}_{name}"
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            if value is None:
+                continue
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            self.lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+    def summary(self, name: str, help_text: str, stats: Dict[str, Any]) -> None:
+        samples = [({"quantile": q}, stats[f"p{round(q * 100)}"]) for q in QUANTILES]
+        self.metric(name, "summary", help_text, samples)
+        self.lines.append(f"{self.prefix}_{name}_sum {stats['sum']}")
+        self.lines.append(f"{self.prefix}_{name}_count {stats['count']}")
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+_BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def render_prometheus(stats: Dict[str, Any], prefix: str = "iqb_ai") -> str:
+    """把 AIService.stats() 的结果转换为 Prometheus 文本格式，分位数来自最近的滑动窗口"""
+    metrics = stats["metrics"]
+    out = _Exposition(prefix)
+    out.metric("calls_total", "counter", "Completed upstream completion calls", [({}, metrics["calls"])])
+    out.metric(
+        "call_errors_total", "counter", "Failed upstream calls by exception type, including retried ones",
+        [({"type": name}, count) for name, count in sorted(metrics["errors"].items())],
+    )
+    out.metric("cache_replays_total", "counter", "Batches replayed from the completion cache", [({}, metrics["cache_replays"])])
+    out.summary("call_latency_seconds", "Upstream call latency from request to end of stream", metrics["latency"])
+    out.summary("first_token_seconds", "Latency from request to the first streamed content", metrics["first_token"])
+    out.summary("generation_seconds", "End-to-end latency of a generation request", metrics["generation_latency"])
+    tokens = metrics["tokens"]
+    out.metric(
+        "tokens_total", "counter", "Tokens used by upstream calls",
+        [({"kind": "prompt"}, tokens["prompt"]), ({"kind": "completion"}, tokens["completion"])],
+    )
+    out.metric(
+        "usage_source_total", "counter", "Calls whose token usage was reported by upstream or estimated locally",
+        [({"source": "reported"}, tokens["reported_calls"]), ({"source": "estimated"}, tokens["estimated_calls"])],
+    )
+    out.metric("cost_usd_total", "counter", "Estimated cost of upstream calls in USD", [({}, metrics["cost_usd"])])
+    parse = metrics["parse"]
+    out.metric(
+        "parsed_items_total", "counter", "Question objects parsed from model output",
+        [({"result": "ok"}, parse["items_ok"]), ({"result": "invalid"}, parse["items_invalid"])],
+    )
+    out.metric("decode_errors_total", "counter", "Objects in model output that were not valid JSON", [({}, parse["decode_errors"])])
+    out.metric("empty_responses_total", "counter", "Calls that produced no usable question", [({}, parse["empty_responses"])])
+    questions = metrics["questions"]
+    out.metric(
+        "generations_total", "counter", "Generation requests by result",
+        [({"result": "ok"}, questions["generations"] - questions["failed"]), ({"result": "failed"}, questions["failed"])],
+    )
+    out.metric(
+        "questions_total", "counter", "Questions requested from and yielded by generation requests",
+        [({"kind": "requested"}, questions["requested"]), ({"kind": "yielded"}, questions["yielded"])],
+    )
+
+    out.metric("retries_total", "counter", "Upstream calls retried after 429/5xx", [({}, stats["calls"]["retries"])])
+    out.metric("rate_limited_total", "counter", "Upstream 429 responses", [({}, stats["calls"]["rate_limited"])])
+    breaker = stats["breaker"]
+    out.metric(
+        "breaker_state", "gauge", "Circuit breaker state (0 closed, 1 half open, 2 open)",
+        [({}, _BREAKER_STATES.get(breaker["state"], 0))],
+    )
+    out.metric("breaker_trips_total", "counter", "Times the circuit breaker opened", [({}, breaker["trips"])])
+    out.metric("breaker_rejected_total", "counter", "Calls rejected while the breaker was open", [({}, breaker["rejected"])])
+    limiter = stats["limiter"]
+    out.metric(
+        "limiter_available", "gauge", "Tokens currently available in the client-side rate limiter buckets",
+        [({"bucket": bucket}, limiter[bucket]["available"]) for bucket in ("requests", "tokens")],
+    )
+    out.metric(
+        "limiter_waits_total", "counter", "Calls delayed by the client-side rate limiter",
+        [({"bucket": bucket}, limiter[bucket]["waits"]) for bucket in ("requests", "tokens")],
+    )
+    out.metric(
+        "limiter_wait_seconds_total", "counter", "Total delay added by the client-side rate limiter",
+        [({"bucket": bucket}, limiter[bucket]["wait_seconds"]) for bucket in ("requests", "tokens")],
+    )
+    cache = stats["completion_cache"]
+    out.metric(
+        "completion_cache_lookups_total", "counter", "Completion cache lookups by result",
+        [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])],
+    )
+    out.metric(
+        "single_flight_coalesced_total", "counter", "Generation calls that shared an in-flight identical call",
+        [({}, stats["single_flight"]["coalesced"])],
+    )
+    return out.render()
@@ -1,14 +1,84 @@
-from typing import List, Dict
-from openai import OpenAI
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Dict, Hashable, List, Optional, Tuple
+from openai import AsyncOpenAI
 from app.config import settings
 from app.schemas import QuestionCreate
 from app.models import DifficultyLevel, QuestionCategory
-import json
+from app.services.ai_cache import CompletionCache, SingleFlight, completion_key
+from app.services.ai_metrics import AIMetrics, usage_from_chunk
+from app.services.ai_limits import (
+    CircuitBreaker, CircuitOpenError, RateLimiter, ResilientCaller, TokenUsage, estimate_tokens
+)
+from app.services.json_stream import JsonArrayItemParser
+from app.services.textutil import normalize_title
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTY_PROMPTS = {
+    DifficultyLevel.EASY: "基础",
+    DifficultyLevel.MEDIUM: "中等",
+    DifficultyLevel.HARD: "高级"
+}
+
+CATEGORY_PROMPTS = {
+    QuestionCategory.ALGORITHM: "算法和数据结构",
+    QuestionCategory.DATABASE: "数据库",
+    QuestionCategory.SYSTEM_DESIGN: "系统设计",
+    QuestionCategory.FRONTEND: "前端开发",
+    QuestionCategory.BACKEND: "后端开发",
+    QuestionCategory.DEVOPS: "运维和DevOps",
+    QuestionCategory.MOBILE: "移动开发",
+    QuestionCategory.DATA_SCIENCE: "数据科学",
+    QuestionCategory.SECURITY: "网络安全",
+    QuestionCategory.TESTING: "软件测试",
+    QuestionCategory.REACT_NATIVE: "React Native",
+    QuestionCategory.REACT: "React"
+}
+
+# 拆分子批次时放在队列里表示某个子批次已结束
+_BATCH_DONE = object()
+
+# 每道题预留的输出 token 数，子批次的 max_tokens 按题目数量计算，避免输出被截断
+MAX_TOKENS_PER_QUESTION = 1200
+
+# 子批次重试前的等待时间（秒），按次数指数增长
+RETRY_BACKOFF = 1.0
+
+
+def split_batches(count: int, batch_size: int) -> List[int]:
+    """把 count 道题拆成每批不超过 batch_size 道的子批次"""
+    batch_size = max(1, batch_size)
+    return [min(batch_size, count - start) for start in range(0, count, batch_size)]
+
 
 class AIService:
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
-        
+        self.async_client = self.new_async_client()
+        self.batch_size = settings.AI_BATCH_SIZE
+        self.max_concurrency = settings.AI_MAX_CONCURRENCY
+        self.retries = settings.AI_BATCH_RETRIES
+        self.flights = SingleFlight()
+        self.completion_cache = CompletionCache(
+            max_size=settings.AI_COMPLETION_CACHE_SIZE,
+            ttl=settings.AI_COMPLETION_CACHE_TTL,
+        )
+        self.caller = ResilientCaller(
+            limiter=RateLimiter(rpm=settings.OPENAI_RPM, tpm=settings.OPENAI_TPM),
+            breaker=CircuitBreaker(
+                failure_threshold=settings.OPENAI_BREAKER_FAILURES,
+                reset_timeout=settings.OPENAI_BREAKER_RESET,
+            ),
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            base_delay=settings.OPENAI_RETRY_BASE_DELAY,
+            max_delay=settings.OPENAI_RETRY_MAX_DELAY,
+        )
+        self.metrics = AIMetrics(
+            window=settings.AI_METRICS_WINDOW,
+            prompt_price=settings.OPENAI_PROMPT_PRICE_PER_1K,
+            completion_price=settings.OPENAI_COMPLETION_PRICE_PER_1K,
+        )
     
     def generate_questions(
         self, 
@@ -16,31 +86,310 @@ class AIService:
         difficulty: DifficultyLevel, 
         count: int
     ) -> List[QuestionCreate]:
-        """使用OpenAI API生成面试题目"""
+        """使用OpenAI API生成面试题目（同步接口，供后台任务线程调用）
         
-        difficulty_prompts = {
-            DifficultyLevel.EASY: "基础",
-            DifficultyLevel.MEDIUM: "中等",
-            DifficultyLevel.HARD: "高级"
-        }
+        相同参数的并发调用合并为一次上游调用，共享同一份结果。完成的原始输出
+        会缓存到调用 release_generation 为止，保存失败后重试不会再次调用模型。
+        """
+        group = (category, difficulty, count)
+        questions, shared = self.flights.do(
+            group, lambda: asyncio.run(self._collect(category, difficulty, count, group=group))
+        )
+        if shared:
+            logger.info(f"合并到进行中的相同生成请求: {category.value}/{difficulty.value} x{count}")
+        return questions
+    
+    def release_generation(
+        self,
+        category: QuestionCategory,
+        difficulty: DifficultyLevel,
+        count: int
+    ) -> None:
+        """生成结果已保存，丢弃对应的原始输出缓存，之后相同参数的请求重新生成"""
+        self.completion_cache.discard_group((category, difficulty, count))
+    
+    async def generate_questions_async(
+        self,
+        category: QuestionCategory,
+        difficulty: DifficultyLevel,
+        count: int,
+        client: Optional[AsyncOpenAI] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> List[QuestionCreate]:
+        """在调用方的事件循环中生成题目，不合并请求也不缓存原始输出
         
-        category_prompts = {
-            QuestionCategory.ALGORITHM: "算法和数据结构",
-            QuestionCategory.DATABASE: "数据库",
-            QuestionCategory.SYSTEM_DESIGN: "系统设计",
-            QuestionCategory.FRONTEND: "前端开发",
-            QuestionCategory.BACKEND: "后端开发",
-            QuestionCategory.DEVOPS: "运维和DevOps",
-            QuestionCategory.MOBILE: "移动开发",
-            QuestionCategory.DATA_SCIENCE: "数据科学",
-            QuestionCategory.SECURITY: "网络安全",
-            QuestionCategory.TESTING: "软件测试",
-            QuestionCategory.REACT_NATIVE: "React Native",
-            QuestionCategory.REACT: "React"
+        多个调用共享同一个 semaphore 时，它们的子批次共用一个并发上限；
+        usage 累计本次调用估算的 token 用量。
+        """
+        return await self._collect(category, difficulty, count, client=client, semaphore=semaphore, usage=usage)
+    
+    async def stream_questions(
+        self,
+        category: QuestionCategory,
+        difficulty: DifficultyLevel,
+        count: int
+    ) -> AsyncIterator[QuestionCreate]:
+        """流式生成题目，每个题目对象一闭合就返回，不等待整个响应结束"""
+        async for question in self._fan_out(self.async_client, category, difficulty, count):
+            yield question
+    
+    def stats(self) -> Dict:
+        return {
+            **self.caller.stats(),
+            "single_flight": self.flights.stats(),
+            "completion_cache": self.completion_cache.stats(),
+            "metrics": self.metrics.stats(),
         }
+    
+    @staticmethod
+    def new_async_client() -> AsyncOpenAI:
+        # 重试由 ResilientCaller 统一处理（带限流和熔断），关闭客户端自带的重试
+        return AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL, max_retries=0)
+    
+    async def _collect(
+        self,
+        category: QuestionCategory,
+        difficulty: DifficultyLevel,
+        count: int,
+        client: Optional[AsyncOpenAI] = None,
+        group: Hashable = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> List[QuestionCreate]:
+        # 异步客户端的连接池绑定在创建它的事件循环上，asyncio.run 每次都是新的循环，需要临时客户端
+        owned = client is None
+        client = client or self.new_async_client()
+        try:
+            return [question async for question in self._fan_out(
+                client, category, difficulty, count, group, semaphore, usage
+            )]
+        finally:
+            if owned:
+                await client.close()
+    
+    async def _fan_out(
+        self,
+        client: AsyncOpenAI,
+        category: QuestionCategory,
+        difficulty: DifficultyLevel,
+        count: int,
+        group: Hashable = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> AsyncIterator[QuestionCreate]:
+        """把题目拆成若干子批次并发生成，按完成顺序返回按标题去重后的题目
         
+        同时进行的子批次不超过 max_concurrency 个（或由调用方传入共享的 semaphore）；
+        失败的子批次单独重试，全部子批次都没有产出题目时才抛出异常。指定 group 时
+        子批次的原始输出按该分组缓存。
+        """
+        sizes = split_batches(count, self.batch_size)
+        semaphore = semaphore or asyncio.Semaphore(self.max_concurrency)
+        queue: asyncio.Queue = asyncio.Queue()
+        errors: List[Exception] = []
+        
+        async def run(index: int, size: int) -> None:
+            try:
+                await self._run_batch(
+                    client, semaphore, queue, category, difficulty, size, index, len(sizes), group, usage
+                )
+            except Exception as e:
+                errors.append(e)
+            finally:
+                await queue.put(_BATCH_DONE)
+        
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(run(index, size)) for index, size in enumerate(sizes)]
+        seen = set()
+        running = len(tasks)
+        try:
+            while running:
+                item = await queue.get()
+                if item is _BATCH_DONE:
+                    running -= 1
+                    continue
+                key = normalize_title(item.title)
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield item
+        finally:
+            # 调用方提前停止迭代时取消仍在进行的子批次
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        self.metrics.record_generation(count, len(seen), time.perf_counter() - started)
+        if errors:
+            logger.warning(f"{len(errors)}/{len(sizes)} 个子批次生成失败: {errors[0]}")
+        if not seen:
+            if errors and not isinstance(errors[0], ValueError):
+                raise Exception(f"AI 服务调用失败: {str(errors[0])}")
+            raise ValueError(f"AI 返回的数据格式解析失败: {errors[0] if errors else '没有可解析的题目'}")
+    
+    async def _run_batch(
+        self,
+        client: AsyncOpenAI,
+        semaphore: asyncio.Semaphore,
+        queue: asyncio.Queue,
+        category: QuestionCategory,
+        difficulty: DifficultyLevel,
+        size: int,
+        index: int,
+        total: int,
+        group: Hashable = None,
+        usage: Optional[TokenUsage] = None
+    ) -> None:
+        """生成一个子批次，题目不足（调用失败、输出被截断或有题目格式错误）时只重试还缺的题目
+        
+        重试次数上限为 retries。重试用尽后已产出部分题目时不算失败，只记录警告。
+        """
+        remaining = size
+        last_error: Optional[Exception] = None
+        backoff = False
+        for attempt in range(self.retries + 1):
+            if backoff:
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+            produced = 0
+            try:
+                async with semaphore:
+                    async for question in self._stream_batch(
+                        client, category, difficulty, remaining, index, total, group, usage
+                    ):
+                        await queue.put(question)
+                        produced += 1
+                if produced >= remaining:
+                    return
+                last_error = ValueError(f"只解析出 {produced}/{remaining} 个题目" if produced else "没有可解析的题目")
+            except CircuitOpenError:
+                # 熔断期间重试没有意义，直接失败
+                raise
+            except Exception as e:
+                last_error = e
+            # 输出不完整但调用正常结束时立即补齐，调用失败或没有产出时才退避
+            backoff = not produced or not isinstance(last_error, ValueError)
+            remaining = max(1, remaining - produced)
+            logger.warning(f"子批次 {index + 1}/{total} 第 {attempt + 1} 次生成不完整: {last_error}")
+        if remaining < size:
+            logger.warning(f"子批次 {index + 1}/{total} 重试用尽，缺少 {remaining} 个题目")
+            return
+        raise last_error
+    
+    async def _stream_batch(
+        self,
+        client: AsyncOpenAI,
+        category: QuestionCategory,
+        difficulty: DifficultyLevel,
+        count: int,
+        index: int,
+        total: int,
+        group: Hashable = None,
+        usage: Optional[TokenUsage] = None
+    ) -> AsyncIterator[QuestionCreate]:
+        """单次流式调用，增量解析出的题目逐个返回，单个题目格式错误时只跳过该题
+        
+        指定 group 时先查原始输出缓存，命中则直接重放；流正常结束且解析出题目时写入缓存。
+        每次上游调用的延迟、token 用量和解析结果记录到 metrics，上游没有返回 usage 时按估算值记录。
+        """
+        messages = self._build_messages(category, difficulty, count, batch=(index, total))
+        params = {"temperature": 0.7, "max_tokens": MAX_TOKENS_PER_QUESTION * count + 200}
+        key = completion_key(settings.OPENAI_MODEL, messages, **params) if group is not None else None
+        
+        parser = JsonArrayItemParser()
+        cached = self.completion_cache.get(key) if key else None
+        if cached is not None:
+            self.metrics.record_cache_replay()
+            for item in parser.feed(cached):
+                question = self._to_question(item)
+                if question is not None:
+                    yield question
+            return
+        
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        estimated = prompt_tokens + params["max_tokens"]
+        # 请求上游在流的最后一个数据块中返回实际 token 用量（旧版 SDK 没有 stream_options 参数）
+        extra_body = {"stream_options": {"include_usage": True}} if settings.OPENAI_STREAM_USAGE else None
+        started = 0.0
+        
+        async def create():
+            nonlocal started
+            # 只计量最后一次尝试，不包括限流等待和重试退避
+            started = time.perf_counter()
+            try:
+                return await client.chat.completions.create(
+                    model=settings.OPENAI_MODEL,
+                    messages=messages,
+                    stream=True,
+                    extra_body=extra_body,
+                    **params
+                )
+            except Exception as e:
+                self.metrics.record_error(e, time.perf_counter() - started)
+                raise
+        
+        stream = await self.caller.call(create, estimated_tokens=estimated)
+        
+        parts = []
+        produced = 0
+        items = 0
+        first_token: Optional[float] = None
+        reported: Optional[Tuple[int, int]] = None
+        try:
+            async for chunk in stream:
+                reported = usage_from_chunk(chunk) or reported
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                parts.append(delta)
+                for item in parser.feed(delta):
+                    items += 1
+                    question = self._to_question(item)
+                    if question is not None:
+                        produced += 1
+                        yield question
+        except Exception as e:
+            self.metrics.record_error(e, time.perf_counter() - started)
+            raise
+        
+        text = "".join(parts)
+        if reported is not None:
+            prompt_used, completion_used = reported
+        else:
+            prompt_used, completion_used = prompt_tokens, estimate_tokens(text)
+        self.metrics.record_call(
+            latency=time.perf_counter() - started,
+            first_token=first_token,
+            prompt_tokens=prompt_used,
+            completion_tokens=completion_used,
+            reported=reported is not None,
+            items_ok=produced,
+            items_invalid=items - produced,
+            decode_errors=parser.errors,
+        )
+        used = prompt_used + completion_used
+        self.caller.limiter.record_usage(estimated, used)
+        if usage is not None:
+            usage.add(used)
+        if key and produced:
+            self.completion_cache.set(key, text, group)
+    
+    @staticmethod
+    def _build_messages(
+        category: QuestionCategory,
+        difficulty: DifficultyLevel,
+        count: int,
+        batch: Tuple[int, int] = (0, 1)
+    ) -> List[Dict[str, str]]:
+        index, total = batch
+        # 并发的子批次使用同一套提示词，提示模型选择不同的知识点以减少重复
+        batch_hint = f"这是第{index + 1}批（共{total}批），请选择与其他批次不同的知识点。" if total > 1 else ""
         prompt = f"""
-        请生成{count}个{difficulty_prompts[difficulty]}难度的{category_prompts[category]}面试题目。
+        请生成{count}个{DIFFICULTY_PROMPTS[difficulty]}难度的{CATEGORY_PROMPTS[category]}面试题目。
         
         每个题目需要包含：
         1. 简洁明了的题目标题
@@ -62,54 +411,29 @@ class AIService:
             ]
         }}
         
-        确保题目具有实际工程价值，避免过于理论化的问题。
+        确保题目具有实际工程价值，避免过于理论化的问题。{batch_hint}
         注意：analysis中可能包含markdown格式代码，请检查编码问题，确保完整的json是正确且可解析的。
         """
-        
+        return [
+            {"role": "system", "content": "你是一个专业的技术面试官，擅长生成高质量的面试题目。"},
+            {"role": "user", "content": prompt}
+        ]
+    
+    @staticmethod
+    def _to_question(q_data: Dict) -> Optional[QuestionCreate]:
+        """把解析出的题目对象转换为 QuestionCreate，字段缺失或取值非法时返回 None"""
         try:
-            response = self.client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "你是一个专业的技术面试官，擅长生成高质量的面试题目。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=2000
+            return QuestionCreate(
+                title=q_data["title"],
+                content=q_data["content"],
+                category=QuestionCategory(q_data["category"]),
+                difficulty=DifficultyLevel(q_data["difficulty"]),
+                analysis=q_data.get("analysis"),
+                tags=q_data.get("tags", [])
             )
-            
-            content = response.choices[0].message.content
-            # 尝试解析JSON响应
-            try:
-                # 提取JSON部分（如果响应包含其他文本）
-                import re
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    content = json_match.group()
-                
-                data = json.loads(content)
-                questions = []
-                
-                for q_data in data.get("questions", []):
-                    question = QuestionCreate(
-                        title=q_data["title"],
-                        content=q_data["content"],
-                        category=QuestionCategory(q_data["category"]),
-                        difficulty=DifficultyLevel(q_data["difficulty"]),
-                        analysis=q_data.get("analysis"),
-                        tags=q_data.get("tags", [])
-                    )
-                    questions.append(question)
-                
-                return questions
-            except (json.JSONDecodeError, KeyError, ValueError) as e:
-                raise ValueError(f"AI 返回的数据格式解析失败: {str(e)} RawContent：{content}")
-                
-        except Exception as e:
-            # 如果是自定义的 ValueError，直接向上抛出
-            if isinstance(e, ValueError):
-                raise
-            # 其他异常也抛出，提供更详细的错误信息
-            raise Exception(f"AI 服务调用失败: {str(e)}")
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"跳过格式不正确的题目: {e}")
+            return None
 
 # 创建全局实例
 ai_service = AIService()
@@ -0,0 +1,359 @@
+import asyncio
+import logging
+import math
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.config import settings
+from app.models import DifficultyLevel, QuestionCategory
+from app.schemas import BankFillRequest
+from app.services.ai_limits import CircuitOpenError, TokenUsage
+from app.services.ai_service import MAX_TOKENS_PER_QUESTION, ai_service
+from app.services.db_writer import db_writer
+
+logger = logging.getLogger(__name__)
+
+# 每个子批次提示词的估算 token 数，用于在调度前预估一次生成的开销
+PROMPT_TOKENS_ESTIMATE = 600
+
+# 去重跳过或失败导致某个桶没有补满时，按差额重新排队的最多次数
+MAX_BUCKET_RETRIES = 2
+
+
+class PlannerBusyError(Exception):
+    """已有补题任务在执行"""
+
+
+def estimate_chunk_tokens(count: int) -> int:
+    """一次生成 count 道题的 token 开销上限（提示词 + 每道题预留的输出）"""
+    batches = math.ceil(count / max(1, settings.AI_BATCH_SIZE))
+    return batches * PROMPT_TOKENS_ESTIMATE + count * MAX_TOKENS_PER_QUESTION
+
+
+class BucketProgress:
+    """单个 类别 × 难度 桶的补题进度"""
+
+    def __init__(self, category: QuestionCategory, difficulty: DifficultyLevel, current: int, target: int):
+        self.category = category
+        self.difficulty = difficulty
+        self.current = current
+        self.target = target
+        self.requested = 0
+        self.saved = 0
+        self.skipped = 0
+        self.failed = 0
+        self.retries = 0
+        self.scheduled = 0      # 已排队或生成中的题目数
+        self.budget_exhausted = False
+        self.status = "full" if self.deficit == 0 else "pending"
+        self.error: Optional[str] = None
+
+    @property
+    def deficit(self) -> int:
+        return max(0, self.target - self.current)
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.deficit - self.saved)
+
+    def to_dict(self) -> Dict:
+        return {
+            "category": self.category,
+            "difficulty": self.difficulty,
+            "current": self.current,
+            "target": self.target,
+            "deficit": self.deficit,
+            "requested": self.requested,
+            "saved": self.saved,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+class BankFillRun:
+    """一次补题：各桶的缺口、进度和 token 预算
+
+    进度只保存在内存中；进程重启后重新规划即可，缺口按数据库中的实时数量计算，
+    已补上的题目不会重复生成。
+    """
+
+    def __init__(self, buckets: List[BucketProgress], concurrency: int, token_budget: Optional[int], chunk_size: int):
+        self.id = uuid.uuid4().hex
+        self.status = "planned"
+        self.buckets = buckets
+        self.concurrency = concurrency
+        self.token_budget = token_budget
+        self.chunk_size = chunk_size
+        self.tokens_used = 0
+        self.tokens_reserved = 0
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    @property
+    def total_deficit(self) -> int:
+        return sum(bucket.deficit for bucket in self.buckets)
+
+    @property
+    def estimated_tokens(self) -> int:
+        total = 0
+        for bucket in self.buckets:
+            full, rest = divmod(bucket.deficit, self.chunk_size)
+            total += full * estimate_chunk_tokens(self.chunk_size) + (estimate_chunk_tokens(rest) if rest else 0)
+        return total
+
+    def reserve(self, tokens: int) -> bool:
+        """预留一次生成的 token，超出预算时返回 False"""
+        if self.token_budget is not None and self.tokens_used + self.tokens_reserved + tokens > self.token_budget:
+            return False
+        self.tokens_reserved += tokens
+        return True
+
+    def affordable(self, count: int) -> int:
+        """剩余预算最多还能生成几道题（不超过 count）"""
+        while count > 0 and self.token_budget is not None \
+                and self.tokens_used + self.tokens_reserved + estimate_chunk_tokens(count) > self.token_budget:
+            count -= 1
+        return count
+
+    def settle(self, reserved: int, used: int) -> None:
+        self.tokens_reserved -= reserved
+        self.tokens_used += used
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "buckets": [bucket.to_dict() for bucket in self.buckets],
+            "total_deficit": self.total_deficit,
+            "saved": sum(bucket.saved for bucket in self.buckets),
+            "concurrency": self.concurrency,
+            "token_budget": self.token_budget,
+            "estimated_tokens": self.estimated_tokens,
+            "tokens_used": self.tokens_used,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def plan_bank_fill(db: Session, request: BankFillRequest) -> BankFillRun:
+    """按当前各桶数量和目标矩阵计算缺口"""
+    counts = {(category, difficulty): count for category, difficulty, count in crud.get_facet_counts(db)}
+    default_target = request.target_per_bucket
+    if default_target is None:
+        default_target = settings.BANK_TARGET_PER_BUCKET
+    overrides = request.targets or {}
+
+    buckets = []
+    for category in request.categories or list(QuestionCategory):
+        for difficulty in request.difficulties or list(DifficultyLevel):
+            target = overrides.get(category, {}).get(difficulty, default_target)
+            buckets.append(BucketProgress(category, difficulty, counts.get((category, difficulty), 0), target))
+
+    return BankFillRun(
+        buckets,
+        concurrency=request.concurrency or settings.BANK_FILL_CONCURRENCY,
+        token_budget=request.token_budget if request.token_budget is not None else (settings.BANK_FILL_TOKEN_BUDGET or None),
+        chunk_size=settings.BANK_FILL_CHUNK_SIZE,
+    )
+
+
+class BankPlanner:
+    """补题执行器：把所有桶的缺口拆成小批量，在一个事件循环中按全局并发上限和 token 预算生成
+
+    所有生成共用一个 semaphore，同时进行的上游调用不超过 concurrency 个。排队顺序在各桶之间
+    轮转，缺口大的桶优先，预算耗尽时各桶都已得到一部分题目。同一时间只执行一个补题任务。
+    """
+
+    def __init__(self, history: int = 10):
+        self.history = history
+        self._runs: "OrderedDict[str, BankFillRun]" = OrderedDict()
+        self._active: Optional[BankFillRun] = None
+        self._lock = threading.Lock()
+
+    def start(self, db: Session, request: BankFillRequest) -> BankFillRun:
+        """规划并在后台线程中开始补题"""
+        run = self._claim(plan_bank_fill(db, request))
+        threading.Thread(target=self._execute, args=(run,), name="bank-fill", daemon=True).start()
+        return run
+
+    def run(
+        self,
+        db: Session,
+        request: BankFillRequest,
+        on_progress: Optional[Callable[[BankFillRun, BucketProgress], None]] = None,
+    ) -> BankFillRun:
+        """规划并在当前线程中执行到结束（命令行使用）"""
+        run = self._claim(plan_bank_fill(db, request))
+        self._execute(run, on_progress)
+        return run
+
+    def get(self, run_id: str) -> Optional[BankFillRun]:
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def list_recent(self) -> List[BankFillRun]:
+        with self._lock:
+            return list(reversed(self._runs.values()))
+
+    def _claim(self, run: BankFillRun) -> BankFillRun:
+        with self._lock:
+            if self._active is not None:
+                raise PlannerBusyError(f"已有补题任务在执行: {self._active.id}")
+            self._active = run
+            self._runs[run.id] = run
+            while len(self._runs) > self.history:
+                self._runs.popitem(last=False)
+        return run
+
+    def _execute(self, run: BankFillRun, on_progress=None) -> None:
+        run.status = "running"
+        run.started_at = datetime.now()
+        try:
+            asyncio.run(self._fill(run, on_progress))
+            if all(bucket.remaining == 0 for bucket in run.buckets):
+                run.status = "succeeded"
+            elif any(bucket.status == "budget_exhausted" for bucket in run.buckets):
+                run.status = "budget_exhausted"
+            else:
+                run.status = "partial"
+        except Exception as e:
+            logger.exception(f"补题任务 {run.id} 失败")
+            run.status = "failed"
+            run.error = str(e)
+        finally:
+            run.finished_at = datetime.now()
+            with self._lock:
+                self._active = None
+        logger.info(
+            f"补题任务 {run.id} 结束: {run.status}，保存 {sum(b.saved for b in run.buckets)}/{run.total_deficit} 道，"
+            f"估算 token {run.tokens_used}"
+        )
+
+    def _enqueue(self, run: BankFillRun, queue: asyncio.Queue, bucket: BucketProgress) -> None:
+        shortfall = bucket.remaining - bucket.scheduled
+        while shortfall > 0:
+            count = min(run.chunk_size, shortfall)
+            bucket.scheduled += count
+            shortfall -= count
+            queue.put_nowait((bucket, count))
+
+    async def _fill(self, run: BankFillRun, on_progress=None) -> None:
+        queue: asyncio.Queue = asyncio.Queue()
+        # 轮转排队：每一轮每个有缺口的桶各排一批，缺口大的桶排在前面
+        pending = sorted((bucket for bucket in run.buckets if bucket.deficit > 0), key=lambda b: -b.deficit)
+        rounds: Dict[int, List[BucketProgress]] = {}
+        for bucket in pending:
+            for i in range(math.ceil(bucket.deficit / run.chunk_size)):
+                rounds.setdefault(i, []).append(bucket)
+        for i in sorted(rounds):
+            for bucket in rounds[i]:
+                count = min(run.chunk_size, bucket.deficit - bucket.scheduled)
+                bucket.scheduled += count
+                queue.put_nowait((bucket, count))
+
+        semaphore = asyncio.Semaphore(run.concurrency)
+        settled = asyncio.Condition()
+        client = ai_service.new_async_client()
+        fatal: List[Exception] = []
+
+        async def worker() -> None:
+            while True:
+                bucket, count = await queue.get()
+                try:
+                    await self._generate_chunk(run, queue, bucket, count, client, semaphore, settled, fatal)
+                    if on_progress is not None:
+                        on_progress(run, bucket)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(run.concurrency)]
+        try:
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await client.close()
+
+        for bucket in run.buckets:
+            if bucket.remaining == 0:
+                bucket.status = "full"
+            elif bucket.budget_exhausted:
+                bucket.status = "budget_exhausted"
+            elif bucket.saved == 0 and bucket.failed:
+                bucket.status = "failed"
+            else:
+                bucket.status = "partial"
+        if fatal:
+            raise fatal[0]
+
+    async def _generate_chunk(self, run, queue, bucket, count, client, semaphore, settled, fatal) -> None:
+        try:
+            await self._run_chunk(run, bucket, count, client, semaphore, settled, fatal)
+        finally:
+            # 这一批结束（保存、跳过或失败）后才不再计入 scheduled
+            bucket.scheduled -= count
+
+        # 该桶没有排队或生成中的批次后仍有差额（重复被跳过或生成失败），按差额重新排队；
+        # 还有批次未结束时不重新排队，否则它们补上的题目会使该桶超出目标
+        if not fatal and bucket.remaining and not bucket.scheduled and bucket.retries < MAX_BUCKET_RETRIES:
+            bucket.retries += 1
+            self._enqueue(run, queue, bucket)
+
+    async def _run_chunk(self, run, bucket, count, client, semaphore, settled, fatal) -> None:
+        if fatal:
+            return
+        # 预留按上限估算，进行中的生成结算后通常会退回大部分，预算不足时先等它们结束
+        estimate = estimate_chunk_tokens(count)
+        async with settled:
+            while not run.reserve(estimate):
+                if run.tokens_reserved == 0:
+                    # 没有进行中的生成可以退回预算，缩小这一批以用完剩余预算
+                    bucket.budget_exhausted = True
+                    count = run.affordable(count)
+                    if count == 0:
+                        return
+                    estimate = estimate_chunk_tokens(count)
+                    run.reserve(estimate)
+                    break
+                await settled.wait()
+
+        bucket.requested += count
+        bucket.status = "running"
+        usage = TokenUsage()
+        try:
+            questions = await ai_service.generate_questions_async(
+                bucket.category, bucket.difficulty, count, client=client, semaphore=semaphore, usage=usage
+            )
+            saved, skipped = await db_writer.run_async(crud.save_generated_questions, questions)
+            bucket.saved += len(saved)
+            bucket.skipped += len(skipped)
+        except CircuitOpenError as e:
+            # 上游不可用时停止整个补题任务，剩余的批次不再调用
+            bucket.failed += count
+            bucket.error = str(e)
+            fatal.append(e)
+        except Exception as e:
+            logger.warning(f"补题 {bucket.category.value}/{bucket.difficulty.value} x{count} 失败: {e}")
+            bucket.failed += count
+            bucket.error = str(e)
+        finally:
+            run.settle(estimate, usage.tokens)
+            async with settled:
+                settled.notify_all()
+
+
+# 全局实例
+bank_planner = BankPlanner()
@@ -0,0 +1,289 @@
+"""content / analysis 列的压缩存储
+
+MARKDOWN_COMPRESSION 开启时，CompressedText 列把较长的文本压缩成 BLOB 保存：
+    1 字节格式 + 4 字节字典 id（0 表示不使用字典）+ raw deflate 数据
+字典由 train_dictionary 从已有题目中训练，保存在 compression_dictionaries 表里（id 递增，
+最大的一个用于压缩新数据），启动时由 load_dictionaries 一次加载，作为 zlib 的预置字典（zdict）：题目之间重复的 markdown 结构和常用术语不必在每一行里重复编码，几百字节的
+短文本也能压缩。读取时按值的类型区分：str 是明文，bytes 才解压，所以开关可以随时切换，
+明文和压缩数据可以混存。解压只发生在真正读取这两列时，列表查询不加载它们（见 crud.question_load_options）。
+
+应用的 SQLite 连接上注册了 md_text() 函数，SQL 中的 LIKE 通过它读取明文。表中有压缩数据时
+全文索引触发器也换成经 md_text() 读取的版本（见 search_index.sync_triggers），这时只有应用自己的
+连接能写入 questions；还原为明文后换回直接读取列值的版本。
+"""
+import logging
+import struct
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from sqlalchemy import Text, func, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.types import TypeDecorator
+
+from app.config import settings
+from app.services import search_index
+
+logger = logging.getLogger(__name__)
+
+SQL_FUNCTION = "md_text"
+DICTIONARY_TABLE = "compression_dictionaries"
+
+FORMAT_ZLIB = 1
+_HEADER = struct.Struct(">BI")  # 格式, 字典 id
+_WBITS = -zlib.MAX_WBITS  # raw deflate：省去每个值的 zlib 头和校验和
+
+# zlib 只使用字典的最后 32KB；题目不多时字典按样本量的 1/8 缩小，避免字典本身比省下的空间还大
+DICTIONARY_SIZE = 32 * 1024
+MIN_DICTIONARY_SIZE = 4 * 1024
+SEGMENT_LENGTH = 32
+# 参与训练的样本总字节数上限和最少样本数
+TRAINING_MAX_BYTES = 512 * 1024
+TRAINING_MIN_SAMPLES = 20
+
+
+def train_dictionary(
+    samples: Iterable[str],
+    size: int = DICTIONARY_SIZE,
+    segment: int = SEGMENT_LENGTH,
+    max_bytes: int = TRAINING_MAX_BYTES,
+) -> bytes:
+    """从样本文本训练 zlib 预置字典
+
+    统计每个 segment 字节的片段出现在多少个样本中，出现在至少两个样本中的片段按出现次数从高到低
+    选入字典，与已选片段重叠一半以上的跳过，直到 size 字节。zlib 对距离更近的匹配编码更短，
+    出现次数最多的片段放在字典末尾。
+    """
+    counts: Counter = Counter()
+    remaining = max_bytes
+    for sample in samples:
+        data = sample.encode("utf-8")[:remaining]
+        remaining -= len(data)
+        counts.update({data[i:i + segment] for i in range(len(data) - segment + 1)})
+        if remaining <= 0:
+            break
+
+    half = segment // 2
+    covered = set()
+    chosen = []
+    total = 0
+    for piece, count in sorted(counts.items(), key=lambda item: item[1], reverse=True):
+        if count < 2 or total + len(piece) > size:
+            break
+        if piece[:half] in covered or piece[-half:] in covered:
+            continue
+        covered.update(piece[i:i + half] for i in range(len(piece) - half + 1))
+        chosen.append(piece)
+        total += len(piece)
+    return b"".join(reversed(chosen))
+
+
+class MarkdownCodec:
+    """content / analysis 的压缩编解码，字典按 id 缓存在内存中"""
+
+    def __init__(self, enabled: bool = False, level: int = 6, min_size: int = 200):
+        self.enabled = enabled
+        self.level = level
+        self.min_size = min_size
+        self._lock = threading.Lock()
+        self._dictionaries: Dict[int, bytes] = {}
+        self._current = 0
+
+    @property
+    def current_dictionary(self) -> int:
+        """压缩新数据使用的字典 id，0 表示没有字典"""
+        return self._current
+
+    def load(self, conn) -> int:
+        """从字典表加载全部字典，id 最大（最近训练）的一个用于压缩；返回字典数"""
+        rows = conn.execute(text(f"SELECT id, data FROM {DICTIONARY_TABLE} ORDER BY id")).fetchall()
+        with self._lock:
+            self._dictionaries = {row[0]: bytes(row[1]) for row in rows}
+            self._current = rows[-1][0] if rows else 0
+        return len(rows)
+
+    def add(self, dictionary_id: int, data: bytes) -> None:
+        """登记新训练的字典，之后压缩的数据都使用它"""
+        with self._lock:
+            self._dictionaries[dictionary_id] = data
+            self._current = dictionary_id
+
+    def discard(self, dictionary_id: int) -> None:
+        """撤销 add（保存字典的事务回滚时），压缩改回使用之前 id 最大的字典"""
+        with self._lock:
+            self._dictionaries.pop(dictionary_id, None)
+            if self._current == dictionary_id:
+                self._current = max(self._dictionaries, default=0)
+
+    def _dictionary(self, dictionary_id: int) -> bytes:
+        # 只查内存：解压也在 md_text() 中执行，不能在 SQL 函数里再访问数据库
+        data = self._dictionaries.get(dictionary_id)
+        if data is None:
+            raise LookupError(f"压缩字典 {dictionary_id} 未加载（其他进程新训练的字典需要重启服务后生效）")
+        return data
+
+    def compress(self, value: str) -> Union[str, bytes]:
+        """压缩一段文本；短于 min_size 字节或压缩后没有变小时原样返回"""
+        raw = value.encode("utf-8")
+        if len(raw) < self.min_size:
+            return value
+        dictionary_id = self.current_dictionary
+        if dictionary_id:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, _WBITS, zdict=self._dictionary(dictionary_id))
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, _WBITS)
+        data = _HEADER.pack(FORMAT_ZLIB, dictionary_id) + compressor.compress(raw) + compressor.flush()
+        return data if len(data) < len(raw) else value
+
+    def decompress(self, value: Union[str, bytes, None]) -> Optional[str]:
+        """还原为明文；明文和 None 原样返回"""
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        fmt, dictionary_id = _HEADER.unpack_from(value)
+        if fmt != FORMAT_ZLIB:
+            raise ValueError(f"未知的压缩格式: {fmt}")
+        if dictionary_id:
+            decompressor = zlib.decompressobj(_WBITS, zdict=self._dictionary(dictionary_id))
+        else:
+            decompressor = zlib.decompressobj(_WBITS)
+        return (decompressor.decompress(value[_HEADER.size:]) + decompressor.flush()).decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    """按 MARKDOWN_COMPRESSION 压缩保存的 Text 列（仅 SQLite），读取时兼容明文和压缩值"""
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or not markdown_codec.enabled or dialect.name != "sqlite":
+            return value
+        return markdown_codec.compress(value)
+
+    def process_result_value(self, value, dialect):
+        return markdown_codec.decompress(value)
+
+    def coerce_compared_value(self, op, value):
+        # LIKE 等比较中的字面量按普通文本绑定，不压缩
+        return Text()
+
+
+def load_dictionaries(engine: Engine) -> int:
+    """启动时加载全部压缩字典，返回字典数；还没有字典表（未迁移到 0009）时返回 0"""
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(DICTIONARY_TABLE):
+            return 0
+        return markdown_codec.load(conn)
+
+
+def register_sql_functions(dbapi_conn) -> None:
+    """在 SQLite 连接上注册 md_text(value)，返回列的明文"""
+    dbapi_conn.create_function(SQL_FUNCTION, 1, markdown_codec.decompress, deterministic=True)
+
+
+def plain_text(column, dialect_name: str):
+    """SQL 中读取压缩列的明文；其他数据库不压缩，直接返回列"""
+    if dialect_name != "sqlite":
+        return column
+    return getattr(func, SQL_FUNCTION)(column)
+
+
+def train_from_questions(conn) -> Optional[int]:
+    """用已有题目训练新字典并保存，返回字典 id；题目太少时不训练，返回 None"""
+    rows = conn.execute(text(
+        "SELECT content, analysis FROM questions ORDER BY random() LIMIT 5000"
+    )).fetchall()
+    samples = [markdown_codec.decompress(value) for row in rows for value in row if value]
+    if len(samples) < TRAINING_MIN_SAMPLES:
+        logger.info(f"只有 {len(samples)} 段文本，不训练压缩字典")
+        return None
+
+    sample_bytes = sum(len(sample.encode("utf-8")) for sample in samples)
+    data = train_dictionary(samples, size=min(DICTIONARY_SIZE, max(MIN_DICTIONARY_SIZE, sample_bytes // 8)))
+    new_id = conn.execute(
+        text(f"INSERT INTO {DICTIONARY_TABLE} (data, sample_count) VALUES (:data, :count)"),
+        {"data": data, "count": len(samples)},
+    ).lastrowid
+    markdown_codec.add(new_id, data)
+    logger.info(f"压缩字典 {new_id} 已训练：{len(data)} 字节，{len(samples)} 段样本")
+    return new_id
+
+
+def convert_questions(
+    conn,
+    compress: bool,
+    batch_size: int = 500,
+    codec: Optional[MarkdownCodec] = None,
+) -> Tuple[int, int, int]:
+    """把已有题目的 content / analysis 转换为压缩（compress=False 时为明文）格式
+
+    已压缩的值按当前字典重新压缩。codec 默认为全局的 markdown_codec。
+    返回 (更新的题目数, 转换前字节数, 转换后字节数)。
+    """
+    codec = codec or markdown_codec
+    updated = before = after = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text("SELECT id, content, analysis FROM questions WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": batch_size},
+        ).fetchall()
+        if not rows:
+            break
+
+        changes = []
+        for question_id, *values in rows:
+            converted = []
+            for value in values:
+                plain = codec.decompress(value)
+                stored = codec.compress(plain) if compress and plain is not None else plain
+                before += _stored_size(value)
+                after += _stored_size(stored)
+                converted.append(stored)
+            if converted != values:
+                changes.append({"id": question_id, "content": converted[0], "analysis": converted[1]})
+        if changes:
+            conn.execute(text("UPDATE questions SET content = :content, analysis = :analysis WHERE id = :id"), changes)
+            updated += len(changes)
+        last_id = rows[-1][0]
+    return updated, before, after
+
+
+def compress_questions(conn, retrain: bool = False) -> Tuple[int, int, int]:
+    """压缩已有题目：没有字典（或 retrain）时先训练，再按当前字典转换全部题目"""
+    markdown_codec.load(conn)
+    new_id = None
+    if retrain or not markdown_codec.current_dictionary:
+        new_id = train_from_questions(conn)
+    try:
+        # 先换成 md_text 版本的触发器：明文版本会把 BLOB 写进全文索引
+        search_index.sync_triggers(conn, md_text=True)
+        return convert_questions(conn, compress=True)
+    except BaseException:
+        # 事务会回滚，新字典不会保存
+        if new_id is not None:
+            markdown_codec.discard(new_id)
+        raise
+
+
+def decompress_questions(conn) -> Tuple[int, int, int]:
+    """把全部题目还原为明文；MARKDOWN_COMPRESSION 关闭时全文索引触发器换回明文版本"""
+    markdown_codec.load(conn)
+    result = convert_questions(conn, compress=False)
+    search_index.sync_triggers(conn)
+    return result
+
+
+def _stored_size(value) -> int:
+    if value is None:
+        return 0
+    return len(value) if isinstance(value, bytes) else len(value.encode("utf-8"))
+
+
+# 全局实例，字典由 load_dictionaries 在启动时加载
+markdown_codec = MarkdownCodec(
+    enabled=settings.MARKDOWN_COMPRESSION,
+    level=settings.MARKDOWN_COMPRESSION_LEVEL,
+    min_size=settings.MARKDOWN_COMPRESSION_MIN_SIZE,
+)
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+from app.database import WriteSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# 写线程执行批内操作时，session.info 中保存该操作的提交后回调
+_CALLBACKS_KEY = "after_commit_callbacks"
+
+
+def commit(db: Session) -> None:
+    """提交写操作；在 GroupCommitWriter 的批内只 flush，由写线程统一提交"""
+    if _CALLBACKS_KEY in db.info:
+        db.flush()
+    else:
+        db.commit()
+
+
+def rollback(db: Session) -> None:
+    """回滚写操作；在批内什么也不做，写线程会把该操作回滚到它自己的 SAVEPOINT"""
+    if _CALLBACKS_KEY not in db.info:
+        db.rollback()
+
+
+def in_group_commit(db: Session) -> bool:
+    """当前是否在 GroupCommitWriter 的批内执行（写入要等整批执行完才提交）"""
+    return _CALLBACKS_KEY in db.info
+
+
+def after_commit(db: Session, callback: Callable[[], None]) -> None:
+    """数据真正提交后再执行 callback（维护内存索引、提交后台任务等）；不在批内时立即执行"""
+    callbacks = db.info.get(_CALLBACKS_KEY)
+    if callbacks is None:
+        callback()
+    else:
+        callbacks.append(callback)
+
+
+class _Operation:
+    __slots__ = ("fn", "args", "kwargs", "future")
+
+    def __init__(self, fn: Callable[..., Any], args: Tuple, kwargs: Dict[str, Any]):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """单线程写入器：所有写操作排队交给一个写线程，在同一个连接上串行执行
+
+    写线程每次取出已经排队的操作（最多 max_batch 个，可等待 max_delay 秒凑批），在一个
+    事务中依次执行，每个操作包在自己的 SAVEPOINT 里：某个操作失败只回滚它自己，异常交给
+    它的调用方；其余操作一起提交，共用一次提交（和 fsync）。只有一个写连接，写操作之间
+    不再争抢 SQLite 的写锁，也不会进入 busy_timeout 忙等待。
+
+    写操作是 fn(session, *args, **kwargs)，crud 中的写函数可以直接提交；它们通过本模块的
+    commit / rollback / after_commit 感知自己是否在批内执行。
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = WriteSessionLocal,
+        max_batch: int = 64,
+        max_delay: float = 0.0,
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.operations = 0
+        self.failed = 0
+        self.commits = 0
+        self.largest_group = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """处理完已排队的操作后停止写线程"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """排队一个写操作，返回它的 Future（结果为 fn 的返回值，或 fn / 提交抛出的异常）"""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("不能在写线程中提交写操作（会互相等待）")
+        self.start()
+        operation = _Operation(fn, args, kwargs)
+        self._queue.put(operation)
+        return operation.future
+
+    def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """排队一个写操作并等待结果（供同步代码使用）"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def run_async(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """排队一个写操作并在事件循环中等待结果"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "operations": self.operations,
+                "failed": self.failed,
+                "commits": self.commits,
+                "largest_group": self.largest_group,
+                "operations_per_commit": self.operations / self.commits if self.commits else 0.0,
+            }
+
+    def _loop(self) -> None:
+        while True:
+            group, stop = self._next_group()
+            if group:
+                self._execute(group)
+            if stop:
+                return
+
+    def _next_group(self) -> Tuple[List[_Operation], bool]:
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        group = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(group) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return group, True
+            group.append(item)
+        return group, False
+
+    def _execute(self, group: List[_Operation]) -> None:
+        done: List[Tuple[_Operation, Any, List[Callable[[], None]]]] = []
+        failed = 0
+        db = self.session_factory()
+        try:
+            for operation in group:
+                if not operation.future.set_running_or_notify_cancel():
+                    continue
+                callbacks: List[Callable[[], None]] = []
+                db.info[_CALLBACKS_KEY] = callbacks
+                try:
+                    # 正常返回时释放 SAVEPOINT；抛出异常（包括 flush 失败）时回滚到它
+                    with db.begin_nested():
+                        result = operation.fn(db, *operation.args, **operation.kwargs)
+                except BaseException as e:
+                    failed += 1
+                    operation.future.set_exception(e)
+                    continue
+                done.append((operation, result, callbacks))
+            db.info.pop(_CALLBACKS_KEY, None)
+
+            try:
+                db.commit()
+            except Exception as e:
+                logger.exception(f"组提交失败，{len(done)} 个写操作未生效")
+                db.rollback()
+                failed += len(done)
+                for operation, _, _ in done:
+                    operation.future.set_exception(e)
+                done = []
+        finally:
+            db.close()
+
+        for operation, result, callbacks in done:
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception:
+                    # 提交后的回调出错不影响已提交的写入
+                    logger.exception("写操作提交后的回调失败")
+            operation.future.set_result(result)
+
+        with self._lock:
+            self.operations += len(group)
+            self.failed += failed
+            self.commits += 1
+            self.largest_group = max(self.largest_group, len(group))
+
+
+# 全局实例，第一次提交写操作时启动写线程
+db_writer = GroupCommitWriter(
+    max_batch=settings.DB_WRITER_MAX_BATCH,
+    max_delay=settings.DB_WRITER_MAX_DELAY_MS / 1000,
+)
@@ -0,0 +1,51 @@
+import logging
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.models import DifficultyLevel, QuestionCategory
+
+logger = logging.getLogger(__name__)
+
+FACET_TABLE = "question_facets"
+
+
+def rebuild_facets(engine: Engine) -> int:
+    """重新统计聚合表（平时由迁移 0002 创建的触发器增量维护），返回题目总数"""
+    with engine.begin() as conn:
+        return _backfill(conn)
+
+
+def _backfill(conn) -> int:
+    conn.execute(text(f"DELETE FROM {FACET_TABLE}"))
+    conn.execute(text(
+        f"INSERT INTO {FACET_TABLE}(category, difficulty, count) "
+        "SELECT category, difficulty, COUNT(*) FROM questions GROUP BY category, difficulty"
+    ))
+    total = conn.execute(text(f"SELECT COALESCE(SUM(count), 0) FROM {FACET_TABLE}")).scalar()
+    logger.info(f"分面统计已重建: {total} 条题目")
+    return total
+
+
+def build_facet_counts(rows: Iterable[Tuple[QuestionCategory, DifficultyLevel, int]]) -> Dict:
+    """把 (类别, 难度, 数量) 行整理成完整的类别 × 难度矩阵，缺失的组合补 0"""
+    matrix = {
+        category.value: {difficulty.value: 0 for difficulty in DifficultyLevel}
+        for category in QuestionCategory
+    }
+    for category, difficulty, count in rows:
+        matrix[category.value][difficulty.value] += count
+
+    categories = {category: sum(row.values()) for category, row in matrix.items()}
+    difficulties = {
+        difficulty.value: sum(row[difficulty.value] for row in matrix.values())
+        for difficulty in DifficultyLevel
+    }
+
+    return {
+        "total": sum(categories.values()),
+        "categories": categories,
+        "difficulties": difficulties,
+        "matrix": matrix,
+    }
@@ -0,0 +1,271 @@
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import Question, QuestionTag, Tag
+from app.services.textutil import CJK_RANGES, normalize, is_cjk
+
+# 默认的最低相似度（查询词平均相似度）
+DEFAULT_MIN_SCORE = 0.5
+
+# 返回的结果数量上限
+MAX_RESULTS = 1000
+
+# 前缀命中（如 "postgre" -> "postgresql"）的相似度
+PREFIX_SIMILARITY = 0.8
+
+# 中文两字词错一个字（如 "传透" -> "穿透"）的相似度
+CJK_SUBSTITUTION_SIMILARITY = 0.5
+
+# 中日韩文字连续段，或不含中日韩文字的字母数字连续段
+_TOKEN_RE = re.compile(f"([{CJK_RANGES}]+)|[^\\W_{CJK_RANGES}]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """英文按单词切分；中日韩文字没有词边界，按相邻两字切分"""
+    tokens = []
+    for match in _TOKEN_RE.finditer(normalize(text)):
+        part = match.group()
+        if match.group(1) and len(part) > 1:
+            tokens.extend(part[j:j + 2] for j in range(len(part) - 1))
+        else:
+            tokens.append(part)
+    return tokens
+
+
+def trigrams(word: str) -> Set[str]:
+    """按 pg_trgm 的方式切分：前补两个空格、后补一个空格后取连续三字符"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def index_keys(word: str) -> Set[str]:
+    """词表倒排的键：英文词取 trigram；中文两字词取"替换任一字"的模式，用于匹配错别字"""
+    if is_cjk(word[0]):
+        if len(word) == 2:
+            return {word[0] + "\0", "\0" + word[1]}
+        return set()
+    return trigrams(word)
+
+
+def max_edits(word: str) -> int:
+    """允许的编辑距离，与 Elasticsearch 的 fuzziness=AUTO 相同"""
+    if is_cjk(word[0]) or len(word) <= 2:
+        return 0
+    return 1 if len(word) <= 5 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Damerau-Levenshtein（OSA）距离，超过 limit 时提前返回 limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class FuzzyIndex:
+    """标题和标签的容错（拼写错误）搜索索引
+
+    两级倒排：词表上的字符 trigram 索引用来找出与查询词相近的词，
+    再经编辑距离校验；词 -> 题目的倒排用来汇总每道题的得分。
+    查询只扫描词表和命中词的倒排，与题库总量无关。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._word_docs: Dict[str, Set[int]] = {}
+        self._gram_words: Dict[str, Set[str]] = {}
+        self._doc_words: Dict[int, Set[str]] = {}
+        self._doc_length: Dict[int, int] = {}
+
+    def build(self, db: Session) -> int:
+        titles = db.query(Question.id, Question.title).all()
+        tag_rows = db.query(QuestionTag.question_id, Tag.name) \
+            .join(Tag, Tag.id == QuestionTag.tag_id).all()
+
+        tags_by_question: Dict[int, List[str]] = {}
+        for question_id, name in tag_rows:
+            tags_by_question.setdefault(question_id, []).append(name)
+
+        with self._lock:
+            self._reset()
+            for question_id, title in titles:
+                self._add(question_id, title, tags_by_question.get(question_id, []))
+            return len(titles)
+
+    def add(self, question_id: int, title: str, tags: List[str]) -> None:
+        with self._lock:
+            self.remove(question_id)
+            self._add(question_id, title, tags)
+
+    def remove(self, question_id: int) -> None:
+        with self._lock:
+            self._doc_length.pop(question_id, None)
+            for word in self._doc_words.pop(question_id, ()):
+                docs = self._word_docs.get(word)
+                if docs is None:
+                    continue
+                docs.discard(question_id)
+                if not docs:
+                    # 词表中不再有题目引用的词一并移除
+                    del self._word_docs[word]
+                    for gram in index_keys(word):
+                        words = self._gram_words.get(gram)
+                        if words is not None:
+                            words.discard(word)
+                            if not words:
+                                del self._gram_words[gram]
+
+    def on_question_write(self, event: str, question_id: int, question: Optional[Question]) -> None:
+        """crud 写入回调"""
+        if event == "delete" or question is None:
+            self.remove(question_id)
+        else:
+            self.add(question_id, question.title, question.tags)
+
+    def search(
+        self,
+        query: str,
+        min_score: float = DEFAULT_MIN_SCORE,
+        limit: int = MAX_RESULTS
+    ) -> List[Tuple[int, float]]:
+        """返回按相似度降序的 (题目 id, 得分) 列表
+
+        得分为每个查询词在题目中最相近词的相似度的平均值，同分时标题短的排前面。
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        with self._lock:
+            # 每个查询词得到按相似度降序、互不相交的题目分层，集合运算都在 C 层完成
+            token_layers = [self._token_layers(token) for token in tokens]
+
+            if len(tokens) == 1:
+                buckets = [(similarity, docs) for similarity, docs in token_layers[0] if similarity >= min_score]
+            else:
+                scores: Dict[int, float] = {}
+                for layers in token_layers:
+                    for similarity, docs in layers:
+                        for question_id in docs:
+                            scores[question_id] = scores.get(question_id, 0.0) + similarity
+                grouped: Dict[float, List[int]] = {}
+                for question_id, total in scores.items():
+                    score = total / len(tokens)
+                    if score >= min_score:
+                        grouped.setdefault(round(score, 4), []).append(question_id)
+                buckets = sorted(grouped.items(), reverse=True)
+
+            results = []
+            for similarity, docs in buckets:
+                # 同分时标题短的排前面，再按 id 排序（两次排序都以 C 实现的键完成）
+                remaining = limit - len(results)
+                ordered = sorted(sorted(docs), key=self._doc_length.__getitem__)[:remaining]
+                results.extend((question_id, round(similarity, 4)) for question_id in ordered)
+                if len(results) >= limit:
+                    break
+            return results
+
+    def _token_layers(self, token: str) -> List[Tuple[float, Set[int]]]:
+        layers = []
+        seen: Set[int] = set()
+        for word, similarity in sorted(self._similar_words(token), key=lambda m: -m[1]):
+            docs = self._word_docs[word] - seen
+            if docs:
+                seen |= docs
+                if layers and layers[-1][0] == similarity:
+                    layers[-1][1].update(docs)
+                else:
+                    layers.append((similarity, set(docs)))
+        return layers
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "questions": len(self._doc_words),
+                "words": len(self._word_docs),
+                "trigrams": len(self._gram_words),
+            }
+
+    def _similar_words(self, token: str) -> List[Tuple[str, float]]:
+        """词表中与 token 相近的词及相似度：完全相同、前缀或编辑距离在允许范围内"""
+        matches = []
+        if token in self._word_docs:
+            matches.append((token, 1.0))
+
+        if is_cjk(token[0]):
+            for key in index_keys(token):
+                for word in self._gram_words.get(key, ()):
+                    if word != token:
+                        matches.append((word, CJK_SUBSTITUTION_SIMILARITY))
+            return matches
+
+        edits = max_edits(token)
+        if edits == 0 and len(token) < 3:
+            return matches
+
+        # 编辑一次最多影响 4 个 trigram（换位），共享数低于下限的词不可能命中；
+        # 8 个字符以上的长词按该下限几乎不过滤，另外要求至少共享一半 trigram，
+        # 避免对大量偶然相近的词逐个计算编辑距离
+        grams = trigrams(token)
+        need = max(1, len(grams) - 4 * max(edits, 1))
+        if len(token) >= 8:
+            need = max(need, (len(grams) + 1) // 2)
+        ordered = sorted(grams, key=lambda g: len(self._gram_words.get(g, ())))
+        shared = Counter()
+        for gram in ordered[:len(ordered) - need + 1]:
+            shared.update(self._gram_words.get(gram, ()))
+        for gram in ordered[len(ordered) - need + 1:]:
+            words = self._gram_words.get(gram)
+            if words:
+                for word in shared:
+                    if word in words:
+                        shared[word] += 1
+
+        for word, count in shared.items():
+            if count < need or word == token:
+                continue
+            if len(token) >= 3 and word.startswith(token):
+                matches.append((word, PREFIX_SIMILARITY))
+                continue
+            if edits == 0:
+                continue
+            distance = edit_distance(token, word, edits)
+            if distance <= edits:
+                matches.append((word, 1 - distance / max(len(token), len(word))))
+        return matches
+
+    def _add(self, question_id: int, title: str, tags: List[str]) -> None:
+        words = set(tokenize(title))
+        for name in tags:
+            words.update(tokenize(name))
+        self._doc_words[question_id] = words
+        self._doc_length[question_id] = len(title)
+        for word in words:
+            docs = self._word_docs.get(word)
+            if docs is None:
+                docs = self._word_docs[word] = set()
+                for gram in index_keys(word):
+                    self._gram_words.setdefault(gram, set()).add(word)
+            docs.add(question_id)
+
+
+# 全局实例，启动时构建
+fuzzy_index = FuzzyIndex()
@@ -0,0 +1,58 @@
+import random
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.models import DifficultyLevel, Question, QuestionCategory
+from app.schemas import InterviewSessionRequest
+from app.services.sampler import random_sampler
+
+# 预设面试模式：各难度题目数量及限定的类别（未指定类别时不限）
+INTERVIEW_PRESETS: Dict[str, InterviewSessionRequest] = {
+    "quick": InterviewSessionRequest(easy_count=2, medium_count=2, hard_count=1),
+    "standard": InterviewSessionRequest(easy_count=3, medium_count=4, hard_count=2),
+    "comprehensive": InterviewSessionRequest(easy_count=5, medium_count=5, hard_count=3),
+    "frontend": InterviewSessionRequest(
+        easy_count=2, medium_count=3, hard_count=1,
+        categories=[QuestionCategory.FRONTEND, QuestionCategory.REACT, QuestionCategory.REACT_NATIVE],
+    ),
+    "backend": InterviewSessionRequest(
+        easy_count=2, medium_count=3, hard_count=2,
+        categories=[QuestionCategory.BACKEND, QuestionCategory.DATABASE, QuestionCategory.SYSTEM_DESIGN],
+    ),
+    "algorithm": InterviewSessionRequest(
+        easy_count=1, medium_count=2, hard_count=2,
+        categories=[QuestionCategory.ALGORITHM],
+    ),
+}
+
+
+def build_interview_session(
+    db: Session,
+    request: InterviewSessionRequest,
+    rng: Optional[random.Random] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> List[Question]:
+    """按难度分层抽题，结果按 简单 -> 中等 -> 困难 排列
+
+    各层的 id 都从内存 id 池抽取，不访问数据库；选中的题目用一次 IN 查询加载。
+    某一层题目不足时返回该层全部题目。fields 见 crud.question_load_options。
+    """
+    random_sampler.ensure_built(db)
+    return crud.get_questions_by_ids(db, select_interview_ids(request, rng), fields)
+
+
+def select_interview_ids(request: InterviewSessionRequest, rng: Optional[random.Random] = None) -> List[int]:
+    """从内存 id 池按难度分层抽取题目 id，抽样器需已构建"""
+    selected_ids = []
+    for difficulty, count in (
+        (DifficultyLevel.EASY, request.easy_count),
+        (DifficultyLevel.MEDIUM, request.medium_count),
+        (DifficultyLevel.HARD, request.hard_count),
+    ):
+        if count > 0:
+            selected_ids.extend(random_sampler.sample(
+                count, categories=request.categories, difficulties=[difficulty], rng=rng
+            ))
+    return selected_ids
@@ -0,0 +1,106 @@
+import json
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# { / [ 之后第一个非空白字符的合法取值，用来区分 JSON 和说明文字中的括号
+_VALUE_STARTS = {
+    "{": '"}',
+    "[": '{["]-0123456789tfn',
+}
+
+
+class JsonArrayItemParser:
+    """增量解析 JSON 文本，数组中的对象一闭合就返回
+
+    只跟踪括号嵌套和字符串/转义状态，不构建完整的语法树。JSON 之前的文字（如 ```json
+    代码块标记或说明文字）会被忽略：{ 或 [ 后面紧跟合法的 JSON 值时才计入嵌套，否则视为
+    说明文字并丢弃已跟踪的嵌套状态；字符串外出现反引号（代码块标记，不会出现在 JSON 中）
+    时同样丢弃。说明文字中不成对的括号因此不会影响后面的解析。单个对象解析失败时只丢弃
+    该对象。
+
+        parser = JsonArrayItemParser()
+        for chunk in chunks:
+            for item in parser.feed(chunk):
+                ...
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._position = 0      # 下一个待扫描的字符在 _buffer 中的位置
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._item_start = -1   # 当前数组元素对象在 _buffer 中的起始位置
+        self._item_depth = 0    # 当前元素对象开始时的嵌套深度（栈顶是它所在的数组）
+        self.errors = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self._buffer += chunk
+        items = []
+        buffer = self._buffer
+        stop = len(buffer)
+        for i in range(self._position, len(buffer)):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                if self._stack:
+                    self._in_string = True
+            elif ch == "`":
+                self._stack.clear()
+                self._item_start = -1
+            elif ch in "{[":
+                j = i + 1
+                while j < len(buffer) and buffer[j].isspace():
+                    j += 1
+                if j == len(buffer):
+                    # 还看不到下一个字符，等下一段输入再判断
+                    stop = i
+                    break
+                if buffer[j] not in _VALUE_STARTS[ch]:
+                    self._stack.clear()
+                    self._item_start = -1
+                    continue
+                if ch == "{" and self._stack and self._stack[-1] == "[" and self._item_start < 0:
+                    self._item_start = i
+                    self._item_depth = len(self._stack)
+                self._stack.append(ch)
+            elif ch in "}]" and self._stack:
+                self._stack.pop()
+                if ch == "}" and self._item_start >= 0 and len(self._stack) == self._item_depth:
+                    item = self._decode(buffer[self._item_start:i + 1])
+                    if item is not None:
+                        items.append(item)
+                    self._item_start = -1
+        self._position = stop
+        self._compact()
+        return items
+
+    def _decode(self, text: str):
+        try:
+            item = json.loads(text, strict=False)
+        except json.JSONDecodeError as e:
+            self.errors += 1
+            logger.warning(f"跳过无法解析的对象: {e}")
+            return None
+        if not isinstance(item, dict):
+            return None
+        return item
+
+    def _compact(self) -> None:
+        # 已扫描且不属于未闭合元素的文本不再需要
+        keep_from = self._item_start if self._item_start >= 0 else self._position
+        if keep_from > 0:
+            self._buffer = self._buffer[keep_from:]
+            self._position -= keep_from
+            if self._item_start >= 0:
+                self._item_start -= keep_from
@@ -0,0 +1,236 @@
+import logging
+import threading
+import zlib
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models import Question
+from app.services.fuzzy import tokenize
+
+logger = logging.getLogger(__name__)
+
+# 签名长度 = 分段数 × 每段行数；16 × 4 时 Jaccard 0.7 的题目对有约 99% 的概率落入同一个桶
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+SIGNATURE_DTYPE = np.dtype("<u4")
+_EMPTY = np.iinfo(np.uint32).max
+
+# multiply-shift 哈希族：h(x) = (a * x + b) mod 2^64 >> 32，a 为奇数；种子固定，签名可以持久化
+_rng = np.random.default_rng(20240101)
+_A = _rng.integers(1, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64)
+
+
+def shingles(title: str, content: Optional[str]) -> Set[str]:
+    """题目的特征集合：标题和正文的分词结果（英文单词、中文相邻两字）"""
+    return set(tokenize(title or "")) | set(tokenize(content or ""))
+
+
+def signature(title: str, content: Optional[str]) -> np.ndarray:
+    """计算题目的 MinHash 签名（NUM_PERM 个 uint32），没有任何特征时全部为最大值"""
+    tokens = shingles(title, content)
+    if not tokens:
+        return np.full(NUM_PERM, _EMPTY, dtype=np.uint32)
+    hashes = np.fromiter(
+        (zlib.crc32(token.encode("utf-8")) for token in tokens), dtype=np.uint64, count=len(tokens)
+    )
+    with np.errstate(over="ignore"):
+        permuted = (hashes[:, None] * _A + _B) >> np.uint64(32)
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def to_bytes(sig: np.ndarray) -> bytes:
+    return sig.astype(SIGNATURE_DTYPE).tobytes()
+
+
+def from_bytes(raw: bytes) -> Optional[np.ndarray]:
+    if raw is None or len(raw) != NUM_PERM * SIGNATURE_DTYPE.itemsize:
+        return None
+    return np.frombuffer(raw, dtype=SIGNATURE_DTYPE).astype(np.uint32)
+
+
+def backfill_signatures(engine: Engine, recompute: bool = False, batch_size: int = 1000) -> int:
+    """计算并写入缺少签名的题目（recompute 时全部重新计算），返回写入的题目数"""
+    with engine.begin() as conn:
+        # 经 Question 的列类型读取，压缩保存的正文会被解压
+        query = select(Question.id, Question.title, Question.content)
+        if not recompute:
+            query = query.where(Question.minhash.is_(None))
+        rows = conn.execute(query).fetchall()
+        for start in range(0, len(rows), batch_size):
+            conn.execute(
+                text("UPDATE questions SET minhash = :minhash WHERE id = :id"),
+                [
+                    {"id": question_id, "minhash": to_bytes(signature(title, content))}
+                    for question_id, title, content in rows[start:start + batch_size]
+                ],
+            )
+    return len(rows)
+
+
+def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    """由两个签名估计 Jaccard 相似度"""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def _is_empty(sig: np.ndarray) -> bool:
+    return bool(sig[0] == _EMPTY and (sig == _EMPTY).all())
+
+
+class MinHashLSH:
+    """MinHash 签名的 LSH 分段索引，查询近似重复题目时只比较落入同一个桶的候选
+
+    签名按 BANDS 段切分，每段的字节串作为桶键；两道题只要有一段完全相同就成为候选，
+    再用完整签名估计 Jaccard 相似度过滤。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._signatures: Dict[int, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, Set[int]]] = [defaultdict(set) for _ in range(BANDS)]
+        self._built = False
+
+    @staticmethod
+    def _band_keys(sig: np.ndarray) -> List[bytes]:
+        return [sig[band * ROWS:(band + 1) * ROWS].tobytes() for band in range(BANDS)]
+
+    def build(self, db: Session) -> int:
+        """从数据库加载签名建立索引，缺少签名的题目在内存中计算（持久化见 backfill-minhash 命令）"""
+        rows = db.query(Question.id, Question.minhash, Question.title, Question.content).all()
+        missing = 0
+        with self._lock:
+            self.clear()
+            for question_id, raw, title, content in rows:
+                sig = from_bytes(raw)
+                if sig is None:
+                    sig = signature(title, content)
+                    missing += 1
+                self._add(question_id, sig)
+            self._built = True
+        if missing:
+            logger.info(f"{missing} 条题目没有持久化的 MinHash 签名，可运行 python manage.py backfill-minhash")
+        return len(rows)
+
+    def ensure_built(self, db: Session) -> None:
+        if not self._built:
+            self.build(db)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._signatures.clear()
+            for buckets in self._buckets:
+                buckets.clear()
+
+    def add(self, question_id: int, sig: np.ndarray) -> None:
+        with self._lock:
+            self.remove(question_id)
+            self._add(question_id, sig)
+
+    def _add(self, question_id: int, sig: np.ndarray) -> None:
+        if _is_empty(sig):
+            return
+        self._signatures[question_id] = sig
+        for buckets, key in zip(self._buckets, self._band_keys(sig)):
+            buckets[key].add(question_id)
+
+    def remove(self, question_id: int) -> None:
+        with self._lock:
+            sig = self._signatures.pop(question_id, None)
+            if sig is None:
+                return
+            for buckets, key in zip(self._buckets, self._band_keys(sig)):
+                bucket = buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(question_id)
+                    if not bucket:
+                        del buckets[key]
+
+    def on_question_write(self, event: str, question_id: int, question: Optional[Question]) -> None:
+        if event == "delete" or question is None:
+            self.remove(question_id)
+        else:
+            self.add(question_id, signature(question.title, question.content))
+
+    def query(self, sig: np.ndarray, threshold: float, exclude: Optional[int] = None) -> List[Tuple[int, float]]:
+        """返回估计 Jaccard 相似度不低于 threshold 的 (题目 id, 相似度)，按相似度降序"""
+        if _is_empty(sig):
+            return []
+        with self._lock:
+            candidates = set()
+            for buckets, key in zip(self._buckets, self._band_keys(sig)):
+                bucket = buckets.get(key)
+                if bucket:
+                    candidates.update(bucket)
+            candidates.discard(exclude)
+            scored = [(question_id, jaccard(sig, self._signatures[question_id])) for question_id in candidates]
+        scored = [(question_id, score) for question_id, score in scored if score >= threshold]
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored
+
+    def clusters(self, threshold: float) -> List[List[int]]:
+        """按相似度阈值把互为近似重复的题目合并成簇（并查集），只返回包含两道及以上题目的簇"""
+        with self._lock:
+            parent = {question_id: question_id for question_id in self._signatures}
+
+            def find(x: int) -> int:
+                while parent[x] != x:
+                    parent[x] = parent[parent[x]]
+                    x = parent[x]
+                return x
+
+            for buckets in self._buckets:
+                for bucket in buckets.values():
+                    if len(bucket) < 2:
+                        continue
+                    members = sorted(bucket)
+                    for i, a in enumerate(members):
+                        for b in members[i + 1:]:
+                            if find(a) != find(b) and jaccard(self._signatures[a], self._signatures[b]) >= threshold:
+                                parent[find(a)] = find(b)
+
+            groups: Dict[int, List[int]] = defaultdict(list)
+            for question_id in parent:
+                groups[find(question_id)].append(question_id)
+        return sorted((sorted(group) for group in groups.values() if len(group) > 1), key=lambda g: (-len(g), g[0]))
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+
+def find_batch_duplicates(
+    items: Iterable[Tuple[Hashable, np.ndarray]],
+    index: MinHashLSH,
+    threshold: float,
+    pending: Optional[MinHashLSH] = None,
+) -> Dict[Hashable, Tuple[Optional[int], float]]:
+    """检查一批候选题目：与已有题目或批内排在前面的题目近似重复的候选
+
+    pending 是已写入但尚未提交、还没有加入 index 的题目（如同一组提交批内前面的写操作）。
+    返回 {候选键: (匹配的已有题目 id，批内重复时为 None, 相似度)}
+    """
+    batch = MinHashLSH()
+    duplicates = {}
+    for position, (key, sig) in enumerate(items):
+        matches = index.query(sig, threshold)
+        if not matches and pending is not None:
+            matches = pending.query(sig, threshold)
+        if matches:
+            duplicates[key] = matches[0]
+            continue
+        matches = batch.query(sig, threshold)
+        if matches:
+            duplicates[key] = (None, matches[0][1])
+            continue
+        batch.add(position, sig)
+    return duplicates
+
+
+# 全局实例，启动时从数据库加载签名，写操作后增量更新
+near_duplicate_index = MinHashLSH()
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.config import settings
+
+
+class QueryCache:
+    """进程内 LRU + TTL 查询结果缓存
+
+    每个条目记录写入时的全局版本号，任何题目写操作调用 bump_version 后，
+    旧版本条目即视为失效。多进程部署时各进程缓存互相独立，TTL 限制了
+    其他进程写入后的最长陈旧时间。
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump_version(self) -> int:
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                version, expires_at, value = entry
+                if version == self._version and expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None) -> None:
+        """写入缓存；version 为计算结果前读取的版本号，期间发生写操作则不缓存"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if version is not None and version != self._version:
+                return
+            self._entries[key] = (self._version, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def make_key(namespace: str, **params) -> Tuple:
+    """把查询参数规范化为可哈希的缓存键（忽略空值，枚举取值，搜索词折叠空白）"""
+    items = []
+    for name, value in sorted(params.items()):
+        if value is None:
+            continue
+        if hasattr(value, "value"):
+            value = value.value
+        elif isinstance(value, str) and name == "q":
+            value = " ".join(value.split())
+            if not value:
+                continue
+        elif isinstance(value, list):
+            value = tuple(sorted(getattr(v, "value", v) for v in value))
+        items.append((name, value))
+    return (namespace, tuple(items))
+
+
+# 全局实例
+query_cache = QueryCache(
+    max_size=settings.QUERY_CACHE_MAX_SIZE,
+    ttl=settings.QUERY_CACHE_TTL,
+)
@@ -0,0 +1,208 @@
+import random
+import threading
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import DifficultyLevel, Question, QuestionCategory, QuestionTag, Tag
+
+BucketKey = Tuple[QuestionCategory, DifficultyLevel]
+
+
+class _IdPool:
+    """紧凑的 id 数组，删除时与末尾元素交换，增删和随机访问都是 O(1)"""
+
+    __slots__ = ("ids", "positions")
+
+    def __init__(self):
+        self.ids = array("q")
+        self.positions: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, question_id: int) -> None:
+        if question_id not in self.positions:
+            self.positions[question_id] = len(self.ids)
+            self.ids.append(question_id)
+
+    def remove(self, question_id: int) -> None:
+        position = self.positions.pop(question_id, None)
+        if position is None:
+            return
+        last = self.ids.pop()
+        if last != question_id:
+            self.ids[position] = last
+            self.positions[last] = position
+
+
+class RandomSampler:
+    """按 (类别, 难度) 分桶、按标签分组的内存 id 池，用于随机选题
+
+    无标签条件时在命中的桶上按位置均匀抽样，开销只与抽取数量有关；
+    有标签条件时在标签池的并集上筛选类别和难度，开销与标签下的题目数有关，
+    与题库总量无关。抽样只返回 id，调用方再按 id 加载题目。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._buckets: Dict[BucketKey, _IdPool] = {}
+        self._tag_pools: Dict[str, _IdPool] = {}
+        self._meta: Dict[int, Tuple[BucketKey, List[str]]] = {}
+        self._built = False
+
+    @property
+    def built(self) -> bool:
+        return self._built
+
+    def build(self, db: Session) -> int:
+        return self.build_from_rows(*self.load_rows(db))
+
+    @staticmethod
+    def load_rows(db: Session) -> Tuple[list, list]:
+        """构建所需的数据：(id, 类别, 难度) 行和 (题目 id, 标签名) 行"""
+        rows = db.query(Question.id, Question.category, Question.difficulty).all()
+        tag_rows = db.query(QuestionTag.question_id, Tag.name) \
+            .join(Tag, Tag.id == QuestionTag.tag_id).all()
+        return rows, tag_rows
+
+    def build_from_rows(self, rows: list, tag_rows: list) -> int:
+        """用 load_rows 的结果重建 id 池（纯内存计算，异步路径在线程池中执行）"""
+        tags_by_question: Dict[int, List[str]] = {}
+        for question_id, name in tag_rows:
+            tags_by_question.setdefault(question_id, []).append(name)
+
+        with self._lock:
+            self._reset()
+            for question_id, category, difficulty in rows:
+                self._add(question_id, category, difficulty, tags_by_question.get(question_id, []))
+            self._built = True
+            return len(rows)
+
+    def ensure_built(self, db: Session) -> None:
+        """未经启动流程构建时（如脚本中直接调用）按需构建"""
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build(db)
+
+    def add(self, question_id: int, category: QuestionCategory, difficulty: DifficultyLevel, tags: List[str]) -> None:
+        with self._lock:
+            self.remove(question_id)
+            self._add(question_id, category, difficulty, tags)
+
+    def remove(self, question_id: int) -> None:
+        with self._lock:
+            meta = self._meta.pop(question_id, None)
+            if meta is None:
+                return
+            key, tags = meta
+            self._buckets[key].remove(question_id)
+            for name in tags:
+                pool = self._tag_pools.get(name)
+                if pool is not None:
+                    pool.remove(question_id)
+                    if not pool:
+                        del self._tag_pools[name]
+
+    def on_question_write(self, event: str, question_id: int, question: Optional[Question]) -> None:
+        """crud 写入回调"""
+        if event == "delete" or question is None:
+            self.remove(question_id)
+        else:
+            self.add(question_id, question.category, question.difficulty, question.tags)
+
+    def sample(
+        self,
+        count: int,
+        categories: Optional[Iterable[QuestionCategory]] = None,
+        difficulties: Optional[Iterable[DifficultyLevel]] = None,
+        tags: Optional[Iterable[str]] = None,
+        exclude: Iterable[int] = (),
+        rng: Optional[random.Random] = None,
+    ) -> List[int]:
+        """随机抽取最多 count 个满足条件的题目 id（不重复、顺序随机）
+
+        多个类别、难度或标签之间为"任一"关系，不同维度之间为"且"关系。
+        """
+        rng = rng or random
+        exclude = set(exclude)
+        with self._lock:
+            keys = self._bucket_keys(categories, difficulties)
+            if tags:
+                allowed = set(keys)
+                candidates = set()
+                for name in set(tags):
+                    pool = self._tag_pools.get(name)
+                    if pool is not None:
+                        candidates.update(pool.ids)
+                pool_ids = [
+                    question_id for question_id in candidates
+                    if self._meta[question_id][0] in allowed and question_id not in exclude
+                ]
+                return rng.sample(pool_ids, min(count, len(pool_ids)))
+
+            pools = [self._buckets[key].ids for key in keys if self._buckets.get(key)]
+            bounds = list(accumulate(len(ids) for ids in pools))
+            total = bounds[-1] if bounds else 0
+            excluded = sum(1 for question_id in exclude if self._in_pools(question_id, keys))
+
+            # 在所有命中桶拼接成的虚拟序列上按位置抽样（range 抽样不会展开序列），
+            # 多抽被排除的数量，保证排除后仍够数
+            chosen = []
+            for position in rng.sample(range(total), min(count + excluded, total)):
+                index = bisect_right(bounds, position)
+                question_id = pools[index][position - (bounds[index - 1] if index else 0)]
+                if question_id not in exclude:
+                    chosen.append(question_id)
+            return chosen[:count]
+
+    def count(
+        self,
+        categories: Optional[Iterable[QuestionCategory]] = None,
+        difficulties: Optional[Iterable[DifficultyLevel]] = None,
+    ) -> int:
+        with self._lock:
+            return sum(
+                len(self._buckets[key])
+                for key in self._bucket_keys(categories, difficulties)
+                if key in self._buckets
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "questions": len(self._meta),
+                "buckets": sum(1 for pool in self._buckets.values() if pool),
+                "tags": len(self._tag_pools),
+            }
+
+    @staticmethod
+    def _bucket_keys(
+        categories: Optional[Iterable[QuestionCategory]],
+        difficulties: Optional[Iterable[DifficultyLevel]],
+    ) -> List[BucketKey]:
+        categories = list(dict.fromkeys(categories)) if categories else list(QuestionCategory)
+        difficulties = list(dict.fromkeys(difficulties)) if difficulties else list(DifficultyLevel)
+        return [(category, difficulty) for category in categories for difficulty in difficulties]
+
+    def _in_pools(self, question_id: int, keys: List[BucketKey]) -> bool:
+        meta = self._meta.get(question_id)
+        return meta is not None and meta[0] in keys
+
+    def _add(self, question_id: int, category: QuestionCategory, difficulty: DifficultyLevel, tags: List[str]) -> None:
+        key = (category, difficulty)
+        self._meta[question_id] = (key, list(tags))
+        self._buckets.setdefault(key, _IdPool()).add(question_id)
+        for name in tags:
+            self._tag_pools.setdefault(name, _IdPool()).add(question_id)
+
+
+# 全局实例，启动时构建
+random_sampler = RandomSampler()
@@ -0,0 +1,201 @@
+import logging
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "questions_fts"
+
+# trigram 分词器按连续三个字符切分，中英文通用，但少于三个字符的词无法走索引
+MIN_TERM_LENGTH = 3
+
+# BM25 列权重：标题 > 题目描述 > 解析
+BM25_WEIGHTS = (10.0, 2.0, 1.0)
+
+SNIPPET_OPEN = "<mark>"
+SNIPPET_CLOSE = "</mark>"
+SNIPPET_TOKENS = 24
+
+_CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    title, content, analysis,
+    tokenize = 'trigram'
+)
+"""
+
+_TRIGGER_NAMES = ("questions_fts_ai", "questions_fts_ad", "questions_fts_au")
+
+
+def _trigger_ddl(md_text: bool) -> List[str]:
+    """全文索引同步触发器，有两个版本：
+
+    - 明文版本直接读取列值，任何 SQLite 连接（sqlite3 命令行、数据库浏览器等）都可以写入 questions
+    - md_text 版本经应用在连接上注册的 md_text() 读取明文：content / analysis 可能是压缩后的
+      BLOB（见 services/compression.py），只改变存储格式的更新（压缩、重新压缩）不重建索引。
+      只在需要时安装（见 needs_md_text），这时只有应用自己的连接能写入 questions
+    """
+    def plain(ref):
+        return f"md_text({ref})" if md_text else ref
+
+    # 明文版本的列值变化必然意味着文本变化，不需要 WHEN 条件
+    changed = (
+        f"""
+    WHEN old.title IS NOT new.title
+        OR {plain("old.content")} IS NOT {plain("new.content")}
+        OR {plain("old.analysis")} IS NOT {plain("new.analysis")}"""
+        if md_text else ""
+    )
+    return [
+        f"""
+    CREATE TRIGGER IF NOT EXISTS questions_fts_ai AFTER INSERT ON questions BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content, analysis)
+        VALUES (new.id, new.title, {plain("new.content")}, {plain("new.analysis")});
+    END
+    """,
+        f"""
+    CREATE TRIGGER IF NOT EXISTS questions_fts_ad AFTER DELETE ON questions BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+        f"""
+    CREATE TRIGGER IF NOT EXISTS questions_fts_au
+    AFTER UPDATE OF title, content, analysis ON questions{changed} BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, title, content, analysis)
+        VALUES (new.id, new.title, {plain("new.content")}, {plain("new.analysis")});
+    END
+    """,
+    ]
+
+# 由 ensure_search_index 设置；为 False 时 crud 回退到 LIKE 搜索
+_fts_enabled = False
+
+
+def is_enabled() -> bool:
+    return _fts_enabled
+
+
+def ensure_search_index(engine: Engine) -> bool:
+    """创建 FTS5 表和同步触发器，首次创建时自动回填已有题目"""
+    global _fts_enabled
+
+    if engine.dialect.name != "sqlite":
+        _fts_enabled = False
+        return False
+
+    try:
+        with engine.begin() as conn:
+            exists = _index_exists(conn)
+            conn.execute(text(_CREATE_TABLE))
+            sync_triggers(conn)
+
+            if not exists:
+                _backfill(conn)
+    except Exception as e:
+        # SQLite 版本过低（trigram 需要 3.34+）或未编译 FTS5
+        logger.warning(f"全文索引不可用，搜索将回退到 LIKE 匹配: {e}")
+        _fts_enabled = False
+        return False
+
+    _fts_enabled = True
+    return True
+
+
+def needs_md_text(conn) -> bool:
+    """是否需要 md_text 版本的触发器：开启了 MARKDOWN_COMPRESSION，或表中还有压缩保存的题目"""
+    if settings.MARKDOWN_COMPRESSION:
+        return True
+    # typeof() 只读取记录头，不读取正文
+    return bool(conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM questions WHERE typeof(content) = 'blob' OR typeof(analysis) = 'blob')"
+    )).scalar())
+
+
+def sync_triggers(conn, md_text: Optional[bool] = None) -> None:
+    """安装指定版本（默认按 needs_md_text 选择）的同步触发器，已安装另一个版本时替换；没有全文索引时什么也不做"""
+    if not _index_exists(conn):
+        return
+    if md_text is None:
+        md_text = needs_md_text(conn)
+    installed = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = :name"),
+        {"name": _TRIGGER_NAMES[0]},
+    ).scalar()
+    if installed is not None and ("md_text(" in installed) != md_text:
+        for name in _TRIGGER_NAMES:
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        logger.info(f"全文索引触发器已切换为{'md_text' if md_text else '明文'}版本")
+    for ddl in _trigger_ddl(md_text):
+        conn.execute(text(ddl))
+
+
+def _index_exists(conn) -> bool:
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first() is not None
+
+
+def rebuild_search_index(engine: Engine) -> int:
+    """清空并重建全文索引，返回索引的题目数"""
+    ensure_search_index(engine)
+    if not _fts_enabled:
+        raise RuntimeError("当前 SQLite 不支持 FTS5 trigram 分词器")
+
+    with engine.begin() as conn:
+        return _backfill(conn)
+
+
+def _backfill(conn) -> int:
+    conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    result = conn.execute(text(
+        f"INSERT INTO {FTS_TABLE}(rowid, title, content, analysis) "
+        "SELECT id, title, md_text(content), md_text(analysis) FROM questions"
+    ))
+    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+    logger.info(f"全文索引已重建: {result.rowcount} 条题目")
+    return result.rowcount
+
+
+def split_terms(q: str) -> Tuple[List[str], List[str]]:
+    """把搜索词拆成可走 trigram 索引的长词和只能 LIKE 匹配的短词"""
+    terms = q.split()
+    long_terms = [t for t in terms if len(t) >= MIN_TERM_LENGTH]
+    short_terms = [t for t in terms if len(t) < MIN_TERM_LENGTH]
+    return long_terms, short_terms
+
+
+def build_match_expression(terms: List[str]) -> Optional[str]:
+    """每个词作为短语查询（子串匹配），多个词之间为 AND"""
+    if not terms:
+        return None
+    return " AND ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_ranked_query(long_terms: List[str], short_terms: List[str]):
+    """构造返回 (id, rank, snippet) 的 FTS 子查询文本及参数"""
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    sql = (
+        f"SELECT rowid AS id, bm25({FTS_TABLE}, {weights}) AS rank, "
+        f"snippet({FTS_TABLE}, -1, '{SNIPPET_OPEN}', '{SNIPPET_CLOSE}', '...', {SNIPPET_TOKENS}) AS snippet "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+    )
+    binds = {"match": build_match_expression(long_terms)}
+
+    for i, term in enumerate(short_terms):
+        key = f"short_{i}"
+        binds[key] = f"%{escape_like(term)}%"
+        sql += (
+            f" AND (title LIKE :{key} ESCAPE '\\' OR content LIKE :{key} ESCAPE '\\'"
+            f" OR analysis LIKE :{key} ESCAPE '\\')"
+        )
+
+    return sql, binds
@@ -0,0 +1,317 @@
+import logging
+import os
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import Question, QuestionTag, Tag
+from app.services.fuzzy import tokenize
+
+logger = logging.getLogger(__name__)
+
+# 特征哈希的维度（2^20），词表不需要持久化，新词也不会改变已有向量
+N_FEATURES = 1 << 20
+
+# 标题和标签比正文更能代表题目主题
+TITLE_WEIGHT = 3
+TAG_WEIGHT = 2
+
+# 增量写入累积到该数量（或超过题目数的 10%）后合并进主矩阵
+COMPACT_THRESHOLD = 1000
+
+# 持久化文件的格式版本，不一致时重新构建
+FORMAT_VERSION = 1
+
+
+def vectorize(title: str, content: str, tags: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """把题目转换为哈希后的词频向量，返回 (特征下标, 次线性词频)，下标升序"""
+    counts = Counter(tokenize(content or ""))
+    for token in tokenize(title):
+        counts[token] += TITLE_WEIGHT
+    for name in tags:
+        for token in tokenize(name):
+            counts[token] += TAG_WEIGHT
+
+    features: Dict[int, int] = {}
+    for token, count in counts.items():
+        feature = zlib.crc32(token.encode("utf-8")) & (N_FEATURES - 1)
+        features[feature] = features.get(feature, 0) + count
+
+    indices = np.fromiter(features.keys(), dtype=np.int32, count=len(features))
+    data = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+    order = np.argsort(indices)
+    return indices[order], 1.0 + np.log(data[order])
+
+
+def fingerprint(db: Session) -> str:
+    """题目表的指纹（数量、最大 id、最后修改时间），用于判断持久化的矩阵是否过期"""
+    count, max_id, last_update = db.query(
+        func.count(Question.id), func.max(Question.id), func.max(Question.updated_at)
+    ).one()
+    return f"{count}:{max_id}:{last_update}"
+
+
+class SimilarityIndex:
+    """基于 TF-IDF 余弦相似度的相似题目索引
+
+    主矩阵是按行存储题目词频的稀疏矩阵（同时保留一份按列存储的副本，
+    查询时只取查询向量涉及的列）；新增或修改的题目先放在增量区，
+    删除只做标记，累积到一定数量后合并。IDF 在查询时按当前文档频率计算，
+    文档向量的模长在合并时按当时的 IDF 计算，两次合并之间略有偏差。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._matrix = sp.csr_matrix((0, N_FEATURES), dtype=np.float32)
+        self._columns = self._matrix.tocsc()
+        self._ids = np.empty(0, dtype=np.int64)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._alive = np.empty(0, dtype=bool)
+        self._rows: Dict[int, int] = {}  # 题目 id -> 主矩阵行号
+        self._delta: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._df = np.zeros(N_FEATURES, dtype=np.int32)
+        self._dead = 0
+
+    def build(self, db: Session) -> int:
+        """从数据库全量构建"""
+        rows = db.query(Question.id, Question.title, Question.content).order_by(Question.id).all()
+        tag_rows = db.query(QuestionTag.question_id, Tag.name) \
+            .join(Tag, Tag.id == QuestionTag.tag_id) \
+            .order_by(QuestionTag.question_id, QuestionTag.position).all()
+
+        tags_by_question: Dict[int, List[str]] = {}
+        for question_id, name in tag_rows:
+            tags_by_question.setdefault(question_id, []).append(name)
+
+        vectors = {
+            question_id: vectorize(title, content, tags_by_question.get(question_id, []))
+            for question_id, title, content in rows
+        }
+        with self._lock:
+            self._reset()
+            self._delta = vectors
+            for indices, _ in vectors.values():
+                self._df[indices] += 1
+            self._compact()
+            logger.info(f"相似题目索引构建完成: {len(vectors)} 条题目")
+            return len(vectors)
+
+    def add(self, question_id: int, title: str, content: str, tags: List[str]) -> None:
+        with self._lock:
+            self.remove(question_id)
+            indices, data = vectorize(title, content, tags)
+            self._delta[question_id] = (indices, data)
+            self._df[indices] += 1
+            self._maybe_compact()
+
+    def remove(self, question_id: int) -> None:
+        with self._lock:
+            vector = self._delta.pop(question_id, None)
+            if vector is not None:
+                self._df[vector[0]] -= 1
+                return
+            row = self._rows.pop(question_id, None)
+            if row is None:
+                return
+            start, end = self._matrix.indptr[row], self._matrix.indptr[row + 1]
+            self._df[self._matrix.indices[start:end]] -= 1
+            self._alive[row] = False
+            self._dead += 1
+            self._maybe_compact()
+
+    def on_question_write(self, event: str, question_id: int, question: Optional[Question]) -> None:
+        """crud 写入回调"""
+        if event == "delete" or question is None:
+            self.remove(question_id)
+        else:
+            self.add(question_id, question.title, question.content, question.tags)
+
+    def similar_to_question(self, question_id: int, limit: int = 10) -> Optional[List[Tuple[int, float]]]:
+        """与指定题目最相似的题目（不含自身）；题目不在索引中时返回 None"""
+        with self._lock:
+            vector = self._delta.get(question_id)
+            if vector is None:
+                row = self._rows.get(question_id)
+                if row is None:
+                    return None
+                start, end = self._matrix.indptr[row], self._matrix.indptr[row + 1]
+                vector = (self._matrix.indices[start:end], self._matrix.data[start:end])
+            return self._top_k(vector, limit, exclude=question_id)
+
+    def similar_to_text(self, text: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """与一段文本最相似的题目"""
+        with self._lock:
+            return self._top_k(vectorize(text, "", []), limit)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "questions": len(self._rows) + len(self._delta),
+                "nonzeros": int(self._matrix.nnz),
+                "pending": len(self._delta),
+                "deleted": self._dead,
+            }
+
+    def save(self, path: str, db_fingerprint: str) -> None:
+        """合并增量后写入磁盘（先写临时文件再替换，避免中途退出留下损坏的文件）"""
+        with self._lock:
+            self._compact()
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    format_version=np.array(FORMAT_VERSION),
+                    n_features=np.array(N_FEATURES),
+                    fingerprint=np.array(db_fingerprint),
+                    ids=self._ids,
+                    indptr=self._matrix.indptr,
+                    indices=self._matrix.indices,
+                    data=self._matrix.data,
+                )
+            os.replace(tmp_path, path)
+
+    def load(self, path: str, db_fingerprint: str) -> bool:
+        """从磁盘加载；文件不存在、格式不符或与数据库指纹不一致时返回 False"""
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                if int(stored["format_version"]) != FORMAT_VERSION \
+                        or int(stored["n_features"]) != N_FEATURES \
+                        or str(stored["fingerprint"]) != db_fingerprint:
+                    return False
+                ids = stored["ids"]
+                matrix = sp.csr_matrix(
+                    (stored["data"], stored["indices"], stored["indptr"]),
+                    shape=(len(ids), N_FEATURES),
+                )
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"相似题目索引文件无法读取，将重新构建: {e}")
+            return False
+
+        with self._lock:
+            self._reset()
+            self._df = np.bincount(matrix.indices, minlength=N_FEATURES).astype(np.int32)
+            self._set_matrix(matrix, ids)
+        logger.info(f"相似题目索引已从 {path} 加载: {len(ids)} 条题目")
+        return True
+
+    def load_or_build(self, db: Session, path: str) -> int:
+        """优先加载持久化文件，过期时全量构建并写回"""
+        if not path:
+            return self.build(db)
+        db_fingerprint = fingerprint(db)
+        if self.load(path, db_fingerprint):
+            return len(self._rows)
+        count = self.build(db)
+        try:
+            self.save(path, db_fingerprint)
+        except OSError as e:
+            logger.warning(f"相似题目索引写入 {path} 失败: {e}")
+        return count
+
+    def _idf(self) -> np.ndarray:
+        total = len(self._rows) + len(self._delta)
+        return (np.log((1.0 + total) / (1.0 + self._df)) + 1.0).astype(np.float32)
+
+    def _top_k(
+        self,
+        vector: Tuple[np.ndarray, np.ndarray],
+        limit: int,
+        exclude: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        indices, data = vector
+        if len(indices) == 0:
+            return []
+
+        idf = self._idf()
+        query = data * idf[indices]
+        query_norm = float(np.linalg.norm(query))
+        # 文档侧的 IDF 乘进查询向量，主矩阵只保存词频
+        weights = query * idf[indices]
+
+        ids = [self._ids]
+        scores = [self._columns[:, indices] @ weights / (self._norms * query_norm)]
+        scores[0][~self._alive] = 0.0
+
+        if self._delta:
+            delta_ids = np.fromiter(self._delta, dtype=np.int64, count=len(self._delta))
+            delta_scores = np.zeros(len(delta_ids), dtype=np.float32)
+            for i, (doc_indices, doc_data) in enumerate(self._delta.values()):
+                norm = np.linalg.norm(doc_data * idf[doc_indices])
+                if norm == 0:
+                    continue
+                _, qi, di = np.intersect1d(indices, doc_indices, assume_unique=True, return_indices=True)
+                delta_scores[i] = float(weights[qi] @ doc_data[di]) / (norm * query_norm)
+            ids.append(delta_ids)
+            scores.append(delta_scores)
+
+        ids = np.concatenate(ids)
+        scores = np.concatenate(scores)
+        if exclude is not None:
+            scores[ids == exclude] = 0.0
+
+        k = min(limit, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((ids[top], -scores[top]))]
+        return [(int(ids[i]), round(float(scores[i]), 4)) for i in top if scores[i] > 0]
+
+    def _maybe_compact(self) -> None:
+        pending = len(self._delta) + self._dead
+        if pending >= COMPACT_THRESHOLD or pending * 10 > len(self._rows) + len(self._delta):
+            self._compact()
+
+    def _compact(self) -> None:
+        """把增量区合并进主矩阵并剔除已删除的行"""
+        if not self._delta and not self._dead:
+            return
+        alive_rows = np.flatnonzero(self._alive)
+        parts = [self._matrix[alive_rows]]
+        ids = [self._ids[alive_rows]]
+        if self._delta:
+            indptr = np.zeros(len(self._delta) + 1, dtype=np.int64)
+            indptr[1:] = np.cumsum([len(indices) for indices, _ in self._delta.values()])
+            vectors = list(self._delta.values())
+            parts.append(sp.csr_matrix(
+                (
+                    np.concatenate([data for _, data in vectors]),
+                    np.concatenate([indices for indices, _ in vectors]),
+                    indptr,
+                ),
+                shape=(len(vectors), N_FEATURES),
+                dtype=np.float32,
+            ))
+            ids.append(np.fromiter(self._delta, dtype=np.int64, count=len(self._delta)))
+
+        self._set_matrix(sp.vstack(parts, format="csr", dtype=np.float32), np.concatenate(ids))
+
+    def _set_matrix(self, matrix: sp.csr_matrix, ids: np.ndarray) -> None:
+        matrix.sort_indices()
+        self._matrix = matrix
+        self._columns = matrix.tocsc()
+        self._ids = ids.astype(np.int64)
+        self._rows = {int(question_id): row for row, question_id in enumerate(self._ids)}
+        self._alive = np.ones(len(ids), dtype=bool)
+        self._delta = {}
+        self._dead = 0
+
+        # 模长按当前 IDF 计算，空文档的模长记为无穷大使其得分为 0
+        weighted = matrix.multiply(self._idf()[np.newaxis, :]).tocsr()
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = np.inf
+        self._norms = norms.astype(np.float32)
+
+
+# 全局实例，启动时加载或构建
+similarity_index = SimilarityIndex()
@@ -0,0 +1,194 @@
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import Question, QuestionTag, Tag
+from app.services.textutil import normalize, is_cjk
+
+# 每个索引键只保留前若干字符，前缀超过该长度时按截断后的键匹配
+MAX_KEY_LENGTH = 32
+
+# 题目标题中每个位置最多建立的索引键数，避免超长标题占用过多内存
+MAX_KEYS_PER_TITLE = 64
+
+KIND_TITLE_START = 0
+KIND_TITLE_WORD = 1
+
+
+def _word_starts(text: str) -> List[int]:
+    """可作为前缀起点的位置：英文按单词边界，中日韩文字每个字符都可以作为起点"""
+    starts = []
+    prev = ""
+    for i, ch in enumerate(text):
+        if not ch.isalnum():
+            prev = ch
+            continue
+        if i == 0 or not prev.isalnum() or is_cjk(ch) or is_cjk(prev):
+            starts.append(i)
+        prev = ch
+    return starts
+
+
+class SuggestIndex:
+    """标题和标签的内存前缀索引
+
+    标题的每个单词起点（中文为每个字符）生成一个截断后的后缀作为键，
+    与标签名一起放在有序数组里，用二分查找定位前缀区间。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._keys: List[str] = []
+        self._entries: List[Tuple[str, int, int]] = []  # 与 _keys 对应: (键, 类型, 题目 id)
+        self._titles: Dict[int, str] = {}
+        self._title_keys: Dict[int, List[Tuple[str, int]]] = {}
+        self._tag_keys: List[str] = []
+        self._tag_names: Dict[str, str] = {}  # 规范化键 -> 原始标签名
+        self._tag_questions: Dict[str, Set[int]] = {}
+        self._question_tags: Dict[int, List[str]] = {}
+
+    def build(self, db: Session) -> int:
+        """从数据库全量构建，只读取 id、标题和标签"""
+        titles = db.query(Question.id, Question.title).all()
+        tag_rows = db.query(QuestionTag.question_id, Tag.name) \
+            .join(Tag, Tag.id == QuestionTag.tag_id).all()
+
+        tags_by_question: Dict[int, List[str]] = {}
+        for question_id, name in tag_rows:
+            tags_by_question.setdefault(question_id, []).append(name)
+
+        with self._lock:
+            self._reset()
+            pairs = []
+            for question_id, title in titles:
+                keys = self._title_index_keys(title)
+                self._titles[question_id] = title
+                self._title_keys[question_id] = keys
+                pairs.extend((key, kind, question_id) for key, kind in keys)
+                self._add_tags(question_id, tags_by_question.get(question_id, []))
+
+            pairs.sort()
+            self._entries = pairs
+            self._keys = [key for key, _, _ in pairs]
+            return len(titles)
+
+    def add(self, question_id: int, title: str, tags: List[str]) -> None:
+        with self._lock:
+            self.remove(question_id)
+            keys = self._title_index_keys(title)
+            self._titles[question_id] = title
+            self._title_keys[question_id] = keys
+            for key, kind in keys:
+                entry = (key, kind, question_id)
+                index = bisect_left(self._entries, entry)
+                self._entries.insert(index, entry)
+                self._keys.insert(index, key)
+            self._add_tags(question_id, tags)
+
+    def remove(self, question_id: int) -> None:
+        with self._lock:
+            for key, kind in self._title_keys.pop(question_id, []):
+                index = bisect_left(self._entries, (key, kind, question_id))
+                if index < len(self._entries) and self._entries[index] == (key, kind, question_id):
+                    del self._entries[index]
+                    del self._keys[index]
+            self._titles.pop(question_id, None)
+
+            for name in self._question_tags.pop(question_id, []):
+                key = normalize(name)
+                question_ids = self._tag_questions.get(key)
+                if question_ids is None:
+                    continue
+                question_ids.discard(question_id)
+                if not question_ids:
+                    del self._tag_questions[key]
+                    del self._tag_names[key]
+                    index = bisect_left(self._tag_keys, key)
+                    if index < len(self._tag_keys) and self._tag_keys[index] == key:
+                        del self._tag_keys[index]
+
+    def on_question_write(self, event: str, question_id: int, question: Optional[Question]) -> None:
+        """crud 写入回调"""
+        if event == "delete" or question is None:
+            self.remove(question_id)
+        else:
+            self.add(question_id, question.title, question.tags)
+
+    def suggest(self, prefix: str, limit: int = 10) -> Dict:
+        """返回标题命中的题目和命中的标签，标题开头命中的排在前面"""
+        key = normalize(prefix.strip())[:MAX_KEY_LENGTH]
+        if not key:
+            return {"questions": [], "tags": []}
+
+        with self._lock:
+            # 候选数量有上限，保证短前缀时也是常数级开销
+            candidates = self._scan(self._keys, key, limit * 20)
+            seen = set()
+            ranked = []
+            for index in candidates:
+                _, kind, question_id = self._entries[index]
+                if question_id in seen:
+                    continue
+                seen.add(question_id)
+                title = self._titles[question_id]
+                ranked.append((kind, len(title), question_id, title))
+            ranked.sort()
+
+            tag_keys = [self._tag_keys[i] for i in self._scan(self._tag_keys, key, limit * 20)]
+            tags = sorted(
+                tag_keys,
+                key=lambda k: (-len(self._tag_questions[k]), len(k), k)
+            )[:limit]
+
+            return {
+                "questions": [{"id": qid, "title": title} for _, _, qid, title in ranked[:limit]],
+                "tags": [
+                    {"name": self._tag_names[k], "count": len(self._tag_questions[k])}
+                    for k in tags
+                ],
+            }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "questions": len(self._titles),
+                "title_keys": len(self._keys),
+                "tags": len(self._tag_keys),
+            }
+
+    @staticmethod
+    def _scan(keys: List[str], prefix: str, max_candidates: int) -> range:
+        start = bisect_left(keys, prefix)
+        end = start
+        stop = min(len(keys), start + max_candidates)
+        while end < stop and keys[end].startswith(prefix):
+            end += 1
+        return range(start, end)
+
+    @staticmethod
+    def _title_index_keys(title: str) -> List[Tuple[str, int]]:
+        text = normalize(title)
+        keys = []
+        for position in _word_starts(text)[:MAX_KEYS_PER_TITLE]:
+            kind = KIND_TITLE_START if position == 0 else KIND_TITLE_WORD
+            keys.append((text[position:position + MAX_KEY_LENGTH], kind))
+        return keys
+
+    def _add_tags(self, question_id: int, names: List[str]) -> None:
+        self._question_tags[question_id] = list(names)
+        for name in names:
+            key = normalize(name)
+            if key not in self._tag_questions:
+                self._tag_questions[key] = set()
+                self._tag_names[key] = name
+                insort(self._tag_keys, key)
+            self._tag_questions[key].add(question_id)
+
+
+# 全局实例，启动时构建
+suggest_index = SuggestIndex()
@@ -0,0 +1,32 @@
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+def normalize_tag_names(names) -> List[str]:
+    """去掉首尾空白、空标签和重复标签，保持原有顺序"""
+    result = []
+    seen = set()
+    for name in names or []:
+        if not isinstance(name, str):
+            continue
+        name = name.strip()
+        if name and name not in seen:
+            seen.add(name)
+            result.append(name)
+    return result
+
+
+def rebuild_tag_counts(engine: Engine) -> int:
+    """重新统计标签使用次数（平时由迁移 0003 创建的触发器维护），返回使用中的标签数"""
+    with engine.begin() as conn:
+        return _recount(conn)
+
+
+def _recount(conn) -> int:
+    conn.execute(text(
+        "UPDATE tags SET usage_count = "
+        "(SELECT COUNT(*) FROM question_tags WHERE question_tags.tag_id = tags.id)"
+    ))
+    return conn.execute(text("SELECT COUNT(*) FROM tags WHERE usage_count > 0")).scalar()
@@ -0,0 +1,45 @@
+import re
+import unicodedata
+
+# 列表摘要中正文摘录的最大长度（字符）
+EXCERPT_LENGTH = 160
+
+_FENCED_BLOCK = re.compile(r"```.*?(?:```|$)", re.S)
+_LINE_MARKS = re.compile(r"^\s{0,3}(?:#{1,6}|>|[-*+]|\d+\.)\s+", re.M)
+_LINKS = re.compile(r"!?\[([^\]]*)\]\([^)]*\)")
+# 标识符中间的下划线（snake_case）保留
+_INLINE_MARKS = re.compile(r"[*`~]+|(?<!\w)_+|_+(?!\w)")
+
+# 与 is_cjk 相同的字符范围，供正则字符类使用
+CJK_RANGES = "\u4e00-\u9fff\u3400-\u4dbf\u3040-\u30ff\uac00-\ud7af\uf900-\ufaff"
+
+
+def normalize(value: str) -> str:
+    """NFKC 统一全角/半角，再做大小写折叠"""
+    return unicodedata.normalize("NFKC", value).casefold()
+
+
+def is_cjk(ch: str) -> bool:
+    code = ord(ch)
+    return (
+        0x4E00 <= code <= 0x9FFF      # CJK 统一表意文字
+        or 0x3400 <= code <= 0x4DBF   # 扩展 A
+        or 0x3040 <= code <= 0x30FF   # 平假名、片假名
+        or 0xAC00 <= code <= 0xD7AF   # 韩文音节
+        or 0xF900 <= code <= 0xFAFF   # 兼容表意文字
+    )
+
+
+def normalize_title(title: str) -> str:
+    """题目标题的去重键：normalize 后把连续空白合并为一个空格"""
+    return " ".join(normalize(title).split())
+
+
+def make_excerpt(markdown: str, length: int = EXCERPT_LENGTH) -> str:
+    """正文开头的纯文本摘录：去掉代码块（含 mermaid 图）和常见 markdown 标记，合并空白后截断"""
+    text = _FENCED_BLOCK.sub(" ", markdown or "")
+    text = _LINE_MARKS.sub("", text)
+    text = _LINKS.sub(r"\1", text)
+    text = _INLINE_MARKS.sub("", text)
+    text = " ".join(text.split())
+    return text if len(text) <= length else text[:length - 1] + "…"
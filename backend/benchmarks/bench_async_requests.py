@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+同步 / 异步请求路径的混合负载基准测试
+
+在临时 SQLite 数据库（interview_questions.db 的副本）上同时施加两类负载，比较读请求的吞吐和延迟：
+    read      GET /questions/{id} 和 GET /questions/?q=（关闭查询缓存，每次都访问数据库）
+    generate  模拟 AI 生成：等待上游 --ai-latency 秒后保存一道题目
+另有一个后台线程周期性地持有写锁（--lock-hold），模拟批量写入，生成请求的保存会进入 SQLite 忙等待。
+
+    sync   旧实现：def 路由 + get_db，慢调用和忙等待都占用 Starlette 线程池（默认 40 个线程）
+    async  async def 路由 + get_read_db（aiosqlite 只读连接），写入交给 db_writer 写线程，读请求使用实际的 questions 路由
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_async_requests.py [--duration 10] [--readers 20] [--generators 60] [--ai-latency 0.5]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# 配置在导入 app 之前确定：使用临时数据库副本，关闭查询缓存和相似度索引持久化
+_tmp = tempfile.mkdtemp()
+DB_PATH = os.path.join(_tmp, "bench.db")
+shutil.copy(os.path.join(BACKEND_DIR, "interview_questions.db"), DB_PATH)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["QUERY_CACHE_MAX_SIZE"] = "0"
+os.environ["SIMILARITY_INDEX_PATH"] = ""
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI, HTTPException  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+import app.main  # noqa: E402,F401  建表、迁移并注册写入回调
+from app import crud, crud_async, schemas  # noqa: E402
+from app.api import questions  # noqa: E402
+from app.database import SessionLocal, get_db  # noqa: E402
+from app.models import DifficultyLevel, QuestionCategory  # noqa: E402
+
+QUERIES = ["Redis", "数据库", "React", "算法", "缓存"]
+
+
+def fake_question() -> schemas.QuestionCreate:
+    stamp = uuid.uuid4().hex
+    return schemas.QuestionCreate(
+        title=f"基准测试题目 {stamp}",
+        content=f"基准测试生成的题目内容 {stamp} " + " ".join(uuid.uuid4().hex[:8] for _ in range(16)),
+        category=QuestionCategory.BACKEND,
+        difficulty=DifficultyLevel.MEDIUM,
+        tags=["基准测试"],
+    )
+
+
+def build_sync_app(ai_latency: float) -> FastAPI:
+    bench = FastAPI()
+
+    @bench.get("/questions/{question_id}", response_model=schemas.QuestionResponse)
+    def read_question(question_id: int, db: Session = Depends(get_db)):
+        question = crud.get_question(db, question_id)
+        if not question:
+            raise HTTPException(status_code=404, detail="题目不存在")
+        return question
+
+    @bench.get("/questions/", response_model=schemas.QuestionListResponse)
+    def read_questions(q: str = None, db: Session = Depends(get_db)):
+        params = schemas.QuestionSearchParams(q=q, size=10)
+        items, total, next_cursor = crud.search_questions(db, params)
+        return schemas.QuestionListResponse(
+            items=[schemas.dump_question_summary(item) for item in items],
+            total=total, page=1, size=10, pages=1, next_cursor=next_cursor,
+        )
+
+    @bench.post("/generate")
+    def generate(db: Session = Depends(get_db)):
+        time.sleep(ai_latency)
+        saved, _ = crud.save_generated_questions(db, [fake_question()])
+        return {"saved": len(saved)}
+
+    return bench
+
+
+def build_async_app(ai_latency: float) -> FastAPI:
+    bench = FastAPI()
+    bench.include_router(questions.router, prefix="/questions")
+
+    @bench.post("/generate")
+    async def generate():
+        await asyncio.sleep(ai_latency)
+        saved, _ = await crud_async.save_generated_questions([fake_question()])
+        return {"saved": len(saved)}
+
+    return bench
+
+
+def hold_write_lock(stop: threading.Event, hold: float, interval: float) -> None:
+    """周期性地持有写锁 hold 秒，其他写入在此期间进入忙等待"""
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    try:
+        while not stop.is_set():
+            conn.execute("BEGIN IMMEDIATE")
+            time.sleep(hold)
+            conn.execute("COMMIT")
+            time.sleep(interval)
+    finally:
+        conn.close()
+
+
+async def run_load(bench: FastAPI, args, question_ids):
+    read_latencies = []
+    generated = 0
+    errors = 0
+    deadline = time.perf_counter() + args.duration
+    # 服务端异常（如连接池等待超时）按 500 计入 errors，不中断压测
+    transport = httpx.ASGITransport(app=bench, raise_app_exceptions=False)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def reader():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                if random.random() < 0.5:
+                    request = client.get(f"/questions/{random.choice(question_ids)}")
+                else:
+                    request = client.get("/questions/", params={"q": random.choice(QUERIES)})
+                start = time.perf_counter()
+                response = await request
+                if response.status_code == 200:
+                    read_latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        async def generator():
+            nonlocal generated, errors
+            while time.perf_counter() < deadline:
+                response = await client.post("/generate")
+                if response.status_code == 200:
+                    generated += 1
+                else:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(reader() for _ in range(args.readers)),
+            *(generator() for _ in range(args.generators)),
+        )
+        elapsed = time.perf_counter() - start
+    return read_latencies, generated, errors, elapsed
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同步 / 异步请求路径的混合负载基准测试")
+    parser.add_argument("--duration", type=float, default=10.0, help="每种路径的压测时长（秒）")
+    parser.add_argument("--readers", type=int, default=20, help="并发读客户端数")
+    parser.add_argument("--generators", type=int, default=60, help="并发生成客户端数")
+    parser.add_argument("--ai-latency", type=float, default=0.5, help="模拟的上游生成耗时（秒）")
+    parser.add_argument("--lock-hold", type=float, default=0.05, help="后台写入每次持有写锁的时间（秒），0 表示不模拟")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        question_ids = [question.id for question in crud.get_questions(db, limit=1000)]
+
+    print(f"readers={args.readers} generators={args.generators} ai_latency={args.ai_latency}s lock_hold={args.lock_hold}s")
+    print(f"{'path':>6} {'reads/s':>9} {'read p50 ms':>12} {'read p95 ms':>12} {'read p99 ms':>12} {'generated/s':>12} {'errors':>7}")
+    for name, build in (("sync", build_sync_app), ("async", build_async_app)):
+        stop = threading.Event()
+        locker = None
+        if args.lock_hold > 0:
+            locker = threading.Thread(target=hold_write_lock, args=(stop, args.lock_hold, args.lock_hold), daemon=True)
+            locker.start()
+        try:
+            latencies, generated, errors, elapsed = asyncio.run(run_load(build(args.ai_latency), args, question_ids))
+        finally:
+            stop.set()
+            if locker is not None:
+                locker.join()
+        print(
+            f"{name:>6} {len(latencies) / elapsed:>9.1f} "
+            f"{statistics.median(latencies) * 1000 if latencies else float('nan'):>12.1f} "
+            f"{percentile(latencies, 0.95) * 1000:>12.1f} {percentile(latencies, 0.99) * 1000:>12.1f} "
+            f"{generated / elapsed:>12.1f} {errors:>7}"
+        )
+
+    shutil.rmtree(_tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
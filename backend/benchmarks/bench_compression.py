@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+content / analysis 压缩存储基准测试：明文 vs zlib vs zlib + 预置字典
+
+把数据库（默认 interview_questions.db）迁移到最新版本后复制三份，分别以三种方式保存已有题目：
+    plain   明文（MARKDOWN_COMPRESSION 关闭时的格式）
+    zlib    逐行 zlib 压缩，不使用字典
+    dict    逐行 zlib 压缩，使用从这些题目训练的预置字典（manage.py compress-markdown 的做法）
+VACUUM 后报告：
+    - 数据库文件、questions 表（dbstat）和字典的大小
+    - 转换全部题目的 CPU 时间（压缩开销，约等于每次写入多出的开销）
+    - 冷读延迟：每次读取新建连接（SQLite 页缓存为空），并用 posix_fadvise 丢弃数据库文件的
+      操作系统页缓存，按 id 读取一道题的 content / analysis 并解压
+    - 热读 CPU：连续扫描全部题目并解压，每道题的 CPU 时间
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_compression.py [--db interview_questions.db] [--reads 500] [--level 6]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+parser = argparse.ArgumentParser(description="content / analysis 压缩存储基准测试")
+parser.add_argument("--db", default=os.path.join(BACKEND_DIR, "interview_questions.db"), help="源数据库（会复制后再迁移）")
+parser.add_argument("--reads", type=int, default=500, help="冷读次数")
+parser.add_argument("--level", type=int, default=6, help="zlib 压缩级别")
+args = parser.parse_args()
+
+# 配置在导入 app 之前确定：迁移数据库副本且不在迁移中压缩，关闭相似度索引持久化
+_tmp = tempfile.mkdtemp()
+BASE_PATH = os.path.join(_tmp, "base.db")
+shutil.copy(args.db, BASE_PATH)
+os.environ["DATABASE_URL"] = f"sqlite:///{BASE_PATH}"
+os.environ["MARKDOWN_COMPRESSION"] = "false"
+os.environ["SIMILARITY_INDEX_PATH"] = ""
+
+from sqlalchemy import create_engine, event, text  # noqa: E402
+
+from app.database import engine  # noqa: E402
+from app.migrations import upgrade_database  # noqa: E402
+from app.services.compression import (  # noqa: E402
+    DICTIONARY_SIZE, MIN_DICTIONARY_SIZE, SQL_FUNCTION, MarkdownCodec, convert_questions, train_dictionary,
+)
+from app.services.search_index import ensure_search_index, sync_triggers  # noqa: E402
+
+
+def file_size(path):
+    return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+
+
+def drop_os_cache(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def prepare(name, use_dictionary):
+    """复制迁移后的数据库并按指定方式转换，返回 (路径, 编解码器, 字典字节数, 转换 CPU 秒)"""
+    path = os.path.join(_tmp, f"{name}.db")
+    shutil.copy(BASE_PATH, path)
+    codec = MarkdownCodec(enabled=True, level=args.level)
+    variant = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(variant, "connect")
+    def register(dbapi_conn, connection_record):
+        dbapi_conn.create_function(SQL_FUNCTION, 1, codec.decompress, deterministic=True)
+
+    with variant.connect() as conn:
+        # 从副本自己的字典表加载（此时为空），不读取全局数据库
+        codec.load(conn)
+
+    dictionary_bytes = 0
+    cpu = 0.0
+    if name != "plain":
+        with variant.begin() as conn:
+            # 与 compress_questions 相同，转换前换成 md_text 版本的全文索引触发器
+            sync_triggers(conn, md_text=True)
+            start = time.process_time()
+            if use_dictionary:
+                samples = [value for row in conn.execute(text("SELECT content, analysis FROM questions")) for value in row if value]
+                sample_bytes = sum(len(sample.encode("utf-8")) for sample in samples)
+                data = train_dictionary(samples, size=min(DICTIONARY_SIZE, max(MIN_DICTIONARY_SIZE, sample_bytes // 8)))
+                new_id = conn.execute(
+                    text("INSERT INTO compression_dictionaries (data, sample_count) VALUES (:data, :count)"),
+                    {"data": data, "count": len(samples)},
+                ).lastrowid
+                codec.add(new_id, data)
+                dictionary_bytes = len(data)
+            convert_questions(conn, compress=True, codec=codec)
+            cpu = time.process_time() - start
+
+    with variant.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    variant.dispose()
+    return path, codec, dictionary_bytes, cpu
+
+
+def measure(path, codec, ids):
+    conn = sqlite3.connect(path)
+    table_bytes = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = 'questions'").fetchone()[0]
+    text_bytes = sum(
+        len(value) if isinstance(value, bytes) else len(value.encode("utf-8"))
+        for row in conn.execute("SELECT content, analysis FROM questions") for value in row if value is not None
+    )
+    conn.close()
+
+    # 冷读：每次都是新连接，并丢弃操作系统缓存的文件页
+    latencies = []
+    for question_id in ids:
+        drop_os_cache(path)
+        start = time.perf_counter()
+        conn = sqlite3.connect(path)
+        row = conn.execute("SELECT content, analysis FROM questions WHERE id = ?", (question_id,)).fetchone()
+        codec.decompress(row[0])
+        codec.decompress(row[1])
+        latencies.append(time.perf_counter() - start)
+        conn.close()
+
+    # 热读：同一个连接连续扫描全部题目并解压
+    conn = sqlite3.connect(path)
+    rows = 0
+    start = time.process_time()
+    for _ in range(20):
+        for content, analysis in conn.execute("SELECT content, analysis FROM questions"):
+            codec.decompress(content)
+            codec.decompress(analysis)
+            rows += 1
+    scan_cpu = (time.process_time() - start) / rows
+    conn.close()
+    return table_bytes, text_bytes, latencies, scan_cpu
+
+
+def main():
+    upgrade_database(engine)
+    ensure_search_index(engine)
+    engine.dispose()
+
+    with sqlite3.connect(BASE_PATH) as conn:
+        all_ids = [row[0] for row in conn.execute("SELECT id FROM questions")]
+    random.seed(0)
+    ids = [random.choice(all_ids) for _ in range(args.reads)]
+
+    print(f"{len(all_ids)} 道题，冷读 {args.reads} 次，zlib level={args.level}")
+    print(f"{'mode':>6} {'db KB':>8} {'table KB':>9} {'text KB':>8} {'dict KB':>8} {'convert ms':>11} "
+          f"{'cold p50 us':>12} {'cold p95 us':>12} {'scan us/row':>12}")
+    for name, use_dictionary in (("plain", False), ("zlib", False), ("dict", True)):
+        path, codec, dictionary_bytes, convert_cpu = prepare(name, use_dictionary)
+        table_bytes, text_bytes, latencies, scan_cpu = measure(path, codec, ids)
+        print(
+            f"{name:>6} {file_size(path) / 1024:>8.1f} {table_bytes / 1024:>9.1f} {text_bytes / 1024:>8.1f} "
+            f"{dictionary_bytes / 1024:>8.1f} {convert_cpu * 1000:>11.1f} "
+            f"{statistics.median(latencies) * 1e6:>12.0f} {percentile(latencies, 0.95) * 1e6:>12.0f} "
+            f"{scan_cpu * 1e6:>12.1f}"
+        )
+
+    shutil.rmtree(_tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
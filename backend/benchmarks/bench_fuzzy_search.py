@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+容错搜索基准测试
+
+在内存中构建 10 万道合成题目的 trigram 索引，统计典型拼写错误查询的延迟。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_fuzzy_search.py [--questions 100000]
+"""
+
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.fuzzy import FuzzyIndex  # noqa: E402
+
+TERMS = [
+    "Kubernetes", "Redis", "MySQL", "PostgreSQL", "Kafka", "Docker", "React", "Vue",
+    "TypeScript", "JavaScript", "Python", "Golang", "Nginx", "Elasticsearch", "MongoDB",
+    "RabbitMQ", "gRPC", "GraphQL", "WebSocket", "HTTP/2", "TCP", "OAuth", "JWT", "Linux",
+    "二分查找", "链表", "哈希表", "分布式锁", "缓存穿透", "事务隔离", "索引优化", "负载均衡",
+    "微服务", "消息队列", "限流", "熔断", "虚拟DOM", "状态管理", "性能优化", "垃圾回收",
+]
+TEMPLATES = [
+    "{a} 中的 {b} 实现原理", "如何用 {a} 实现 {b}", "{a} 与 {b} 的对比", "{a} {b} 面试题",
+    "深入理解 {a}", "{a} 的 {b} 问题排查", "基于 {a} 的 {b} 设计",
+]
+QUERIES = ["Kuberentes", "Reids", "Postgre", "Elasticsaerch", "RabbitQM", "二分查zhao", "缓存传透", "Typscript"]
+
+
+SYLLABLES = ["ka", "lo", "mi", "ter", "ran", "sol", "ve", "dex", "pu", "zor", "qua", "nix", "bel", "tro", "gi", "fen"]
+
+
+def vocabulary(rng, size):
+    """随机生成的英文/中文词，真实术语插在词频较高（但不是最高）的位置"""
+    han = [chr(0x4E00 + i) for i in rng.sample(range(0x5000), 3000)]
+    words = []
+    while len(words) < size - len(TERMS):
+        if rng.random() < 0.5:
+            words.append("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize())
+        else:
+            words.append("".join(rng.choice(han) for _ in range(rng.randint(2, 4))))
+    for term in TERMS:
+        words.insert(rng.randint(20, 200), term)
+    return words
+
+
+def synthetic_titles(n, seed=42):
+    rng = random.Random(seed)
+    words = vocabulary(rng, 20000)
+    tags = words[:600]
+    # 词频服从 Zipf 分布
+    word_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    tag_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(tags))))
+    for i in range(n):
+        a, b = rng.choices(words, cum_weights=word_weights, k=2)
+        title = rng.choice(TEMPLATES).format(a=a, b=b)
+        yield i + 1, title, rng.choices(tags, cum_weights=tag_weights, k=3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="容错搜索基准测试")
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    index = FuzzyIndex()
+    start = time.perf_counter()
+    for question_id, title, tags in synthetic_titles(args.questions):
+        index.add(question_id, title, tags)
+    print(f"构建索引: {args.questions} 条题目, {time.perf_counter() - start:.2f}s, {index.stats()}")
+
+    print(f"{'查询':<16}{'匹配题目':>10}{'返回':>8}{'p50(ms)':>10}{'p99(ms)':>10}")
+    for query in QUERIES:
+        matched = len(index.search(query, limit=args.questions))
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results = index.search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        print(f"{query:<16}{matched:>10}{len(results):>8}{statistics.median(timings):>10.2f}{p99:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
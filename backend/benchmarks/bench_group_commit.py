@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+并发写入基准测试：各线程直接提交 vs 交给 db_writer 组提交
+
+在临时 SQLite 数据库（interview_questions.db 的副本）上，用 --writers 个线程持续创建题目：
+    direct  旧实现：每个线程用自己的 SessionLocal 会话调用 crud.create_question 并提交，
+            写线程之间争抢 SQLite 写锁，拿不到锁时进入 busy_timeout 忙等待
+    writer  每个线程调用 db_writer.run(crud.create_question, ...)，由单个写线程组提交
+
+--synchronous FULL 时每次提交都要 fsync，更接近组提交节省的那部分开销。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_group_commit.py [--duration 5] [--writers 32] [--synchronous NORMAL]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# 配置在导入 app 之前确定：使用临时数据库副本，关闭查询缓存和相似度索引持久化
+_tmp = tempfile.mkdtemp()
+DB_PATH = os.path.join(_tmp, "bench.db")
+shutil.copy(os.path.join(BACKEND_DIR, "interview_questions.db"), DB_PATH)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["QUERY_CACHE_MAX_SIZE"] = "0"
+os.environ["SIMILARITY_INDEX_PATH"] = ""
+
+from sqlalchemy import event  # noqa: E402
+
+import app.main  # noqa: E402,F401  建表、迁移并注册写入回调
+from app import crud, schemas  # noqa: E402
+from app.database import SessionLocal, engine, write_engine  # noqa: E402
+from app.models import DifficultyLevel, QuestionCategory  # noqa: E402
+from app.services.db_writer import GroupCommitWriter  # noqa: E402
+
+
+def fake_question() -> schemas.QuestionCreate:
+    stamp = uuid.uuid4().hex
+    return schemas.QuestionCreate(
+        title=f"基准测试题目 {stamp}",
+        content=f"基准测试生成的题目内容 {stamp} " + " ".join(uuid.uuid4().hex[:8] for _ in range(16)),
+        category=QuestionCategory.BACKEND,
+        difficulty=DifficultyLevel.MEDIUM,
+        tags=["基准测试", f"标签{stamp[:2]}"],
+    )
+
+
+def create_direct(question: schemas.QuestionCreate) -> None:
+    db = SessionLocal()
+    try:
+        crud.create_question(db, question)
+    finally:
+        db.close()
+
+
+def run_load(write, args):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            question = fake_question()
+            start = time.perf_counter()
+            try:
+                write(question)
+            except Exception:
+                with lock:
+                    errors += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发写入基准测试：直接提交 vs 组提交")
+    parser.add_argument("--duration", type=float, default=5.0, help="每种写入方式的压测时长（秒）")
+    parser.add_argument("--writers", type=int, default=32, help="并发写入线程数")
+    parser.add_argument("--max-batch", type=int, default=64, help="组提交每批最多的写操作数")
+    parser.add_argument("--synchronous", default="NORMAL", choices=["OFF", "NORMAL", "FULL"], help="SQLite synchronous 设置")
+    args = parser.parse_args()
+
+    @event.listens_for(engine, "connect")
+    @event.listens_for(write_engine, "connect")
+    def set_synchronous(dbapi_conn, connection_record):
+        dbapi_conn.execute(f"PRAGMA synchronous={args.synchronous}")
+
+    writer = GroupCommitWriter(max_batch=args.max_batch)
+    writer.start()
+
+    print(f"writers={args.writers} synchronous={args.synchronous} max_batch={args.max_batch}")
+    print(f"{'mode':>7} {'writes/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'ops/commit':>11}")
+    for name, write in (("direct", create_direct), ("writer", lambda question: writer.run(crud.create_question, question))):
+        latencies, errors, elapsed = run_load(write, args)
+        per_commit = writer.stats()["operations_per_commit"] if name == "writer" else 1.0
+        print(
+            f"{name:>7} {len(latencies) / elapsed:>9.1f} "
+            f"{statistics.median(latencies) * 1000 if latencies else float('nan'):>8.1f} "
+            f"{percentile(latencies, 0.95) * 1000:>8.1f} {percentile(latencies, 0.99) * 1000:>8.1f} "
+            f"{errors:>7} {per_commit:>11.1f}"
+        )
+
+    writer.shutdown()
+    shutil.rmtree(_tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
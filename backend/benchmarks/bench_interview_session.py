@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+面试抽题基准测试
+
+在临时 SQLite 数据库中生成不同规模的合成题目，比较三种分层抽题方式的延迟：
+    legacy   原实现：每个难度一次 .all() 加载全部题目，再在 Python 中 random.sample
+    window   单条 SQL：ROW_NUMBER() OVER (PARTITION BY difficulty ORDER BY random()) 取各层前 k 个 id，再按 id 加载
+    sampler  内存 id 池抽样（build_interview_session），只用一次 IN 查询加载选中的题目
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_interview_session.py [--sizes 10000,100000,1000000] [--legacy-max 100000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app import crud  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.models import DifficultyLevel, Question, QuestionCategory  # noqa: E402
+from app.schemas import InterviewSessionRequest  # noqa: E402
+from app.services.interview import build_interview_session  # noqa: E402
+from app.services.sampler import random_sampler  # noqa: E402
+
+REQUEST = InterviewSessionRequest(easy_count=3, medium_count=4, hard_count=2)
+
+WINDOW_SQL = text(
+    "SELECT id FROM ("
+    "  SELECT id, difficulty, ROW_NUMBER() OVER (PARTITION BY difficulty ORDER BY random()) AS rn"
+    "  FROM questions"
+    ") WHERE (difficulty = 'EASY' AND rn <= :easy)"
+    "   OR (difficulty = 'MEDIUM' AND rn <= :medium)"
+    "   OR (difficulty = 'HARD' AND rn <= :hard)"
+    " ORDER BY CASE difficulty WHEN 'EASY' THEN 0 WHEN 'MEDIUM' THEN 1 ELSE 2 END"
+)
+
+
+def populate(engine, n, text_size, seed=42):
+    """批量写入合成题目（绕过 ORM 和写入回调）"""
+    rng = random.Random(seed)
+    categories = [category.name for category in QuestionCategory]
+    difficulties = [difficulty.name for difficulty in DifficultyLevel]
+    filler = "面试题解析内容 lorem ipsum " * (text_size // 20 + 1)
+    with engine.begin() as conn:
+        for start in range(0, n, 10000):
+            conn.execute(
+                text(
+                    "INSERT INTO questions(title, content, category, difficulty, analysis, created_at) "
+                    "VALUES (:title, :content, :category, :difficulty, :analysis, CURRENT_TIMESTAMP)"
+                ),
+                [
+                    {
+                        "title": f"合成题目 {i}",
+                        "content": filler[:text_size // 4],
+                        "category": rng.choice(categories),
+                        "difficulty": rng.choice(difficulties),
+                        "analysis": filler[:text_size],
+                    }
+                    for i in range(start, min(n, start + 10000))
+                ],
+            )
+
+
+def legacy(db):
+    selected = []
+    for difficulty, count in (
+        (DifficultyLevel.EASY, REQUEST.easy_count),
+        (DifficultyLevel.MEDIUM, REQUEST.medium_count),
+        (DifficultyLevel.HARD, REQUEST.hard_count),
+    ):
+        rows = db.query(Question).filter(Question.difficulty == difficulty).all()
+        selected.extend(random.sample(rows, min(count, len(rows))))
+    return selected
+
+
+def window(db):
+    ids = [row[0] for row in db.execute(WINDOW_SQL, {
+        "easy": REQUEST.easy_count, "medium": REQUEST.medium_count, "hard": REQUEST.hard_count,
+    })]
+    return crud.get_questions_by_ids(db, ids)
+
+
+def sampler(db):
+    return build_interview_session(db, REQUEST)
+
+
+def measure(fn, db, repeat):
+    timings = []
+    for _ in range(repeat):
+        db.expunge_all()
+        start = time.perf_counter()
+        result = fn(db)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert len(result) == REQUEST.easy_count + REQUEST.medium_count + REQUEST.hard_count
+    timings.sort()
+    return statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="面试抽题基准测试")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--text-size", type=int, default=1000, help="每道题 analysis 的字符数")
+    parser.add_argument("--legacy-max", type=int, default=100_000, help="超过该规模时跳过 legacy（逐行加载过慢）")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'questions':>10} {'method':>8} {'p50 ms':>10} {'p99 ms':>10}")
+    for n in (int(size) for size in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            Base.metadata.create_all(bind=engine)
+            populate(engine, n, args.text_size)
+            db = sessionmaker(bind=engine)()
+            try:
+                start = time.perf_counter()
+                random_sampler.build(db)
+                print(f"{n:>10} {'build':>8} {(time.perf_counter() - start) * 1000:>10.1f}")
+
+                methods = [("window", window), ("sampler", sampler)]
+                if n <= args.legacy_max:
+                    methods.insert(0, ("legacy", legacy))
+                for name, fn in methods:
+                    repeat = 3 if name == "legacy" else args.repeat
+                    p50, p99 = measure(fn, db, repeat)
+                    print(f"{n:>10} {name:>8} {p50:>10.2f} {p99:>10.2f}")
+            finally:
+                db.close()
+                engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+API 响应序列化基准测试：pydantic 校验 + json vs 直接生成 dict + orjson
+
+从数据库（interview_questions.db 的副本）加载题目，凑成 --size 道题的一页，比较三种响应的
+序列化耗时（从已加载的 ORM 对象到响应体字节，不含查询）：
+    summary   列表摘要（默认字段）
+    practice  列表摘要 + fields=content,analysis,created_at（随机选题、面试模式）
+    detail    完整题目（QuestionResponse 形状，详情、创建、更新）
+    before  构造 pydantic 模型，经 FastAPI 按 response_model 再次校验和序列化（tags 经过
+            parse_tags 校验器），再用标准库 json 编码（JSONResponse）
+    after   schemas.dump_question_summary / dump_question 直接从行生成 dict，用 orjson 编码（ORJSONResponse）
+两种方式输出的 JSON 解析后必须相同，否则退出。
+
+用法（在 backend 目录下）：
+    python benchmarks/bench_serialization.py [--size 100] [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+parser = argparse.ArgumentParser(description="API 响应序列化基准测试")
+parser.add_argument("--size", type=int, default=100, help="每页题目数")
+parser.add_argument("--repeat", type=int, default=200, help="每种情况的重复次数")
+args = parser.parse_args()
+
+# 配置在导入 app 之前确定：使用临时数据库副本，关闭相似度索引持久化
+_tmp = tempfile.mkdtemp()
+DB_PATH = os.path.join(_tmp, "bench.db")
+shutil.copy(os.path.join(BACKEND_DIR, "interview_questions.db"), DB_PATH)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["SIMILARITY_INDEX_PATH"] = ""
+
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from app import crud, schemas  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.migrations import upgrade_database  # noqa: E402
+from app.models import Question  # noqa: E402
+
+PRACTICE_FIELDS = ("content", "analysis", "created_at")
+
+LIST_FIELD = create_response_field("response", schemas.QuestionListResponse)
+DETAIL_FIELD = create_response_field("response", List[schemas.QuestionResponse])
+
+
+def serialize_response(field, response_content, exclude_unset=False):
+    """fastapi.routing.serialize_response 的同步部分：按 response_model 校验后序列化"""
+    value, errors = field.validate(response_content, {}, loc=("response",))
+    assert not errors, errors
+    return field.serialize(value, mode="json", exclude_unset=exclude_unset)
+
+
+def summary_model(question, fields):
+    """改动前 QuestionSummary.from_question 的做法：经 pydantic 构造模型"""
+    data = {
+        "id": question.id,
+        "title": question.title,
+        "category": question.category,
+        "difficulty": question.difficulty,
+        "tags": question.tags,
+        "snippet": getattr(question, "snippet", None) or question.excerpt,
+        "score": getattr(question, "score", None),
+    }
+    for name in fields:
+        data[name] = getattr(question, name)
+    return schemas.QuestionSummary(**data)
+
+
+def before_list(questions, fields):
+    page = schemas.QuestionListResponse(
+        items=[summary_model(question, fields) for question in questions],
+        total=len(questions), page=1, size=len(questions), pages=1,
+    )
+    content = serialize_response(field=LIST_FIELD, response_content=page, exclude_unset=True)
+    return JSONResponse(content=content).body
+
+
+def after_list(questions, fields):
+    return ORJSONResponse(content={
+        "items": [schemas.dump_question_summary(question, fields) for question in questions],
+        "total": len(questions), "page": 1, "size": len(questions), "pages": 1,
+    }).body
+
+
+def before_detail(questions, fields):
+    content = serialize_response(field=DETAIL_FIELD, response_content=questions)
+    return JSONResponse(content=content).body
+
+
+def after_detail(questions, fields):
+    return ORJSONResponse(content=[schemas.dump_question(question) for question in questions]).body
+
+
+CASES = [
+    ("summary", (), before_list, after_list),
+    ("practice", PRACTICE_FIELDS, before_list, after_list),
+    ("detail", (), before_detail, after_detail),
+]
+
+
+def timed(func, questions, fields):
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        func(questions, fields)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e3, min(samples) * 1e3
+
+
+def main():
+    upgrade_database(engine)
+    db = SessionLocal()
+    ids = [row[0] for row in db.query(Question.id).order_by(Question.id)]
+    loaded = crud.get_questions_by_ids(db, ids)
+    # 题目不足一页时重复使用
+    questions = [loaded[i % len(loaded)] for i in range(args.size)]
+
+    print(f"每页 {args.size} 道题（{len(loaded)} 道不同的题目），每种情况重复 {args.repeat} 次，单位 ms/页")
+    print(f"{'case':>9} {'bytes':>8} {'before p50':>11} {'before min':>11} {'after p50':>10} {'after min':>10} {'speedup':>8}")
+    for name, fields, before, after in CASES:
+        expected, actual = before(questions, fields), after(questions, fields)
+        if json.loads(expected) != json.loads(actual):
+            print(f"{name}: 两种方式的输出不一致")
+            return 1
+        before_p50, before_min = timed(before, questions, fields)
+        after_p50, after_min = timed(after, questions, fields)
+        print(
+            f"{name:>9} {len(actual):>8} {before_p50:>11.3f} {before_min:>11.3f} "
+            f"{after_p50:>10.3f} {after_min:>10.3f} {before_p50 / after_p50:>7.1f}x"
+        )
+
+    db.close()
+    shutil.rmtree(_tmp, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,13 +6,18 @@
 
 import os
 import sys
-import json
 from sqlalchemy.orm import Session
 from app.database import SessionLocal, engine
-from app.models import Base, Question, DifficultyLevel, QuestionCategory
+from app.models import Question, DifficultyLevel, QuestionCategory
+from app.config import settings
+from app.crud import bulk_create_questions
+from app.schemas import QuestionCreate
+from app.migrations import upgrade_database
+from app.services.compression import load_dictionaries
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
+# 创建数据库表（迁移到最新版本）
+upgrade_database(engine)
+load_dictionaries(engine)
 
 def init_sample_data():
     """初始化示例数据"""
@@ -510,19 +515,14 @@ function diff(oldVNode, newVNode) {
             }
         ]
         
-        # 添加示例数据到数据库
-        for question_data in sample_questions:
-            # 将 tags 列表转换为 JSON 字符串
-            if 'tags' in question_data and isinstance(question_data['tags'], list):
-                question_data['tags'] = json.dumps(question_data['tags'], ensure_ascii=False)
-            question = Question(**question_data)
-            db.add(question)
-        
-        db.commit()
-        print(f"成功添加 {len(sample_questions)} 条示例题目数据")
+        # 添加示例数据到数据库（同一事务内批量插入题目及标签关联）
+        created, skipped = bulk_create_questions(
+            db, [QuestionCreate(**question_data) for question_data in sample_questions],
+            near_duplicates=settings.NEAR_DUPLICATE_MODE,
+        )
+        print(f"成功添加 {len(created)} 条示例题目数据，跳过 {len(skipped)} 条重复标题")
         
     except Exception as e:
-        db.rollback()
         print(f"添加数据失败: {e}")
         raise
     finally:
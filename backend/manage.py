@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+后端管理命令
+
+用法：
+    python manage.py migrate                 把数据库迁移到最新版本（--downgrade 回退，--show 只查看版本）
+    python manage.py rebuild-search-index    重建 FTS5 全文索引
+    python manage.py rebuild-facets          重新统计类别 × 难度分面计数
+    python manage.py migrate-tags            重新统计标签使用次数（旧版 JSON 标签列由迁移 0003 转换）
+    python manage.py rebuild-similarity      重建相似题目 TF-IDF 矩阵并写入磁盘
+    python manage.py backfill-minhash        回填 MinHash 签名并列出近似重复的题目簇
+    python manage.py fill-bank               按目标矩阵补齐各 类别 × 难度 的题目（--dry-run 只看计划）
+    python manage.py compress-markdown       压缩已有题目的 content / analysis（--retrain 重新训练字典，--decompress 还原）
+"""
+
+import argparse
+import sys
+
+from app.database import engine
+from app.migrations import upgrade_database
+
+
+def prepare_database():
+    """迁移到最新版本并加载压缩字典（读取压缩保存的题目需要）"""
+    from app.services.compression import load_dictionaries
+
+    upgrade_database(engine)
+    load_dictionaries(engine)
+
+
+def migrate(args):
+    """升级或回退数据库结构"""
+    from alembic import command
+    from app.migrations import alembic_config, current_revision, head_revision
+
+    before = current_revision(engine)
+    if args.show:
+        print(f"当前版本 {before or '(未版本化)'}，最新版本 {head_revision()}")
+        return
+    if args.downgrade:
+        command.downgrade(alembic_config(engine), args.downgrade)
+        after = current_revision(engine)
+    else:
+        after = upgrade_database(engine, args.revision)
+    print(f"数据库版本 {before or '(未版本化)'} -> {after or '(未版本化)'}")
+
+
+def rebuild_search_index(args):
+    """重建全文索引（用于回填已有数据库）"""
+    from app.services.search_index import rebuild_search_index as rebuild
+
+    prepare_database()
+    count = rebuild(engine)
+    print(f"全文索引重建完成，共索引 {count} 条题目")
+
+
+def rebuild_facets(args):
+    """重新统计分面计数"""
+    from app.services.facets import rebuild_facets as rebuild
+
+    prepare_database()
+    total = rebuild(engine)
+    print(f"分面统计重建完成，共 {total} 条题目")
+
+
+def migrate_tags(args):
+    """迁移到最新版本（包括旧版 JSON 标签列的转换）并重新统计标签使用次数"""
+    from app.services.tags import rebuild_tag_counts
+
+    prepare_database()
+    used = rebuild_tag_counts(engine)
+    print(f"标签统计完成：当前使用中的标签 {used} 个")
+
+
+def rebuild_similarity(args):
+    """全量重建相似题目矩阵并写入 SIMILARITY_INDEX_PATH"""
+    from app.config import settings
+    from app.database import SessionLocal
+    from app.services.similar import similarity_index, fingerprint
+
+    prepare_database()
+    db = SessionLocal()
+    try:
+        count = similarity_index.build(db)
+        if settings.SIMILARITY_INDEX_PATH:
+            similarity_index.save(settings.SIMILARITY_INDEX_PATH, fingerprint(db))
+    finally:
+        db.close()
+    print(f"相似题目矩阵重建完成，共 {count} 条题目")
+
+
+def backfill_minhash(args):
+    """计算缺少的 MinHash 签名，再按阈值列出近似重复的题目簇"""
+    from app.config import settings
+    from app.database import SessionLocal
+    from app.models import Question
+    from app.services.minhash import MinHashLSH, backfill_signatures
+
+    prepare_database()
+    written = backfill_signatures(engine, recompute=args.all)
+    print(f"MinHash 签名回填完成：写入 {written} 条题目")
+
+    threshold = args.threshold if args.threshold is not None else settings.NEAR_DUPLICATE_THRESHOLD
+    db = SessionLocal()
+    try:
+        index = MinHashLSH()
+        index.build(db)
+        clusters = index.clusters(threshold)
+        titles = dict(db.query(Question.id, Question.title).filter(
+            Question.id.in_([question_id for cluster in clusters for question_id in cluster])
+        ).all()) if clusters else {}
+    finally:
+        db.close()
+
+    print(f"相似度阈值 {threshold}：发现 {len(clusters)} 个近似重复簇，"
+          f"涉及 {sum(len(cluster) for cluster in clusters)} 条题目")
+    for cluster in clusters[:args.limit]:
+        print(f"- {len(cluster)} 条")
+        for question_id in cluster:
+            print(f"    #{question_id} {titles.get(question_id, '')}")
+
+
+def fill_bank(args):
+    """计算各桶缺口并调度 AI 生成补齐，逐批打印进度"""
+    from app.database import SessionLocal
+    from app.schemas import BankFillRequest
+    from app.services.bank_planner import bank_planner, plan_bank_fill
+
+    prepare_database()
+    request = BankFillRequest(
+        target_per_bucket=args.target,
+        categories=args.category or None,
+        difficulties=args.difficulty or None,
+        concurrency=args.concurrency,
+        token_budget=args.token_budget,
+    )
+
+    def report(run, bucket=None):
+        if bucket is not None:
+            print(f"  {bucket.category.value:<14} {bucket.difficulty.value:<7} "
+                  f"已保存 {bucket.saved}/{bucket.deficit}，跳过 {bucket.skipped}，失败 {bucket.failed}；"
+                  f"累计 {sum(b.saved for b in run.buckets)}/{run.total_deficit} 道，token {run.tokens_used}")
+
+    db = SessionLocal()
+    try:
+        if args.dry_run:
+            run = plan_bank_fill(db, request)
+        else:
+            print("开始补题...")
+            run = bank_planner.run(db, request, on_progress=report)
+    finally:
+        db.close()
+
+    print(f"{'类别':<14} {'难度':<7} {'当前':>5} {'目标':>5} {'缺口':>5} {'保存':>5}  状态")
+    for bucket in run.buckets:
+        if bucket.deficit or bucket.saved:
+            print(f"{bucket.category.value:<14} {bucket.difficulty.value:<7} {bucket.current:>5} "
+                  f"{bucket.target:>5} {bucket.deficit:>5} {bucket.saved:>5}  {bucket.status}")
+    print(f"状态 {run.status}：缺口 {run.total_deficit} 道，保存 {sum(b.saved for b in run.buckets)} 道，"
+          f"估算 token {run.estimated_tokens}，实际 {run.tokens_used}")
+    if run.error:
+        print(f"错误: {run.error}")
+
+
+def _file_size(path):
+    """数据库文件加上 WAL 文件的大小"""
+    import os
+    return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+
+
+def compress_markdown(args):
+    """按当前字典压缩（或还原）已有题目，可选 VACUUM 回收空间"""
+    from app.config import settings
+    from app.services.compression import compress_questions, decompress_questions
+
+    prepare_database()
+    with engine.begin() as conn:
+        if args.decompress:
+            updated, before, after = decompress_questions(conn)
+        else:
+            updated, before, after = compress_questions(conn, retrain=args.retrain)
+    print(f"{'还原' if args.decompress else '压缩'}完成：更新 {updated} 条题目，"
+          f"content / analysis {before / 1024:.1f} KB -> {after / 1024:.1f} KB")
+
+    if not args.decompress and not settings.MARKDOWN_COMPRESSION:
+        print("注意：MARKDOWN_COMPRESSION 未开启，之后新写入的题目仍以明文保存")
+
+    if args.vacuum:
+        path = engine.url.database
+        size = _file_size(path)
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+            # WAL 模式下 VACUUM 的结果先写入 -wal 文件，检查点后主文件才会缩小
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        print(f"VACUUM 完成：数据库文件 {size / 1024:.1f} KB -> {_file_size(path) / 1024:.1f} KB")
+    elif updated:
+        print("释放的页面会被后续写入复用；需要缩小数据库文件时加 --vacuum")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="面试题库后端管理命令")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="把数据库迁移到最新版本")
+    migrate_parser.add_argument("--revision", default="head", help="升级到的目标版本，默认 head")
+    migrate_parser.add_argument("--downgrade", metavar="REVISION", help="回退到指定版本（如 0001、base）")
+    migrate_parser.add_argument("--show", action="store_true", help="只打印当前版本和最新版本")
+    migrate_parser.set_defaults(func=migrate)
+
+    subparsers.add_parser(
+        "rebuild-search-index", help="重建 FTS5 全文索引"
+    ).set_defaults(func=rebuild_search_index)
+    subparsers.add_parser(
+        "rebuild-facets", help="重新统计类别 × 难度分面计数"
+    ).set_defaults(func=rebuild_facets)
+    subparsers.add_parser(
+        "migrate-tags", help="重新统计标签使用次数（旧版 JSON 标签列由迁移转换）"
+    ).set_defaults(func=migrate_tags)
+    subparsers.add_parser(
+        "rebuild-similarity", help="重建相似题目 TF-IDF 矩阵并写入磁盘"
+    ).set_defaults(func=rebuild_similarity)
+    backfill = subparsers.add_parser(
+        "backfill-minhash", help="回填 MinHash 签名并列出近似重复的题目簇"
+    )
+    backfill.add_argument("--all", action="store_true", help="重新计算所有题目的签名")
+    backfill.add_argument("--threshold", type=float, default=None, help="相似度阈值，默认 NEAR_DUPLICATE_THRESHOLD")
+    backfill.add_argument("--limit", type=int, default=20, help="最多列出的簇数")
+    backfill.set_defaults(func=backfill_minhash)
+    fill = subparsers.add_parser(
+        "fill-bank", help="按目标矩阵补齐各 类别 × 难度 的题目"
+    )
+    fill.add_argument("--target", type=int, default=None, help="每个桶的目标题目数，默认 BANK_TARGET_PER_BUCKET")
+    fill.add_argument("--category", action="append", help="只补指定类别（可重复）")
+    fill.add_argument("--difficulty", action="append", help="只补指定难度（可重复）")
+    fill.add_argument("--concurrency", type=int, default=None, help="同时进行的生成数，默认 BANK_FILL_CONCURRENCY")
+    fill.add_argument("--token-budget", type=int, default=None, help="本次最多消耗的估算 token 数")
+    fill.add_argument("--dry-run", action="store_true", help="只打印各桶缺口和估算开销")
+    fill.set_defaults(func=fill_bank)
+    compress = subparsers.add_parser(
+        "compress-markdown", help="压缩已有题目的 content / analysis（MARKDOWN_COMPRESSION）"
+    )
+    compress.add_argument("--retrain", action="store_true", help="用当前题目重新训练压缩字典")
+    compress.add_argument("--decompress", action="store_true", help="把所有题目还原为明文")
+    compress.add_argument("--vacuum", action="store_true", help="完成后 VACUUM，缩小数据库文件")
+    compress.set_defaults(func=compress_markdown)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+本地模拟的 OpenAI 兼容接口，用于在没有 API Key 的情况下调试 AI 生成（含流式生成）
+
+只实现 POST /v1/chat/completions：按提示词中的数量返回固定格式的题目 JSON，
+其中第二道题故意缺少 content 字段，用来验证单题格式错误时不会影响其他题目。
+stream=true 时把内容切成小片段逐个推送，请求带 stream_options.include_usage 时最后推送 usage。
+--error-rate 按比例随机返回错误（默认 429，带 Retry-After），--fail-first 让前 N 个请求都失败，
+用于验证客户端的限流重试和熔断。--truncate-first 让前 N 个成功的响应只返回一半内容
+（finish_reason 为 length，模拟输出被截断），用于验证题目不足时的补齐重试。--fixed-titles 让同类别、同难度、同批次的请求总是返回相同的标题，
+用于验证重复标题被跳过。
+
+用法（在 backend 目录下）：
+    python scripts/fake_openai_server.py [--port 8001] [--delay 0.02] [--error-rate 0.3] [--fail-first 0] [--error-status 429] [--truncate-first 0] [--fixed-titles]
+    OPENAI_BASE_URL_OVERRIDE=http://127.0.0.1:8001/v1 OPENAI_API_KEY_OVERRIDE=fake uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Fake OpenAI")
+
+CHUNK_SIZE = 8
+DELAY = 0.02
+ERROR_RATE = 0.0
+ERROR_STATUS = 429
+FAIL_FIRST = 0
+TRUNCATE_FIRST = 0
+FIXED_TITLES = False
+_requests = 0
+_completions = 0
+
+
+def fake_content(prompt: str) -> str:
+    count_match = re.search(r"请生成(\d+)个", prompt)
+    category_match = re.search(r'"category": "(\w+)"', prompt)
+    difficulty_match = re.search(r'"difficulty": "(\w+)"', prompt)
+    count = int(count_match.group(1)) if count_match else 1
+    category = category_match.group(1) if category_match else "algorithm"
+    difficulty = difficulty_match.group(1) if difficulty_match else "easy"
+    batch_match = re.search(r"这是第(\d+)批", prompt)
+    batch = batch_match.group(1) if batch_match else "1"
+
+    stamp = f"{category}-{difficulty}-{batch}" if FIXED_TITLES else uuid.uuid4().hex[:6]
+    questions = []
+    for i in range(count):
+        question = {
+            "title": f"模拟生成题目 {stamp}-{i + 1}",
+            # 随机关键词让每道题的内容互不相同，不会被近似重复检测拦截
+            "content": f"第 {i + 1} 道题的描述，包含 \"引号\"、{{花括号}} 和 [方括号]。关键词："
+                       + " ".join(uuid.uuid4().hex[:8] for _ in range(16)),
+            "category": category,
+            "difficulty": difficulty,
+            "analysis": "```python\nprint({'a': [1, 2]})\n```",
+            "tags": ["模拟", f"tag-{i + 1}"],
+        }
+        if i == 1:
+            del question["content"]
+        questions.append(question)
+    return "以下是生成的题目：\n```json\n" + json.dumps({"questions": questions}, ensure_ascii=False, indent=2) + "\n```"
+
+
+def fake_usage(prompt: str, content: str) -> dict:
+    return {"prompt_tokens": len(prompt), "completion_tokens": len(content), "total_tokens": len(prompt) + len(content)}
+
+
+def completion_chunk(completion_id: str, model: str, delta: dict, finish_reason=None, usage=None) -> str:
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if usage is None else [],
+    }
+    if usage is not None:
+        chunk["usage"] = usage
+    return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+
+def injected_error():
+    global _requests
+    _requests += 1
+    if _requests > FAIL_FIRST and random.random() >= ERROR_RATE:
+        return None
+    message = "Rate limit reached" if ERROR_STATUS == 429 else "Upstream unavailable"
+    return JSONResponse(
+        {"error": {"message": message, "type": "fake_error", "code": str(ERROR_STATUS)}},
+        status_code=ERROR_STATUS,
+        headers={"Retry-After": "1"} if ERROR_STATUS == 429 else None,
+    )
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    error = injected_error()
+    if error is not None:
+        return error
+    global _completions
+    body = await request.json()
+    model = body.get("model", "fake")
+    prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+    content = fake_content(prompt)
+    finish_reason = "stop"
+    _completions += 1
+    if _completions <= TRUNCATE_FIRST:
+        content = content[:len(content) // 2]
+        finish_reason = "length"
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+    if not body.get("stream"):
+        await asyncio.sleep(DELAY * len(content) / CHUNK_SIZE)
+        return JSONResponse({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": finish_reason,
+            }],
+            "usage": fake_usage(prompt, content),
+        })
+
+    async def events():
+        yield completion_chunk(completion_id, model, {"role": "assistant", "content": ""})
+        for start in range(0, len(content), CHUNK_SIZE):
+            await asyncio.sleep(DELAY)
+            yield completion_chunk(completion_id, model, {"content": content[start:start + CHUNK_SIZE]})
+        yield completion_chunk(completion_id, model, {}, finish_reason=finish_reason)
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield completion_chunk(completion_id, model, {}, usage=fake_usage(prompt, content))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def main():
+    global DELAY, ERROR_RATE, ERROR_STATUS, FAIL_FIRST, TRUNCATE_FIRST, FIXED_TITLES
+    parser = argparse.ArgumentParser(description="本地模拟的 OpenAI 兼容接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=DELAY, help="每个流式片段之间的间隔（秒）")
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE, help="随机返回错误的比例")
+    parser.add_argument("--error-status", type=int, default=ERROR_STATUS, help="注入错误的状态码（429 或 5xx）")
+    parser.add_argument("--fail-first", type=int, default=FAIL_FIRST, help="前 N 个请求都返回错误")
+    parser.add_argument("--truncate-first", type=int, default=TRUNCATE_FIRST, help="前 N 个成功的响应只返回一半内容")
+    parser.add_argument("--fixed-titles", action="store_true", help="标题不带随机后缀，重复请求返回相同的标题")
+    args = parser.parse_args()
+    DELAY = args.delay
+    ERROR_RATE = args.error_rate
+    ERROR_STATUS = args.error_status
+    FAIL_FIRST = args.fail_first
+    TRUNCATE_FIRST = args.truncate_first
+    FIXED_TITLES = args.fixed_titles
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
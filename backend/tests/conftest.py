@@ -0,0 +1,90 @@
+"""测试公共配置
+
+app.config.settings 在导入时读取环境变量，这里必须在任何 app 模块被导入之前执行：
+测试使用临时目录中的新数据库，关闭查询缓存和相似度索引持久化，不读写 backend 下的真实数据；
+OpenAI 接口指向 scripts/fake_openai_server.py，由 fake_openai 夹具按需启动。
+"""
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE_OPENAI_SERVER = os.path.join(BACKEND_DIR, "scripts", "fake_openai_server.py")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+TEST_DIR = tempfile.mkdtemp(prefix="iqb-tests-")
+FAKE_OPENAI_PORT = free_port()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+os.environ["QUERY_CACHE_MAX_SIZE"] = "0"
+os.environ["SIMILARITY_INDEX_PATH"] = ""
+os.environ["OPENAI_BASE_URL_OVERRIDE"] = f"http://127.0.0.1:{FAKE_OPENAI_PORT}/v1"
+os.environ["OPENAI_API_KEY_OVERRIDE"] = "test-key"
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(TEST_DIR, ignore_errors=True)
+
+
+@contextmanager
+def run_fake_openai(port: int, *args: str):
+    """在子进程中启动模拟 OpenAI 服务，端口可连接后返回 base_url"""
+    process = subprocess.Popen(
+        [sys.executable, FAKE_OPENAI_SERVER, "--port", str(port), *args],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 15
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"模拟 OpenAI 服务启动失败，退出码 {process.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("模拟 OpenAI 服务启动超时")
+                time.sleep(0.05)
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+@pytest.fixture(scope="session")
+def fake_openai():
+    """应用使用的模拟 OpenAI 服务：不注入错误，标题固定（重复请求返回相同的标题）"""
+    with run_fake_openai(FAKE_OPENAI_PORT, "--delay", "0", "--fixed-titles") as base_url:
+        yield base_url
+
+
+@pytest.fixture
+def fake_openai_factory():
+    """按参数启动独立的模拟 OpenAI 服务（如 --fail-first 3 --error-status 429），测试结束后关闭"""
+    with ExitStack() as stack:
+        yield lambda *args: stack.enter_context(run_fake_openai(free_port(), *args))
+
+
+@pytest.fixture(scope="session")
+def client():
+    """执行应用启动 / 关闭流程（迁移临时数据库、构建内存索引、启动写线程）的测试客户端"""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
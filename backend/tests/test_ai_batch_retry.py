@@ -0,0 +1,43 @@
+"""AIService 子批次补齐：输出被截断或题目格式错误时只按缺少的数量重试，次数受 retries 限制"""
+from openai import AsyncOpenAI
+
+from app.models import DifficultyLevel, QuestionCategory
+from app.services.ai_service import AIService
+
+
+def make_service(base_url, retries=2):
+    service = AIService()
+    service.async_client = AsyncOpenAI(api_key="test-key", base_url=base_url, max_retries=0)
+    service.batch_size = 5
+    service.retries = retries
+    return service
+
+
+async def generate(service, count):
+    return await service.generate_questions_async(
+        QuestionCategory.ALGORITHM, DifficultyLevel.MEDIUM, count, client=service.async_client
+    )
+
+
+async def test_short_batch_retried_for_missing_questions(fake_openai_factory):
+    # 第一次响应被截断只剩前半，补齐请求中的第二道题又缺少 content，再补一次后凑满
+    service = make_service(fake_openai_factory("--delay", "0", "--truncate-first", "1"))
+
+    questions = await generate(service, 5)
+
+    stats = service.metrics.stats()
+    assert len(questions) == 5
+    assert stats["calls"] == 3
+    assert stats["parse"]["items_ok"] == 5
+
+
+async def test_short_batch_retries_are_bounded(fake_openai_factory):
+    # 每次响应都被截断：重试 retries 次后返回已产出的题目，不抛出异常
+    service = make_service(fake_openai_factory("--delay", "0", "--truncate-first", "100"), retries=1)
+
+    questions = await generate(service, 5)
+
+    stats = service.metrics.stats()
+    assert 0 < len(questions) < 5
+    assert stats["calls"] == 2
+    assert stats["questions"]["yielded"] == len(questions)
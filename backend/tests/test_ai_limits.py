@@ -0,0 +1,113 @@
+"""ResilientCaller / CircuitBreaker：经模拟 OpenAI 服务注入 429 / 400，检查重试次数和熔断状态变化"""
+import time
+
+import openai
+import pytest
+from openai import AsyncOpenAI
+
+from app.services.ai_limits import CircuitBreaker, CircuitOpenError, RateLimiter, ResilientCaller
+
+RESET_TIMEOUT = 0.2
+
+
+def make_caller(failure_threshold=3, max_retries=4):
+    # 退避上限很小：忽略模拟服务 429 响应中 Retry-After: 1 的等待
+    return ResilientCaller(
+        limiter=RateLimiter(rpm=0, tpm=0),
+        breaker=CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=RESET_TIMEOUT),
+        max_retries=max_retries,
+        base_delay=0.001,
+        max_delay=0.01,
+    )
+
+
+def completion(base_url):
+    """对模拟服务发起一次非流式调用的函数（客户端自带的重试关闭）"""
+    client = AsyncOpenAI(api_key="test-key", base_url=base_url, max_retries=0)
+    return lambda: client.chat.completions.create(
+        model="fake", messages=[{"role": "user", "content": "请生成1个题目"}]
+    )
+
+
+async def test_rate_limited_calls_are_retried(fake_openai_factory):
+    create = completion(fake_openai_factory("--delay", "0", "--fail-first", "2", "--error-status", "429"))
+    caller = make_caller()
+
+    result = await caller.call(create, estimated_tokens=10)
+
+    assert result.choices[0].message.content
+    assert caller.stats()["calls"] == {"retries": 2, "rate_limited": 2}
+    # 连续失败没有达到阈值，成功后清零
+    assert caller.breaker.stats()["state"] == CircuitBreaker.CLOSED
+    assert caller.breaker.stats()["consecutive_failures"] == 0
+
+
+async def test_breaker_opens_then_half_open_probe_closes_it(fake_openai_factory):
+    # 前 3 个请求返回 429：重试用尽时熔断器正好达到阈值
+    create = completion(fake_openai_factory("--delay", "0", "--fail-first", "3", "--error-status", "429"))
+    caller = make_caller(failure_threshold=3, max_retries=2)
+
+    with pytest.raises(openai.RateLimitError):
+        await caller.call(create, estimated_tokens=10)
+    assert caller.stats()["calls"] == {"retries": 2, "rate_limited": 3}
+    assert caller.breaker.stats()["state"] == CircuitBreaker.OPEN
+    assert caller.breaker.stats()["trips"] == 1
+    assert 0 < caller.breaker.retry_after() <= RESET_TIMEOUT
+
+    # 打开期间直接拒绝，不请求上游
+    with pytest.raises(CircuitOpenError):
+        await caller.call(create, estimated_tokens=10)
+    assert caller.breaker.stats()["rejected"] == 1
+
+    # 超时后进入半开状态，试探调用成功则关闭
+    time.sleep(RESET_TIMEOUT)
+    assert caller.breaker.retry_after() == 0
+    await caller.call(create, estimated_tokens=10)
+    assert caller.breaker.stats()["state"] == CircuitBreaker.CLOSED
+    assert caller.breaker.stats()["consecutive_failures"] == 0
+    assert caller.stats()["calls"]["retries"] == 2
+
+
+async def test_failed_half_open_probe_reopens(fake_openai_factory):
+    create = completion(fake_openai_factory("--delay", "0", "--fail-first", "100", "--error-status", "503"))
+    caller = make_caller(failure_threshold=2, max_retries=1)
+
+    with pytest.raises(openai.InternalServerError):
+        await caller.call(create, estimated_tokens=10)
+    assert caller.breaker.stats()["state"] == CircuitBreaker.OPEN
+
+    time.sleep(RESET_TIMEOUT)
+    # 试探失败立即重新打开，剩余的重试被熔断拒绝
+    with pytest.raises(CircuitOpenError):
+        await caller.call(create, estimated_tokens=10)
+    assert caller.breaker.stats()["state"] == CircuitBreaker.OPEN
+    assert caller.breaker.stats()["trips"] == 2
+
+
+async def test_non_retryable_error_leaves_breaker_unchanged(fake_openai_factory):
+    create = completion(fake_openai_factory("--delay", "0", "--fail-first", "100", "--error-status", "400"))
+    caller = make_caller(failure_threshold=3)
+    caller.breaker.record_failure()
+    caller.breaker.record_failure()
+
+    with pytest.raises(openai.BadRequestError):
+        await caller.call(create, estimated_tokens=10)
+    # 不重试，也不清零之前的连续失败
+    assert caller.stats()["calls"] == {"retries": 0, "rate_limited": 0}
+    assert caller.breaker.stats()["state"] == CircuitBreaker.CLOSED
+    assert caller.breaker.stats()["consecutive_failures"] == 2
+
+
+async def test_non_retryable_probe_keeps_breaker_half_open(fake_openai_factory):
+    create = completion(fake_openai_factory("--delay", "0", "--fail-first", "100", "--error-status", "400"))
+    caller = make_caller(failure_threshold=1)
+    caller.breaker.record_failure()
+    time.sleep(RESET_TIMEOUT)
+
+    with pytest.raises(openai.BadRequestError):
+        await caller.call(create, estimated_tokens=10)
+    assert caller.breaker.stats()["state"] == CircuitBreaker.HALF_OPEN
+    # 试探名额已让出，下一次调用可以立即试探，而不是被当作试探进行中拒绝
+    with pytest.raises(openai.BadRequestError):
+        await caller.call(create, estimated_tokens=10)
+    assert caller.breaker.stats()["rejected"] == 0
@@ -0,0 +1,48 @@
+"""/ai/generate/stream：经模拟 OpenAI 服务的流式响应生成、保存题目并推送 SSE 事件"""
+import json
+
+from app.config import settings
+
+STREAM_URL = f"{settings.API_V1_STR}/ai/generate/stream"
+
+
+def read_events(client, **params):
+    """请求流式生成接口，返回 (事件名, 数据) 列表"""
+    events = []
+    with client.stream("GET", STREAM_URL, params=params) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        name = None
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                name = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((name, json.loads(line[len("data: "):])))
+    return events
+
+
+def test_stream_saves_questions_then_skips_duplicates(client, fake_openai):
+    params = {"category": "database", "difficulty": "hard", "count": 4}
+
+    # 模拟服务每个子批次的第二道题缺少 content，4 道题拆成 2 个子批次，标题去重后保存 2 道
+    events = read_events(client, **params)
+    names = [name for name, _ in events]
+    assert names == ["question", "question", "done"]
+    questions = [data for name, data in events if name == "question"]
+    assert all(question["id"] and question["category"] == "database" for question in questions)
+    assert events[-1][1] == {"saved": 2, "skipped_titles": []}
+    for question in questions:
+        assert client.get(f"{settings.API_V1_STR}/questions/{question['id']}").json()["title"] == question["title"]
+
+    # 固定标题：再次生成得到相同的标题，全部作为重复题目跳过
+    events = read_events(client, **params)
+    assert [name for name, _ in events] == ["skipped", "skipped", "done"]
+    titles = sorted(question["title"] for question in questions)
+    assert sorted(data["title"] for name, data in events if name == "skipped") == titles
+    assert sorted(events[-1][1]["skipped_titles"]) == titles
+    assert events[-1][1]["saved"] == 0
+
+
+def test_stream_rejects_invalid_count(client):
+    response = client.get(STREAM_URL, params={"category": "database", "difficulty": "hard", "count": 0})
+    assert response.status_code == 422
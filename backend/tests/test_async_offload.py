@@ -0,0 +1,61 @@
+"""异步路由中的内存索引计算（容错排序、抽样、TF-IDF）在线程池中执行，不占用事件循环"""
+import asyncio
+
+import pytest
+
+from app import crud_async
+from app.api import questions as questions_api
+from app.config import settings
+
+API = settings.API_V1_STR
+
+
+def on_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+@pytest.fixture
+def offload_calls(monkeypatch):
+    """包装各内存索引入口，记录调用时所在线程是否运行着事件循环"""
+    calls = {}
+
+    def track(target, name, key):
+        original = getattr(target, name)
+
+        def wrapper(*args, **kwargs):
+            calls.setdefault(key, []).append(on_event_loop())
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(target, name, wrapper)
+
+    track(crud_async.fuzzy_index, "search", "fuzzy")
+    track(crud_async.random_sampler, "sample", "sample")
+    track(crud_async.random_sampler, "build_from_rows", "build")
+    track(crud_async, "select_interview_ids", "interview")
+    track(questions_api.similarity_index, "similar_to_text", "similar_text")
+    track(questions_api.similarity_index, "similar_to_question", "similar_question")
+    # 强制重新构建抽样器
+    monkeypatch.setattr(crud_async.random_sampler, "_built", False)
+    return calls
+
+
+def test_index_work_runs_off_the_event_loop(client, offload_calls):
+    created = [
+        client.post(f"{API}/questions/", json={
+            "title": f"线程池测试：{difficulty} 算法题", "content": "实现二分查找算法",
+            "category": "algorithm", "difficulty": difficulty, "tags": ["线程池"],
+        }).json()["id"]
+        for difficulty in ("easy", "medium", "hard")
+    ]
+    assert client.get(f"{API}/questions/search", params={"q": "算法", "mode": "fuzzy", "facets": True}).status_code == 200
+    assert client.get(f"{API}/random/", params={"count": 3}).status_code == 200
+    assert client.get(f"{API}/interview/preset/quick").status_code == 200
+    assert client.get(f"{API}/questions/similar", params={"text": "二分查找"}).status_code == 200
+    assert client.get(f"{API}/questions/{created[0]}/similar").status_code == 200
+
+    assert set(offload_calls) == {"fuzzy", "sample", "build", "interview", "similar_text", "similar_question"}
+    assert not any(on_loop for results in offload_calls.values() for on_loop in results)
@@ -0,0 +1,65 @@
+"""BankPlanner：按缺口分批生成，去重跳过后只按差额补齐，不超出目标"""
+import asyncio
+
+import pytest
+
+from app.models import DifficultyLevel, QuestionCategory
+from app.services import bank_planner as planner_module
+from app.services.bank_planner import BankFillRun, BankPlanner, BucketProgress
+
+
+@pytest.fixture
+def stub_generation(monkeypatch):
+    """替换上游生成和保存：第 n 次生成耗时 delays[n]，保存时前 skips[n] 道题按重复标题跳过"""
+    calls = []
+
+    def install(delays, skips):
+        async def generate(category, difficulty, count, **kwargs):
+            index = len(calls)
+            calls.append(count)
+            await asyncio.sleep(delays[index] if index < len(delays) else 0)
+            return [(index, i) for i in range(count)]
+
+        async def run_async(fn, questions):
+            index = questions[0][0]
+            skip = skips[index] if index < len(skips) else 0
+            return questions[skip:], questions[:skip]
+
+        monkeypatch.setattr(planner_module.ai_service, "generate_questions_async", generate)
+        monkeypatch.setattr(planner_module.db_writer, "run_async", run_async)
+        return calls
+
+    return install
+
+
+def make_run(target, chunk_size, concurrency):
+    bucket = BucketProgress(QuestionCategory.DATABASE, DifficultyLevel.MEDIUM, current=0, target=target)
+    return BankFillRun([bucket], concurrency=concurrency, token_budget=None, chunk_size=chunk_size), bucket
+
+
+async def test_dedup_shortfall_requeued_only_after_other_chunks_settle(stub_generation):
+    # 第一批先结束且有 2 道重复；第二批仍在生成，此时不能按整个差额重新排队
+    calls = stub_generation(delays=[0.01, 0.05], skips=[2])
+    run, bucket = make_run(target=10, chunk_size=5, concurrency=2)
+
+    await BankPlanner()._fill(run)
+
+    assert calls == [5, 5, 2]
+    assert bucket.saved == bucket.target
+    assert bucket.skipped == 2
+    assert bucket.requested <= bucket.target + bucket.skipped
+    assert bucket.scheduled == 0
+    assert bucket.status == "full"
+
+
+async def test_requeue_limited_by_max_retries(stub_generation):
+    # 每批都全部重复：重新排队 MAX_BUCKET_RETRIES 次后放弃
+    calls = stub_generation(delays=[], skips=[5] * 10)
+    run, bucket = make_run(target=5, chunk_size=5, concurrency=2)
+
+    await BankPlanner()._fill(run)
+
+    assert calls == [5] * (1 + planner_module.MAX_BUCKET_RETRIES)
+    assert bucket.saved == 0
+    assert bucket.scheduled == 0
+    assert bucket.status == "partial"
@@ -0,0 +1,69 @@
+"""bulk_create_questions：标题去重，以及并发写入同一标题时被 INSERT OR IGNORE 忽略的题目"""
+import uuid
+
+import pytest
+from sqlalchemy import insert
+
+from app import crud
+from app.database import SessionLocal, engine
+from app.migrations import upgrade_database
+from app.models import DifficultyLevel, Question, QuestionCategory, Tag
+from app.schemas import QuestionCreate
+from app.services.textutil import normalize_title
+
+
+@pytest.fixture
+def db():
+    upgrade_database(engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def make_question(title, tags):
+    return QuestionCreate(
+        title=title,
+        content=f"{title} 的内容",
+        category=QuestionCategory.TESTING,
+        difficulty=DifficultyLevel.EASY,
+        tags=tags,
+    )
+
+
+def tag_counts(db, names):
+    return dict(db.query(Tag.name, Tag.usage_count).filter(Tag.name.in_(names)))
+
+
+def test_existing_titles_skipped_without_creating_tags(db):
+    suffix = uuid.uuid4().hex[:8]
+    first = make_question(f"批量创建 {suffix}", [f"已用-{suffix}"])
+    crud.bulk_create_questions(db, [first])
+
+    duplicate = make_question(f"  批量创建 {suffix} ", [f"重复-{suffix}"])
+    created, skipped = crud.bulk_create_questions(db, [duplicate])
+    assert created == [] and skipped == [duplicate.title]
+    assert tag_counts(db, [f"已用-{suffix}", f"重复-{suffix}"]) == {f"已用-{suffix}": 1}
+
+
+def test_insert_ignored_rows_leave_no_unused_tags(db, monkeypatch):
+    # 标题检查之后、插入之前另一个写操作写入了同一标题：该题目被 INSERT OR IGNORE 忽略
+    suffix = uuid.uuid4().hex[:8]
+    raced = make_question(f"并发写入 {suffix}", [f"并发-{suffix}", f"共用-{suffix}"])
+    kept = make_question(f"正常写入 {suffix}", [f"共用-{suffix}"])
+    original_signature = crud.signature
+
+    def signature_after_race(title, content):
+        if title == raced.title:
+            db.execute(insert(Question), [{
+                "title": raced.title, "title_key": normalize_title(raced.title), "content": raced.content,
+                "category": raced.category, "difficulty": raced.difficulty,
+            }])
+        return original_signature(title, content)
+
+    monkeypatch.setattr(crud, "signature", signature_after_race)
+    created, skipped = crud.bulk_create_questions(db, [raced, kept])
+
+    assert [question.title for question in created] == [kept.title]
+    assert skipped == [raced.title]
+    assert created[0].tags == [f"共用-{suffix}"]
+    assert tag_counts(db, [f"并发-{suffix}", f"共用-{suffix}"]) == {f"共用-{suffix}": 1}
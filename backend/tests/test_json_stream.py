@@ -0,0 +1,82 @@
+"""JsonArrayItemParser：任意切分的输入都要得到与整体解析相同的结果"""
+import json
+
+import pytest
+
+from app.services.json_stream import JsonArrayItemParser
+
+QUESTIONS = [
+    {
+        "title": "带 \"引号\" 的标题",
+        "content": "包含 {花括号}、[方括号] 和反斜杠 \\ 的描述",
+        "tags": ["a", "b"],
+        "analysis": "```python\nprint({'a': [1, 2]})\n```",
+    },
+    {"title": "嵌套对象", "meta": {"items": [{"x": 1}, {"y": [2, 3]}]}},
+    {"title": "第三题", "content": ""},
+]
+RESPONSE = "以下是生成的题目：\n```json\n" + json.dumps({"questions": QUESTIONS}, ensure_ascii=False, indent=2) + "\n```"
+
+
+def feed_all(chunks):
+    parser = JsonArrayItemParser()
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    return items, parser
+
+
+def test_whole_response():
+    items, parser = feed_all([RESPONSE])
+    assert items == QUESTIONS
+    assert parser.errors == 0
+
+
+@pytest.mark.parametrize("split", range(1, len(RESPONSE)))
+def test_split_in_two(split):
+    items, _ = feed_all([RESPONSE[:split], RESPONSE[split:]])
+    assert items == QUESTIONS
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 8, 64])
+def test_fixed_size_chunks(size):
+    items, _ = feed_all(RESPONSE[i:i + size] for i in range(0, len(RESPONSE), size))
+    assert items == QUESTIONS
+
+
+def test_items_returned_as_soon_as_closed():
+    first = json.dumps(QUESTIONS[0], ensure_ascii=False)
+    parser = JsonArrayItemParser()
+    assert parser.feed('{"questions": [' + first[:-1]) == []
+    assert parser.feed(first[-1] + ", ") == [QUESTIONS[0]]
+    assert parser.feed(json.dumps(QUESTIONS[1], ensure_ascii=False) + "]}") == [QUESTIONS[1]]
+
+
+@pytest.mark.parametrize("preamble", [
+    "以下是题目（见下方 [JSON 列表）：\n```json\n",
+    "注意 {不要} 重复，参考 [1 和 { 说明：\n",
+    "未闭合的 [ 括号后直接给出：",
+])
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_unbalanced_brackets_in_preamble(preamble, size):
+    response = preamble + json.dumps({"questions": QUESTIONS}, ensure_ascii=False) + "\n```"
+    items, parser = feed_all(response[i:i + size] for i in range(0, len(response), size))
+    assert items == QUESTIONS
+    assert parser.errors == 0
+
+
+def test_top_level_array():
+    items, _ = feed_all([json.dumps(QUESTIONS, ensure_ascii=False)])
+    assert items == QUESTIONS
+
+
+def test_invalid_item_skipped():
+    items, parser = feed_all(['{"questions": [{"title": "坏的",}, ', '{"title": "好的"}, 1, "x"]}'])
+    assert items == [{"title": "好的"}]
+    assert parser.errors == 1
+
+
+def test_unterminated_item_not_returned():
+    items, parser = feed_all(['{"questions": [{"title": "完整"}, {"title": "被截断'])
+    assert items == [{"title": "完整"}]
+    assert parser.errors == 0
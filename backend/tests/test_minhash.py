@@ -0,0 +1,203 @@
+"""MinHash 近似重复检测：签名稳定性、LSH 分段召回、批内去重，以及写入时 reject / flag / off 的处理"""
+import logging
+import uuid
+import zlib
+
+import numpy as np
+import pytest
+
+from app import crud
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.migrations import upgrade_database
+from app.models import DifficultyLevel, QuestionCategory
+from app.schemas import QuestionCreate
+from app.services.db_writer import GroupCommitWriter
+from app.services.minhash import (
+    NUM_PERM, MinHashLSH, find_batch_duplicates, from_bytes, jaccard, signature, to_bytes,
+)
+
+THRESHOLD = settings.NEAR_DUPLICATE_THRESHOLD
+
+
+def words(prefix, count):
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+
+def pair_with_jaccard(name, shared, distinct):
+    """两段文本：共有 shared 个词，各自另有 distinct 个词，Jaccard = shared / (shared + 2 * distinct)"""
+    common = words(f"{name}c", shared)
+    return common + " " + words(f"{name}a", distinct), common + " " + words(f"{name}b", distinct)
+
+
+# ---- 签名与索引 ----
+
+def test_signature_is_stable():
+    # 签名会持久化到 questions.minhash，哈希族或分词变化后已有签名全部失效，需要 backfill-minhash --recompute
+    sig = signature("实现二分查找算法", "请实现一个高效的二分查找算法，时间复杂度为 O(log n)")
+    assert sig.dtype == np.uint32 and sig.shape == (NUM_PERM,)
+    assert zlib.crc32(to_bytes(sig)) == 3098319868
+    assert np.array_equal(from_bytes(to_bytes(sig)), sig)
+    assert from_bytes(b"short") is None
+
+
+def test_signature_ignores_token_order_and_repeats():
+    assert np.array_equal(signature("a b c", "d e"), signature("e d c", "b a a b"))
+
+
+def test_empty_signature_matches_nothing():
+    index = MinHashLSH()
+    index.add(1, signature("", None))
+    assert len(index) == 0
+    assert index.query(signature("", ""), 0.0) == []
+
+
+def test_banding_recall_at_threshold():
+    # 16 段 × 4 行：真实 Jaccard 0.7 的题目对约 99% 落入同一个桶，0.2 的约 2.5%
+    similar_hits = dissimilar_hits = 0
+    trials = 200
+    for i in range(trials):
+        index = MinHashLSH()
+        a, b = pair_with_jaccard(f"s{i}x", shared=70, distinct=15)
+        index.add(1, signature(a, None))
+        similar_hits += bool(index.query(signature(b, None), 0.0))
+
+        index = MinHashLSH()
+        a, b = pair_with_jaccard(f"d{i}x", shared=20, distinct=40)
+        index.add(1, signature(a, None))
+        dissimilar_hits += bool(index.query(signature(b, None), 0.0))
+    assert similar_hits / trials >= 0.95
+    assert dissimilar_hits / trials <= 0.1
+
+
+def test_query_filters_candidates_by_estimated_jaccard():
+    a, b = pair_with_jaccard("q", shared=90, distinct=5)
+    index = MinHashLSH()
+    index.add(1, signature(a, None))
+    index.add(2, signature(words("other", 50), None))
+    matches = index.query(signature(b, None), THRESHOLD)
+    assert [question_id for question_id, _ in matches] == [1]
+    assert matches[0][1] == jaccard(signature(a, None), signature(b, None)) >= THRESHOLD
+    assert index.query(signature(b, None), THRESHOLD, exclude=1) == []
+    index.remove(1)
+    assert index.query(signature(b, None), THRESHOLD) == []
+
+
+def test_find_batch_duplicates():
+    existing, near_existing = pair_with_jaccard("e", shared=90, distinct=3)
+    first, near_first = pair_with_jaccard("f", shared=90, distinct=3)
+    index = MinHashLSH()
+    index.add(7, signature(existing, None))
+    pending = MinHashLSH()
+    pending_text, near_pending = pair_with_jaccard("p", shared=90, distinct=3)
+    pending.add(8, signature(pending_text, None))
+
+    found = find_batch_duplicates(
+        [
+            ("near_existing", signature(near_existing, None)),
+            ("first", signature(first, None)),
+            ("near_first", signature(near_first, None)),
+            ("near_pending", signature(near_pending, None)),
+            ("unique", signature(words("u", 40), None)),
+        ],
+        index,
+        THRESHOLD,
+        pending=pending,
+    )
+    assert set(found) == {"near_existing", "near_first", "near_pending"}
+    assert found["near_existing"][0] == 7
+    assert found["near_first"][0] is None
+    assert found["near_pending"][0] == 8
+
+
+# ---- 写入时的处理 ----
+
+@pytest.fixture
+def near_index(monkeypatch):
+    """独立的近似重复索引，写入提交后由写监听器更新（与应用启动时注册的监听器一致）"""
+    upgrade_database(engine)
+    index = MinHashLSH()
+    monkeypatch.setattr(crud, "near_duplicate_index", index)
+    monkeypatch.setattr(crud, "_write_listeners", [index.on_question_write])
+    return index
+
+
+@pytest.fixture
+def db(near_index):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def make_question(content):
+    return QuestionCreate(
+        title=f"近似重复测试 {uuid.uuid4().hex[:8]}",
+        content=content,
+        category=QuestionCategory.TESTING,
+        difficulty=DifficultyLevel.HARD,
+        tags=["近似重复"],
+    )
+
+
+def near_duplicate_pair():
+    original, near = pair_with_jaccard(uuid.uuid4().hex[:6], shared=90, distinct=2)
+    return make_question(original), make_question(near)
+
+
+def test_reject_skips_near_duplicates_of_existing_and_batch(db):
+    original, near = near_duplicate_pair()
+    created, skipped = crud.bulk_create_questions(db, [original], near_duplicates="reject")
+    assert [question.title for question in created] == [original.title] and skipped == []
+
+    unique = make_question(words(uuid.uuid4().hex[:6], 40))
+    created, skipped = crud.bulk_create_questions(db, [near, unique], near_duplicates="reject")
+    assert [question.title for question in created] == [unique.title]
+    assert skipped == [near.title]
+
+    first, second = near_duplicate_pair()
+    created, skipped = crud.bulk_create_questions(db, [first, second], near_duplicates="reject")
+    assert [question.title for question in created] == [first.title]
+    assert skipped == [second.title]
+
+
+def test_flag_saves_near_duplicates_and_logs(db, caplog):
+    original, near = near_duplicate_pair()
+    crud.bulk_create_questions(db, [original], near_duplicates="flag")
+    with caplog.at_level(logging.WARNING, logger="app.crud"):
+        created, skipped = crud.bulk_create_questions(db, [near], near_duplicates="flag")
+    assert [question.title for question in created] == [near.title] and skipped == []
+    assert "疑似近似重复题目" in caplog.text
+
+
+def test_off_saves_near_duplicates(db):
+    original, near = near_duplicate_pair()
+    created, _ = crud.bulk_create_questions(db, [original, near], near_duplicates="off")
+    assert len(created) == 2
+
+
+def test_generated_questions_follow_configured_mode(db, monkeypatch):
+    original, near = near_duplicate_pair()
+    monkeypatch.setattr(settings, "NEAR_DUPLICATE_MODE", "reject")
+    crud.save_generated_questions(db, [original])
+    created, skipped = crud.save_generated_questions(db, [near])
+    assert created == [] and skipped == [near.title]
+
+    monkeypatch.setattr(settings, "NEAR_DUPLICATE_MODE", "off")
+    created, _ = crud.save_generated_questions(db, [make_question(near.content)])
+    assert len(created) == 1
+
+
+def test_near_duplicates_in_same_group_commit(near_index):
+    # 两次写操作进入同一个组提交批：第二次要和第一次刚写入、尚未提交的题目比较
+    original, near = near_duplicate_pair()
+    writer = GroupCommitWriter(max_batch=8, max_delay=0.2)
+    try:
+        first = writer.submit(crud.bulk_create_questions, [original], "reject")
+        second = writer.submit(crud.bulk_create_questions, [near], "reject")
+        assert len(first.result(timeout=10)[0]) == 1
+        assert second.result(timeout=10) == ([], [near.title])
+    finally:
+        writer.shutdown()
+    assert writer.stats()["commits"] == 1
+    # 提交后写监听器把新题目加入索引
+    assert len(near_index.query(signature(near.title, near.content), THRESHOLD)) == 1
@@ -0,0 +1,22 @@
+"""写操作提交后的查询缓存失效"""
+from app import crud
+from app.services.query_cache import QueryCache
+
+
+def test_results_cached_while_listeners_run_are_invalidated(monkeypatch):
+    cache = QueryCache(max_size=16, ttl=60)
+    cache.set("before", "旧结果", version=cache.version)
+
+    def listener(event, question_id, question):
+        # 内存索引更新期间的读请求：旧条目已失效，新算出的结果基于尚未更新完的索引
+        assert cache.get("before") is None
+        cache.set("during", "半更新的结果", version=cache.version)
+        assert cache.get("during") == "半更新的结果"
+
+    monkeypatch.setattr(crud, "query_cache", cache)
+    monkeypatch.setattr(crud, "_write_listeners", [listener])
+    crud._run_write_listeners("update", 1, None)
+
+    assert cache.get("during") is None
+    cache.set("after", "新结果", version=cache.version)
+    assert cache.get("after") == "新结果"
@@ -0,0 +1,154 @@
+"""热点查询的执行计划（EXPLAIN QUERY PLAN）检查
+
+在临时数据库上从头执行全部迁移，插入 ROWS 道合成题目后 ANALYZE（几十行的小表上统计信息会让
+规划器倾向全表扫描，和线上数据量下的选择不同），然后调用 crud / 服务中的实际查询，记录它们
+发出的 SELECT 语句，逐条取执行计划并检查：
+    - 不对 questions / question_tags / tags / ai_jobs 做不带索引的全表扫描（个别检查项显式允许）
+    - 带 LIMIT 的分页查询不需要临时 B 树排序（USE TEMP B-TREE FOR ORDER BY）
+    - 用到该检查项期望的索引（USING INDEX / USING COVERING INDEX）
+调整查询或索引后运行：pytest tests/test_query_plans.py
+"""
+import random
+import re
+
+import pytest
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.crud import encode_cursor
+from app.migrations import upgrade_database
+from app.models import AIJob, DifficultyLevel, Question, QuestionCategory, QuestionTag, Tag
+from app.schemas import QuestionSearchParams
+from app.services.ai_jobs import ACTIVE_STATUSES, ai_job_runner
+from app.services.sampler import RandomSampler
+
+ROWS = 20000
+TAG_NAMES = ["性能优化", "数据库", "索引", "算法", "数组", "并发控制", "缓存", "React", "状态管理", "架构设计"]
+HOT_TABLES = ("questions", "question_tags", "tags", "ai_jobs")
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+CATEGORY = QuestionCategory.DATABASE
+DIFFICULTY = DifficultyLevel.MEDIUM
+
+
+def search(**kwargs):
+    return lambda db: crud.search_questions(db, QuestionSearchParams(size=10, **kwargs))
+
+
+# (名称, 查询, 期望用到的索引, 允许全表扫描的表, 是否分页查询)
+CHECKS = [
+    ("列表：类别 + 难度", search(category=CATEGORY, difficulty=DIFFICULTY),
+     "ix_questions_category_difficulty_id", (), True),
+    ("keyset 翻页：类别 + 难度", search(category=CATEGORY, difficulty=DIFFICULTY, cursor=encode_cursor(None, 5)),
+     "ix_questions_category_difficulty_id", (), True),
+    ("列表：类别", search(category=CATEGORY), "ix_questions_category", (), True),
+    ("列表：难度", search(difficulty=DIFFICULTY), "ix_questions_difficulty", (), True),
+    ("列表：标签", search(tag="性能优化"), "ix_question_tags_tag_id_question_id", (), True),
+    # 不带条件的列表按 rowid 顺序扫描，LIMIT 后提前结束
+    ("列表：第一页", search(), None, ("questions",), True),
+    ("详情", lambda db: crud.get_question(db, 1), None, (), False),
+    ("按标题查重", lambda db: crud.get_question_by_title(db, "合成题目 1"), "ux_questions_title_key", (), False),
+    ("按 id 批量加载", lambda db: crud.get_questions_by_ids(db, [1, 2, 3]), None, (), False),
+    # 按标签命中的 id 逐个查主键，或按类别走索引，由规划器根据统计信息选择
+    ("分面：类别 + 标签", lambda db: crud.get_facet_counts(db, QuestionSearchParams(category=CATEGORY, tag="性能优化")),
+     None, (), False),
+    ("标签云", lambda db: crud.get_tag_counts(db), "ix_tags_usage_count_name", (), True),
+    # 抽题索引需要全部题目的标签，question_tags / tags 只能整表读取
+    ("抽题索引构建", lambda db: RandomSampler().build(db),
+     "ix_questions_category_difficulty_id", ("question_tags", "tags"), False),
+    ("AI 任务：未完成计数", lambda db: db.query(func.count(AIJob.id)).filter(AIJob.status.in_(ACTIVE_STATUSES)).scalar(),
+     "ix_ai_jobs_status_created_at", (), False),
+    ("AI 任务：最近列表", lambda db: ai_job_runner.list_recent(db), "ix_ai_jobs_created_at", (), True),
+]
+
+
+def seed(engine, rows, batch_size=2000):
+    """插入标签和合成题目，每道题随机关联 0~3 个标签"""
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        conn.execute(insert(Tag), [{"name": name, "usage_count": 0} for name in TAG_NAMES])
+        tag_ids = [row[0] for row in conn.execute(select(Tag.id))]
+        for start in range(1, rows + 1, batch_size):
+            ids = range(start, min(rows + 1, start + batch_size))
+            conn.execute(insert(Question), [
+                {
+                    "id": question_id,
+                    "title": f"合成题目 {question_id}",
+                    "title_key": f"合成题目 {question_id}",
+                    "content": f"合成题目内容 {question_id}",
+                    "category": rng.choice(list(QuestionCategory)),
+                    "difficulty": rng.choice(list(DifficultyLevel)),
+                }
+                for question_id in ids
+            ])
+            conn.execute(insert(QuestionTag), [
+                {"question_id": question_id, "tag_id": tag_id, "position": position}
+                for question_id in ids
+                for position, tag_id in enumerate(rng.sample(tag_ids, k=rng.randint(0, 3)))
+            ])
+        conn.exec_driver_sql("ANALYZE")
+
+
+@pytest.fixture(scope="module")
+def plan_engine(tmp_path_factory):
+    """独立于应用数据库的临时库：迁移到最新版本并填充数据"""
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    upgrade_database(engine)
+    seed(engine, ROWS)
+    yield engine
+    engine.dispose()
+
+
+def capture(engine, run):
+    """执行查询，返回期间发出的 SELECT 语句及参数"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        with sessionmaker(bind=engine)() as db:
+            run(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def explain(engine, statement, parameters):
+    with engine.connect() as conn:
+        return [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+def format_plans(plans):
+    lines = []
+    for statement, plan in plans:
+        lines.append(" ".join(statement.split())[:160])
+        lines.extend(f"    {line}" for line in plan)
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("name, run, index, allow_scan, paged", CHECKS, ids=[check[0] for check in CHECKS])
+def test_query_plan(plan_engine, name, run, index, allow_scan, paged):
+    statements = capture(plan_engine, run)
+    assert statements, f"{name} 没有发出 SELECT 语句"
+
+    problems = []
+    plans = []
+    for statement, parameters in statements:
+        plan = explain(plan_engine, statement, parameters)
+        plans.append((statement, plan))
+        for line in plan:
+            match = FULL_SCAN.match(line.strip())
+            if match and match.group(1) in HOT_TABLES and match.group(1) not in allow_scan:
+                problems.append(f"全表扫描 {match.group(1)}")
+            if paged and " LIMIT " in statement and "USE TEMP B-TREE FOR ORDER BY" in line:
+                problems.append("分页查询使用临时 B 树排序")
+    if index:
+        pattern = re.compile(rf"USING (COVERING )?INDEX {index}\b")
+        if not any(pattern.search(line) for _, plan in plans for line in plan):
+            problems.append(f"没有用到索引 {index}")
+
+    assert not problems, "；".join(problems) + "\n" + format_plans(plans)
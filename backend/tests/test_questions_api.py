@@ -0,0 +1,33 @@
+"""题目列表接口的分页：page / size 分页和 next_cursor 游标分页"""
+from app.config import settings
+
+QUESTIONS_URL = f"{settings.API_V1_STR}/questions/"
+FILTERS = {"category": "security", "difficulty": "easy"}
+
+
+def test_cursor_paging_reports_no_page_numbers(client):
+    created = []
+    for i in range(5):
+        response = client.post(QUESTIONS_URL, json={
+            "title": f"分页测试题 {i}", "content": f"分页测试内容 {i}", "tags": ["分页"], **FILTERS,
+        })
+        assert response.status_code == 200
+        created.append(response.json()["id"])
+
+    first = client.get(QUESTIONS_URL, params={**FILTERS, "size": 2}).json()
+    assert (first["page"], first["size"], first["pages"], first["total"]) == (1, 2, 3, 5)
+    assert first["next_cursor"]
+
+    ids = [item["id"] for item in first["items"]]
+    cursor = first["next_cursor"]
+    while cursor:
+        data = client.get(QUESTIONS_URL, params={**FILTERS, "size": 2, "cursor": cursor}).json()
+        # 游标分页没有页码，翻页只看 next_cursor
+        assert data["page"] is None and data["pages"] is None and data["total"] is None
+        ids.extend(item["id"] for item in data["items"])
+        cursor = data["next_cursor"]
+    assert sorted(ids) == sorted(created)
+
+    data = client.get(QUESTIONS_URL, params={**FILTERS, "size": 2, "cursor": first["next_cursor"], "with_total": True}).json()
+    assert data["total"] == 5
+    assert data["page"] is None and data["pages"] is None
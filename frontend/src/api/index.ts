@@ -1,20 +1,30 @@
 import axios from 'axios'
 import type { 
   Question, 
+  QuestionSummary, 
   QuestionListResponse, 
+  FacetCounts, 
+  TagCount, 
+  SuggestResponse, 
   QuestionCreate, 
   QuestionUpdate, 
   QuestionSearchParams,
   QuestionGenerateRequest,
+  AIJob,
+  BankFillRequest,
+  BankFillRun,
   RandomQuestionRequest,
   InterviewSessionRequest
 } from '@/types'
 
 const api = axios.create({
   baseURL: '/api',
-  timeout: 5 * 60 * 1000
+  timeout: 30 * 1000
 })
 
+// 练习和面试需要完整题目，列表接口默认只返回摘要
+const PRACTICE_FIELDS = 'content,analysis,created_at'
+
 export const questionApi = {
   // 获取题目列表
   getQuestions: (params?: QuestionSearchParams) => {
@@ -26,6 +36,26 @@ export const questionApi = {
     return api.get<QuestionListResponse>('/questions/search', { params })
   },
 
+  // 输入联想
+  suggest: (prefix: string, limit?: number) => {
+    return api.get<SuggestResponse>('/questions/suggest', { params: { prefix, limit } })
+  },
+
+  // 获取类别 × 难度分面统计
+  getFacets: (params?: Pick<QuestionSearchParams, 'q' | 'category' | 'difficulty'>) => {
+    return api.get<FacetCounts>('/questions/facets', { params })
+  },
+
+  // 获取相似题目
+  getSimilarQuestions: (id: number, limit?: number) => {
+    return api.get<QuestionSummary[]>(`/questions/${id}/similar`, { params: { limit } })
+  },
+
+  // 按文本查找相似题目
+  findSimilar: (text: string, limit?: number) => {
+    return api.get<QuestionSummary[]>('/questions/similar', { params: { text, limit } })
+  },
+
   // 获取题目详情
   getQuestion: (id: number) => {
     return api.get<Question>(`/questions/${id}`)
@@ -47,10 +77,47 @@ export const questionApi = {
   }
 }
 
+export const tagApi = {
+  // 获取标签及使用次数
+  getTags: (limit?: number) => {
+    return api.get<TagCount[]>('/tags', { params: { limit } })
+  }
+}
+
 export const aiApi = {
-  // AI生成题目
+  // 提交AI生成题目任务
   generateQuestions: (data: QuestionGenerateRequest) => {
-    return api.post<Question[]>('/ai/generate', data)
+    return api.post<AIJob>('/ai/generate', data)
+  },
+
+  // 流式生成题目（Server-Sent Events），每道题保存后推送 question 事件
+  streamQuestions: (params: QuestionGenerateRequest) => {
+    const query = new URLSearchParams({
+      category: params.category,
+      difficulty: params.difficulty,
+      count: String(params.count)
+    })
+    return new EventSource(`${api.defaults.baseURL}/ai/generate/stream?${query}`)
+  },
+
+  // 查询生成任务状态
+  getJob: (id: string) => {
+    return api.get<AIJob>(`/ai/jobs/${id}`)
+  },
+
+  // 预览补题计划（各类别 × 难度的缺口）
+  planBankFill: (data: BankFillRequest) => {
+    return api.post<BankFillRun>('/ai/bank/plan', data)
+  },
+
+  // 按缺口补齐整个题库
+  startBankFill: (data: BankFillRequest) => {
+    return api.post<BankFillRun>('/ai/bank/fill', data)
+  },
+
+  // 查询补题进度
+  getBankRun: (id: string) => {
+    return api.get<BankFillRun>(`/ai/bank/runs/${id}`)
   },
 
   // 获取题目类别
@@ -66,25 +133,25 @@ export const aiApi = {
 
 export const randomApi = {
   // 随机获取题目
-  getRandomQuestions: (params: { count: number; categories?: string[]; difficulties?: string[] }) => {
-    return api.get<Question[]>('/random', { params })
+  getRandomQuestions: (params: { count: number; categories?: string[]; difficulties?: string[]; tags?: string[] }) => {
+    return api.get<Question[]>('/random', { params: { fields: PRACTICE_FIELDS, ...params } })
   },
 
   // 高级随机选题
   getAdvancedRandomQuestions: (data: RandomQuestionRequest) => {
-    return api.post<QuestionListResponse>('/random/advanced', data)
+    return api.post<QuestionListResponse<Question>>('/random/advanced', data, { params: { fields: PRACTICE_FIELDS } })
   }
 }
 
 export const interviewApi = {
   // 创建面试会话
   createInterviewSession: (data: InterviewSessionRequest) => {
-    return api.post<QuestionListResponse>('/interview', data)
+    return api.post<QuestionListResponse<Question>>('/interview', data, { params: { fields: PRACTICE_FIELDS } })
   },
 
   // 获取预设面试模式
   getPresetInterview: (presetType: string) => {
-    return api.get<QuestionListResponse>(`/interview/preset/${presetType}`)
+    return api.get<QuestionListResponse<Question>>(`/interview/preset/${presetType}`, { params: { fields: PRACTICE_FIELDS } })
   }
 }
 
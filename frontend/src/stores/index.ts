@@ -1,10 +1,10 @@
 import { defineStore } from 'pinia'
-import type { Question, QuestionListResponse } from '@/types'
+import type { Question, QuestionSummary, QuestionListResponse } from '@/types'
 import { questionApi, aiApi, randomApi, interviewApi } from '@/api'
 
 export const useQuestionStore = defineStore('question', {
   state: () => ({
-    questions: [] as Question[],
+    questions: [] as QuestionSummary[],
     currentQuestion: null as Question | null,
     total: 0,
     page: 1,
@@ -18,11 +18,12 @@ export const useQuestionStore = defineStore('question', {
       this.loading = true
       this.error = null
       try {
-        const response = await questionApi.getQuestions(params)
+        // 列表只需要摘要和创建时间
+        const response = await questionApi.getQuestions({ fields: 'created_at', ...params })
         const data: QuestionListResponse = response.data
         this.questions = data.items
-        this.total = data.total
-        this.page = data.page
+        this.total = data.total ?? 0
+        this.page = data.page ?? 1
         this.size = data.size
       } catch (error: any) {
         this.error = error.message || '获取题目失败'
@@ -101,8 +102,16 @@ export const useQuestionStore = defineStore('question', {
       this.loading = true
       this.error = null
       try {
-        const response = await aiApi.generateQuestions(params)
-        return response.data
+        // 提交任务后轮询状态，直到生成完成
+        let job = (await aiApi.generateQuestions(params)).data
+        while (job.status === 'pending' || job.status === 'running') {
+          await new Promise(resolve => setTimeout(resolve, 2000))
+          job = (await aiApi.getJob(job.id)).data
+        }
+        if (job.status === 'failed') {
+          throw new Error(job.error || '生成题目失败')
+        }
+        return job.questions || []
       } catch (error: any) {
         this.error = error.message || '生成题目失败'
         throw error
@@ -8,14 +8,42 @@ export interface Question {
   tags: string[]
   created_at: string
   updated_at?: string
+  snippet?: string
+  score?: number
 }
 
-export interface QuestionListResponse {
-  items: Question[]
-  total: number
-  page: number
+// 列表项：默认只有摘要字段，其余字段通过 fields 参数请求
+export interface QuestionSummary {
+  id: number
+  title: string
+  category: Question['category']
+  difficulty: Question['difficulty']
+  tags: string[]
+  snippet?: string | null
+  score?: number | null
+  content?: string
+  analysis?: string
+  created_at?: string
+  updated_at?: string
+}
+
+export interface QuestionListResponse<T = QuestionSummary> {
+  items: T[]
+  total: number | null
+  // 游标分页（请求带 cursor）时 page / pages 为 null，用 next_cursor 请求下一页
+  page: number | null
   size: number
-  pages: number
+  pages: number | null
+  next_cursor?: string | null
+  facets?: FacetCounts | null
+}
+
+export interface FacetCounts {
+  total: number
+  categories: Record<string, number>
+  difficulties: Record<string, number>
+  matrix: Record<string, Record<string, number>>
+  tags?: Record<string, number> | null
 }
 
 export interface QuestionCreate {
@@ -40,8 +68,14 @@ export interface QuestionSearchParams {
   q?: string
   category?: Question['category']
   difficulty?: Question['difficulty']
+  tag?: string
+  mode?: 'fulltext' | 'fuzzy'
   page?: number
   size?: number
+  cursor?: string
+  with_total?: boolean
+  facets?: boolean
+  fields?: string
 }
 
 export interface QuestionGenerateRequest {
@@ -50,16 +84,82 @@ export interface QuestionGenerateRequest {
   count: number
 }
 
+export interface AIJob {
+  id: string
+  status: 'pending' | 'running' | 'succeeded' | 'failed'
+  category: Question['category']
+  difficulty: Question['difficulty']
+  count: number
+  question_ids: number[]
+  skipped_titles: string[]
+  error?: string | null
+  created_at?: string
+  started_at?: string | null
+  finished_at?: string | null
+  questions?: Question[] | null
+}
+
+export interface BankFillRequest {
+  target_per_bucket?: number
+  targets?: Partial<Record<Question['category'], Partial<Record<Question['difficulty'], number>>>>
+  categories?: Question['category'][]
+  difficulties?: Question['difficulty'][]
+  concurrency?: number
+  token_budget?: number
+}
+
+export interface BucketProgress {
+  category: Question['category']
+  difficulty: Question['difficulty']
+  current: number
+  target: number
+  deficit: number
+  requested: number
+  saved: number
+  skipped: number
+  failed: number
+  status: 'pending' | 'running' | 'full' | 'partial' | 'budget_exhausted' | 'failed'
+  error?: string | null
+}
+
+export interface BankFillRun {
+  id: string
+  status: 'planned' | 'running' | 'succeeded' | 'partial' | 'budget_exhausted' | 'failed'
+  buckets: BucketProgress[]
+  total_deficit: number
+  saved: number
+  concurrency: number
+  token_budget?: number | null
+  estimated_tokens: number
+  tokens_used: number
+  error?: string | null
+  created_at: string
+  started_at?: string | null
+  finished_at?: string | null
+}
+
 export interface RandomQuestionRequest {
   count: number
   categories?: Question['category'][]
   difficulties?: Question['difficulty'][]
+  tags?: string[]
+}
+
+export interface TagCount {
+  name: string
+  count: number
+}
+
+export interface SuggestResponse {
+  questions: Pick<Question, 'id' | 'title'>[]
+  tags: TagCount[]
 }
 
 export interface InterviewSessionRequest {
   easy_count: number
   medium_count: number
   hard_count: number
+  categories?: Question['category'][]
 }
 
 export const categories = [